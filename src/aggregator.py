@@ -0,0 +1,304 @@
+# Aggregator of framed collector streams, runs on the orchestrator host.
+#
+# Collectors started with --framed (monitor_pps.py, node_agent.py) write
+# length prefixed binary frames (see FrameWriter in collector_common.py)
+# either to stdout, which we read from `kubectl exec` / `ssh` child
+# processes, or to a TCP / unix socket we listen on.  All streams are
+# multiplexed in one asyncio loop, decoded incrementally and kept in
+# memory per column, at the end one consolidated .npz per experiment
+# is written, key is <stream>/<source>/<column>.
+#
+# --progress N prints a line per source every N seconds, so we see
+# rates while experiment still running.
+#
+# --loopback N starts N local monitor_pps.py on lo plus a node_agent.py
+# as a stand-in for pods and worker, to test without a cluster.
+#
+# python3 aggregator.py -o metrics/exp.npz --duration 120 \
+#   --cmd client0="kubectl exec client0 -- python3 /tmp/monitor_pps.py -d tuple --framed" \
+#   --cmd rx-node="ssh root@10.0.0.2 python3 /tmp/node_agent.py -i eth1 --framed"
+# python3 aggregator.py -o /tmp/loop.npz --loopback 3 --duration 5 --listen unix:/tmp/agg.sock
+import argparse
+import asyncio
+import os
+import shlex
+import sys
+import time
+from array import array
+
+import numpy as np
+
+from collector_common import FrameDecoder, FRAME_HELLO, FRAME_SCHEMA, FRAME_ROW
+
+COLUMNS_KEY = '__columns__'
+
+
+class SourceColumns:
+    """Rows of one source of one stream, kept as flat array of doubles."""
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.columns = columns
+        self.data = array('d')
+
+    def append(self, payload):
+        self.data.frombytes(payload)
+
+    def __len__(self):
+        return len(self.data) // len(self.columns) if self.columns else 0
+
+    def matrix(self):
+        """:return: (rows, columns) float64 array"""
+        return np.frombuffer(self.data, dtype=np.float64).reshape(-1, len(self.columns))
+
+
+class StreamAggregator:
+    """Multiplex framed streams from child processes and socket connections."""
+
+    def __init__(self, is_verbose=False):
+        # stream name -> {source id: SourceColumns}
+        self.streams = {}
+        self.procs = []
+        self.connections = set()
+        self.bad_frames = 0
+        self.is_verbose = is_verbose
+
+    def _unique_name(self, name):
+        if name not in self.streams:
+            return name
+        n = 1
+        while f"{name}.{n}" in self.streams:
+            n += 1
+        return f"{name}.{n}"
+
+    async def consume(self, reader, name=None):
+        """Decode frames until EOF.
+
+        :param reader: asyncio.StreamReader
+        :param name: stream name, if None taken from hello frame
+        :return: stream name
+        """
+        decoder = FrameDecoder()
+        sources = None
+        if name is not None:
+            name = self._unique_name(name)
+            sources = self.streams.setdefault(name, {})
+        while True:
+            chunk = await reader.read(1 << 16)
+            if not chunk:
+                break
+            for kind, source_id, payload in decoder.feed(chunk):
+                if kind == FRAME_HELLO:
+                    if sources is None:
+                        name = self._unique_name(payload.decode())
+                        sources = self.streams.setdefault(name, {})
+                elif sources is None:
+                    self.bad_frames += 1
+                elif kind == FRAME_SCHEMA:
+                    source, *columns = payload.decode().split()
+                    sources[source_id] = SourceColumns(source, columns)
+                elif kind == FRAME_ROW and source_id in sources:
+                    sources[source_id].append(payload)
+                else:
+                    self.bad_frames += 1
+        if decoder.buf:
+            self.bad_frames += 1
+        if self.is_verbose:
+            print(f"Stream {name} closed.")
+        return name
+
+    async def run_command(self, name, argv):
+        """Start child process and consume its stdout.
+        :param name: stream name
+        :param argv: command, i.e. kubectl exec ... --framed
+        :return:
+        """
+        proc = await asyncio.create_subprocess_exec(*argv, stdout=asyncio.subprocess.PIPE)
+        self.procs.append(proc)
+        await self.consume(proc.stdout, name)
+        await proc.wait()
+
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            await self.consume(reader)
+        finally:
+            writer.close()
+            self.connections.discard(task)
+
+    async def listen(self, target):
+        """Accept collectors connecting with --framed host:port or unix:/path.
+        :param target: 'host:port' or 'unix:/path'
+        :return: asyncio server
+        """
+        if target.startswith('unix:'):
+            path = target[len('unix:'):]
+            if os.path.exists(path):
+                os.unlink(path)
+            return await asyncio.start_unix_server(self._handle_connection, path)
+        host, _, port = target.rpartition(':')
+        return await asyncio.start_server(self._handle_connection, host or '0.0.0.0', int(port))
+
+    async def report(self, interval):
+        """Print latest row of each source every interval seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            for stream, sources in list(self.streams.items()):
+                for source in list(sources.values()):
+                    n = len(source)
+                    if not n:
+                        continue
+                    last = source.data[(n - 1) * len(source.columns):n * len(source.columns)]
+                    values = ' '.join(f"{c}={v:g}" for c, v in list(zip(source.columns, last))[:4])
+                    print(f"{stream}/{source.name}: {n} rows {values}", flush=True)
+
+    def terminate(self):
+        for proc in self.procs:
+            if proc.returncode is None:
+                try:
+                    proc.terminate()
+                except ProcessLookupError:
+                    pass
+
+    async def run(self, commands, listen=(), duration=0.0, progress=0.0, spawn=()):
+        """Run until all commands exit or duration elapsed.
+
+        :param commands: list of (name, argv)
+        :param listen: list of socket targets
+        :param duration: seconds, 0 wait for commands (or forever if only sockets)
+        :param progress: report interval in seconds, 0 disabled
+        :param spawn: list of argv started once sockets listen, i.e. collectors
+                      that connect back, their stdout is not consumed.
+        :return:
+        """
+        servers = [await self.listen(t) for t in listen]
+        for argv in spawn:
+            self.procs.append(await asyncio.create_subprocess_exec(*argv))
+        reporter = asyncio.ensure_future(self.report(progress)) if progress > 0 else None
+        tasks = [asyncio.ensure_future(self.run_command(name, argv)) for name, argv in commands]
+        try:
+            if tasks and not servers:
+                await asyncio.wait(tasks, timeout=duration or None)
+            elif duration:
+                await asyncio.sleep(duration)
+            else:
+                await asyncio.Event().wait()
+        finally:
+            self.terminate()
+            # children flush on SIGTERM, drain what is left in pipes / sockets.
+            pending = tasks + list(self.connections) + [asyncio.ensure_future(p.wait()) for p in self.procs]
+            if pending:
+                await asyncio.wait(pending, timeout=5)
+            for server in servers:
+                server.close()
+            for task in self.connections:
+                task.cancel()
+            if reporter:
+                reporter.cancel()
+
+    def save(self, path):
+        """Write one consolidated columnar file.
+        :param path: output .npz path
+        :return: number of rows written
+        """
+        arrays = {}
+        total = 0
+        for stream, sources in self.streams.items():
+            for source in sources.values():
+                matrix = source.matrix()
+                total += len(matrix)
+                prefix = f"{stream}/{source.name}"
+                arrays[f"{prefix}/{COLUMNS_KEY}"] = np.array(source.columns)
+                for i, column in enumerate(source.columns):
+                    arrays[f"{prefix}/{column}"] = matrix[:, i]
+        np.savez(path, **arrays)
+        return total
+
+
+def load_stream_file(path):
+    """Load file written by StreamAggregator.save
+
+    :param path: .npz path
+    :return: dict stream -> source -> dict column -> array, columns in
+             original order under '__columns__'
+    """
+    out = {}
+    with np.load(path) as data:
+        for key in data.files:
+            stream, source, column = key.rsplit('/', 2)
+            out.setdefault(stream, {}).setdefault(source, {})[column] = (
+                data[key].tolist() if column == COLUMNS_KEY else data[key])
+    return out
+
+
+def loopback_commands(n_pods, sample_time, target):
+    """Local stand-in for pods and worker node, collectors sample lo.
+
+    :param n_pods: number of pod samplers
+    :param sample_time: sample time in seconds
+    :param target: framed output of collectors, '-' stdout or socket target
+    :return: list of (name, argv)
+    """
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    commands = []
+    for i in range(n_pods):
+        commands.append((f"loop-pod{i}", [
+            sys.executable, os.path.join(src_dir, 'monitor_pps.py'), '-i', 'lo', '-d', 'tuple',
+            '-c', str(i % os.cpu_count()), '-s', str(sample_time),
+            '--framed', target, '--stream-name', f"loop-pod{i}"]))
+    commands.append(("loop-node", [
+        sys.executable, os.path.join(src_dir, 'node_agent.py'), '-i', 'lo', '--sources', 'cpu,softnet',
+        '-s', str(sample_time), '--framed', target, '--stream-name', "loop-node"]))
+    return commands
+
+
+def parse_command(value):
+    """--cmd name=command line"""
+    name, sep, command = value.partition('=')
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"expected name=command, got {value!r}")
+    return name, shlex.split(command)
+
+
+def main(cmd):
+    commands = list(cmd.cmd)
+    listen = list(cmd.listen)
+    spawn = []
+    if cmd.loopback:
+        if listen:
+            # collectors connect to our socket, child stdout not used.
+            spawn = [argv for _, argv in loopback_commands(cmd.loopback, cmd.sample_time, listen[0])]
+        else:
+            commands.extend(loopback_commands(cmd.loopback, cmd.sample_time, '-'))
+
+    if not commands and not listen:
+        print("Error: nothing to aggregate, use --cmd, --listen or --loopback.", file=sys.stderr)
+        sys.exit(1)
+
+    aggregator = StreamAggregator(is_verbose=cmd.verbose)
+    start = time.monotonic()
+    try:
+        asyncio.run(aggregator.run(commands, listen, cmd.duration, cmd.progress, spawn))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        total = aggregator.save(cmd.output)
+        print(f"Saved {total} rows from {len(aggregator.streams)} streams to {cmd.output} "
+              f"in {time.monotonic() - start:.1f}s, bad frames {aggregator.bad_frames}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate framed collector streams into one file.")
+    parser.add_argument("-o", "--output", type=str, required=True, help="Output .npz file.")
+    parser.add_argument("--cmd", type=parse_command, action='append', default=[],
+                        help="name=command, child process that writes frames to stdout.")
+    parser.add_argument("--listen", type=str, action='append', default=[],
+                        help="Accept collectors on host:port or unix:/path.")
+    parser.add_argument("--duration", type=float, default=0.0, help="Stop after seconds, 0 wait for commands.")
+    parser.add_argument("--progress", type=float, default=0.0, help="Print latest rows every N seconds.")
+    parser.add_argument("--loopback", type=int, default=0, help="Start N local pod samplers on lo and a node agent.")
+    parser.add_argument("-s", "--sample-time", type=float, default=1.0, help="Sample time of loopback collectors.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Verbose output.")
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,375 @@
+# Shared helpers for the python collectors that run inside pods
+# and on worker nodes (monitor_pps.py, monitor_softnet_stat.py etc.)
+#
+# Only stdlib here, pods and worker nodes ship plain python3.
+#
+# The main idea is to open /proc and /sys files once and re-read
+# them with pread(), so each sample costs a syscall instead of a
+# fork of cat / grep / awk.
+import math
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+from array import array
+
+
+class PersistentFile:
+    """Keeps file descriptor open and re-reads the whole file from offset 0.
+
+    /proc and /sys files regenerate content on each read, so pread at
+    offset 0 gives us fresh counters without reopening the file.
+    """
+
+    def __init__(self, path, buf_size=4096):
+        """
+        :param path: path to a file in procfs or sysfs
+        :param buf_size: initial read size, grows if file is bigger.
+        """
+        self.path = path
+        self.buf_size = buf_size
+        self.fd = os.open(path, os.O_RDONLY)
+
+    def read(self):
+        """Read entire file content.
+
+        procfs seq_files (/proc/interrupts, /proc/net/softnet_stat) return
+        about a page per call whatever size is asked, so a short read is
+        not end of file, we read on at the next offset until b''.
+        buf_size is the first chunk and follows the last file size.
+
+        :return: bytes
+        """
+        chunks = []
+        offset = 0
+        size = self.buf_size
+        while True:
+            data = os.pread(self.fd, size, offset)
+            if not data:
+                break
+            chunks.append(data)
+            offset += len(data)
+            size = max(self.buf_size, 4096)
+        self.buf_size = max(self.buf_size, offset + 1)
+        return b''.join(chunks)
+
+    def read_int(self):
+        """Read file that holds single integer i.e. sysfs counter.
+        :return: int
+        """
+        return int(os.pread(self.fd, 64, 0))
+
+    def pread(self, size, offset):
+        """Read size bytes from offset, fewer only at end of file.
+
+        Short reads of seq_files are continued, see read().
+
+        :param size: number of bytes
+        :param offset: offset in file
+        :return: bytes
+        """
+        chunks = []
+        while size > 0:
+            data = os.pread(self.fd, size, offset)
+            if not data:
+                break
+            chunks.append(data)
+            offset += len(data)
+            size -= len(data)
+        return b''.join(chunks)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class CpuCost:
+    """Measures CPU time consumed by collector itself between two calls."""
+
+    def __init__(self):
+        self.last = time.process_time()
+
+    def sample(self):
+        """Return CPU time in microseconds spent by this process since last call.
+        :return: int
+        """
+        now = time.process_time()
+        cost = now - self.last
+        self.last = now
+        return int(cost * 1e6)
+
+
+def tick_deadlines(interval):
+    """Generator that sleeps until the next tick on monotonic clock.
+
+    Deadlines are absolute, so time spent in sampling does not
+    accumulate as drift.
+
+    :param interval: interval in seconds, can be sub second.
+    :return: yields tick index
+    """
+    tick = 0
+    start = time.monotonic()
+    while True:
+        tick += 1
+        delay = start + tick * interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # we missed one or more deadlines, re-anchor
+            start = time.monotonic() - tick * interval
+        yield tick
+
+
+# with -T each collector appends these two columns to every row,
+# mono_ts is CLOCK_MONOTONIC of the host (not comparable across hosts),
+# wall_ts is wall clock used to place samples of different hosts on
+# one time line.
+TIMESTAMP_COLUMNS = ['mono_ts', 'wall_ts']
+
+
+def timestamp_values(mono, wall):
+    """Format timestamps as values for TIMESTAMP_COLUMNS.
+    :param mono: time.monotonic() at sample
+    :param wall: time.time() at sample
+    :return: list of str
+    """
+    return [f"{mono:.6f}", f"{wall:.6f}"]
+
+
+def columns_header(names):
+    """Header line naming each column, it starts with #
+    so np.loadtxt skips it as a comment.
+
+    :param names: list of column names
+    :return: str
+    """
+    return f"# columns: {' '.join(names)}"
+
+
+class SampleRing:
+    """Fixed size ring of samples preallocated as one flat array of doubles.
+
+    append() writes in place, no allocation and no I/O per sample, rows
+    are only materialized when the ring flushed.
+    """
+
+    def __init__(self, n_cols, capacity):
+        """
+        :param n_cols: values per sample
+        :param capacity: number of samples ring holds, oldest overwritten.
+        """
+        self.n_cols = n_cols
+        self.capacity = capacity
+        self.data = array('d', bytes(8 * n_cols * capacity))
+        self.count = 0
+
+    def append(self, values):
+        offset = (self.count % self.capacity) * self.n_cols
+        data = self.data
+        for i, v in enumerate(values):
+            data[offset + i] = v
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def rows(self):
+        """Samples from oldest to newest.
+        :return: list of lists
+        """
+        n = self.n_cols
+        start = self.count - len(self)
+        return [self.data[(i % self.capacity) * n:(i % self.capacity) * n + n].tolist()
+                for i in range(start, self.count)]
+
+    def clear(self):
+        self.count = 0
+
+
+def burst_columns(names):
+    """Column names of burst capture rows.
+    :param names: counter names
+    :return: list of str
+    """
+    return ['window', 't_rel'] + names + TIMESTAMP_COLUMNS
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def run_burst(read, names, trigger_cols, out, interval=0.005, history=1.0, post=0.5, max_windows=0):
+    """Burst capture, sample cumulative counters every few ms into a ring.
+
+    Nothing written while sampling.  When any of trigger_cols counter
+    grows (i.e. drop or ring full delta > 0) sampler keeps going for post
+    seconds and then writes the window: history seconds before the
+    trigger and post seconds after it.  Whatever is in the ring at exit
+    (SIGTERM from timeout, Ctrl-C) written as last window.
+
+    Rows are "window t_rel counters... mono_ts wall_ts", t_rel is
+    seconds relative to trigger, counters are raw cumulative values,
+    rates computed offline (inference.py load_burst_windows).
+
+    :param read: callable returns list of cumulative counters
+    :param names: counter names
+    :param trigger_cols: index of counters that trigger a flush
+    :param out: text stream
+    :param interval: sample interval in seconds i.e. 0.001 - 0.01
+    :param history: seconds kept before trigger
+    :param post: seconds captured after trigger
+    :param max_windows: stop after that many windows, 0 no limit
+    :return: number of windows written
+    """
+    post_n = max(1, math.ceil(post / interval))
+    ring = SampleRing(len(names) + 1, math.ceil(history / interval) + post_n)
+    window = 0
+    trigger_ts = None
+    remaining = 0
+
+    def flush():
+        rows = ring.rows()
+        if not rows:
+            return
+        # one wall clock offset per window, mono spacing kept.
+        offset = time.time() - time.monotonic()
+        ref = trigger_ts if trigger_ts is not None else rows[-1][0]
+        out.write(''.join(
+            f"{window} {row[0] - ref:.6f} {' '.join(str(int(v)) for v in row[1:])} "
+            f"{' '.join(timestamp_values(row[0], row[0] + offset))}\n" for row in rows))
+        out.flush()
+        ring.clear()
+
+    out.write(columns_header(burst_columns(names)) + "\n")
+    out.flush()
+    previous = signal.signal(signal.SIGTERM, _raise_interrupt)
+    prev = read()
+    try:
+        for _ in tick_deadlines(interval):
+            values = read()
+            now = time.monotonic()
+            ring.append((now, *values))
+            if trigger_ts is None:
+                if any(values[i] > prev[i] for i in trigger_cols):
+                    trigger_ts = now
+                    remaining = post_n
+            else:
+                remaining -= 1
+                if remaining <= 0:
+                    flush()
+                    window += 1
+                    trigger_ts = None
+                    if max_windows and window >= max_windows:
+                        break
+            prev = values
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+    if ring.count:
+        try:
+            flush()
+            window += 1
+        except BrokenPipeError:
+            pass
+    return window
+
+
+# Framed stream, collectors with --framed write length prefixed binary
+# records instead of text lines, to stdout (kubectl exec / ssh pass it
+# through) or to a TCP / unix socket of aggregator.py.
+#
+# frame: FRAME_HEADER (payload length, kind, source id) + payload
+#   FRAME_HELLO   payload utf-8 stream name, first frame of a stream
+#   FRAME_SCHEMA  payload utf-8 "source col1 col2 ...", before first row of a source
+#   FRAME_ROW     payload float64 per column, little endian
+FRAME_HEADER = struct.Struct('<IBB')
+FRAME_HELLO = 0
+FRAME_SCHEMA = 1
+FRAME_ROW = 2
+
+
+class FrameWriter:
+    """Encode hello, schema and row frames into a binary stream."""
+
+    def __init__(self, out):
+        """
+        :param out: binary file object, i.e. sys.stdout.buffer or socket file
+        """
+        self.out = out
+        self._row_structs = {}
+
+    def _frame(self, kind, source_id, payload):
+        self.out.write(FRAME_HEADER.pack(len(payload), kind, source_id) + payload)
+
+    def hello(self, name):
+        self._frame(FRAME_HELLO, 0, name.encode())
+
+    def schema(self, source_id, source, columns):
+        """Declare columns of a source, rows of that source must follow it.
+        :param source_id: small int 0-255 used in row frames
+        :param source: source name i.e. pod, queue, softnet
+        :param columns: list of column names
+        """
+        self._row_structs[source_id] = struct.Struct(f'<{len(columns)}d')
+        self._frame(FRAME_SCHEMA, source_id, ' '.join([source] + list(columns)).encode())
+
+    def row(self, source_id, values):
+        row_struct = self._row_structs[source_id]
+        self.out.write(FRAME_HEADER.pack(row_struct.size, FRAME_ROW, source_id) + row_struct.pack(*values))
+
+    def flush(self):
+        self.out.flush()
+
+    def close(self):
+        try:
+            self.out.close()
+        except OSError:
+            pass
+
+
+class FrameDecoder:
+    """Incremental decoder, feed arbitrary chunks and get complete frames."""
+
+    def __init__(self):
+        self.buf = bytearray()
+
+    def feed(self, data):
+        """
+        :param data: bytes read from a stream, any size
+        :return: list of (kind, source_id, payload bytes)
+        """
+        self.buf += data
+        frames = []
+        offset = 0
+        header_size = FRAME_HEADER.size
+        while len(self.buf) - offset >= header_size:
+            length, kind, source_id = FRAME_HEADER.unpack_from(self.buf, offset)
+            end = offset + header_size + length
+            if end > len(self.buf):
+                break
+            frames.append((kind, source_id, bytes(self.buf[offset + header_size:end])))
+            offset = end
+        del self.buf[:offset]
+        return frames
+
+
+def open_frame_output(target):
+    """Open destination of framed stream.
+
+    :param target: '-' stdout, 'host:port' TCP or 'unix:/path' unix socket
+    :return: binary file object
+    """
+    if target == '-':
+        return sys.stdout.buffer
+    if target.startswith('unix:'):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(target[len('unix:'):])
+    else:
+        host, _, port = target.rpartition(':')
+        sock = socket.create_connection((host, int(port)))
+    return sock.makefile('wb')
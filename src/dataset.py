@@ -0,0 +1,185 @@
+# Indexed view over inference.py dataset_files_from_dict result.
+#
+# Plot functions used to scan every experiment of the dataset dict with
+# size / cores / pps filters, and main() calls them once per pps and side,
+# so plotting grew with experiments squared.  Dataset keeps the same
+# key -> details mapping (print_metric and friends iterate it as before)
+# plus hash indexes built on first use for any combination of
+#   size, cores, pps, pairs, cores_per_pod
+# select() and groupby() return Dataset views sharing entries, indexes and
+# aggregate cache, aggregate() computes per experiment values (mean pps,
+# queue means, content digest of plot inputs, ...) once.
+#
+#   ds = Dataset(dataset_files_from_dict(combine_files, directory))
+#   for (size, cores), group in ds.groupby('size', 'cores').items(): ...
+#   ds.select(size='64', cores=[2, 4, 6], pps=100000)
+import hashlib
+from collections.abc import Mapping
+
+import numpy as np
+
+from log_names import WORKER_ROLES
+
+# index field -> (details key, normalization)
+FIELDS = {
+    'size': ('size', str),
+    'cores': ('cores', lambda v: tuple(int(c) for c in v)),
+    'pps': ('pps', int),
+    'pairs': ('pairs', int),
+    'cores_per_pod': ('core_per_pod', int),
+}
+
+
+def _column_mean(side, metric):
+    def mean(details):
+        return float(np.mean(details[f'{side}_data'][:, details['metadata'][metric]['position']]))
+    return mean
+
+
+def _worker_means(role):
+    def means(details):
+        # column means metric_store manifest cached for the log, if any
+        cached = details.get('summaries', {}).get(role)
+        if cached is not None:
+            return np.asarray(cached, dtype=np.float64)
+        return np.mean(details[role], axis=0)
+    return means
+
+
+# arrays plot functions read from an experiment
+PLOT_INPUTS = ('tx_data', 'rx_data') + WORKER_ROLES
+
+
+def _digest(details):
+    """sha1 of experiment fields and PLOT_INPUTS arrays, inference.py plot cache key."""
+    h = hashlib.sha1()
+    for field, (details_key, normalize) in FIELDS.items():
+        h.update(f"{field}={normalize(details[details_key])};".encode())
+    for name in PLOT_INPUTS:
+        value = details.get(name)
+        if value is None:
+            continue
+        value = np.ascontiguousarray(value)
+        h.update(f"{name}:{value.dtype}:{value.shape};".encode())
+        h.update(value.data)
+    return h.hexdigest()
+
+
+# aggregate name -> function of experiment details
+AGGREGATES = {
+    'tx_pps': _column_mean('tx', 'tx_pps'),
+    'rx_pps': _column_mean('rx', 'rx_pps'),
+    'tx_drop': _column_mean('tx', 'tx_drop'),
+    'rx_drop': _column_mean('rx', 'rx_drop'),
+    'irq_rate': _column_mean('tx', 'irq_rate'),
+    's_irq_rate': _column_mean('tx', 's_irq_rate'),
+    'tx_queue_means': _worker_means('tx_queues'),
+    'rx_queue_means': _worker_means('rx_queues'),
+    'tx_cpu_means': _worker_means('tx_cpu'),
+    'rx_cpu_means': _worker_means('rx_cpu'),
+    'digest': _digest,
+}
+
+
+class Dataset(Mapping):
+    """Experiments by key with hash indexes on FIELDS and cached aggregates."""
+
+    def __init__(self, entries, keys=None, _shared=None):
+        """
+        :param entries: dict key -> details, dataset_files_from_dict result
+        :param keys: keys of this view, default every entry
+        """
+        self._entries = entries
+        self._keys = list(entries) if keys is None else keys
+        self._key_set = set(self._keys)
+        # indexes and aggregates shared by all views of the same entries
+        self._shared = _shared if _shared is not None else {'indexes': {}, 'aggregates': {}}
+
+    @classmethod
+    def of(cls, dataset):
+        """Dataset as is, plain dict wrapped."""
+        return dataset if isinstance(dataset, cls) else cls(dataset)
+
+    def __getitem__(self, key):
+        if key not in self._key_set:
+            raise KeyError(key)
+        return self._entries[key]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    @staticmethod
+    def normalize(field, value):
+        return FIELDS[field][1](value)
+
+    def field(self, key, field):
+        """Normalized value of an index field of one experiment."""
+        details_key, normalize = FIELDS[field]
+        return normalize(self._entries[key][details_key])
+
+    def _index(self, fields):
+        """Hash index over all entries, value tuple -> keys in entry order."""
+        index = self._shared['indexes'].get(fields)
+        if index is None:
+            index = {}
+            for key in self._entries:
+                index.setdefault(tuple(self.field(key, f) for f in fields), []).append(key)
+            self._shared['indexes'][fields] = index
+        return index
+
+    def _view(self, keys):
+        return Dataset(self._entries, keys, self._shared)
+
+    def select(self, **conditions):
+        """Experiments whose fields equal the given values, None ignored.
+
+        :param conditions: any of size, cores, pps, pairs, cores_per_pod
+        :return: Dataset view
+        """
+        conditions = {f: v for f, v in conditions.items() if v is not None}
+        unknown = set(conditions) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"unknown fields {sorted(unknown)}, index fields are {list(FIELDS)}")
+        if not conditions:
+            return self
+        fields = tuple(sorted(conditions))
+        keys = self._index(fields).get(tuple(self.normalize(f, conditions[f]) for f in fields), [])
+        if len(self._keys) != len(self._entries):
+            keys = [k for k in keys if k in self._key_set]
+        return self._view(keys)
+
+    def groupby(self, *fields):
+        """Group experiments of this view.
+
+        :param fields: index fields
+        :return: dict value tuple -> Dataset view, sorted by value
+        """
+        groups = {}
+        for values, keys in self._index(tuple(fields)).items():
+            if len(self._keys) != len(self._entries):
+                keys = [k for k in keys if k in self._key_set]
+            if keys:
+                groups[values] = self._view(keys)
+        return dict(sorted(groups.items()))
+
+    def unique(self, field):
+        """Sorted distinct values of a field in this view."""
+        return sorted({self.field(key, field) for key in self._keys})
+
+    def aggregate(self, key, name):
+        """Per experiment aggregate, computed once.
+
+        :param key: experiment key
+        :param name: AGGREGATES name
+        """
+        cache = self._shared['aggregates']
+        if (key, name) not in cache:
+            cache[(key, name)] = AGGREGATES[name](self._entries[key])
+        return cache[(key, name)]
+
+    def sorted_by(self, field):
+        """(key, details) pairs of this view ordered by a field."""
+        return sorted(self.items(), key=lambda kv: self.field(kv[0], field))
@@ -86,14 +86,24 @@ function copy_queue_monitor() {
   scp monitor_queue_rate.sh "root@$tx_node_addr:/tmp/monitor_queue_rate.sh"
   echo "Copying monitor_queue_rate script to worker $rx_node_addr"
   scp monitor_queue_rate.sh "root@$rx_node_addr:/tmp/monitor_queue_rate.sh"
+  scp monitor_queue_rate.py "root@$tx_node_addr:/tmp/monitor_queue_rate.py"
+  scp monitor_queue_rate.py "root@$rx_node_addr:/tmp/monitor_queue_rate.py"
   echo "Copying monitor_txrx_int script to worker $tx_node_addr"
   scp monitor_txrx_int.sh "root@$tx_node_addr:/tmp/monitor_txrx_int.sh"
   echo "Copying monitor_txrx_int script to worker $rx_node_addr"
   scp monitor_txrx_int.sh "root@$rx_node_addr:/tmp/monitor_txrx_int.sh"
+  scp monitor_txrx_int.py "root@$tx_node_addr:/tmp/monitor_txrx_int.py"
+  scp monitor_txrx_int.py "root@$rx_node_addr:/tmp/monitor_txrx_int.py"
   echo "Copying monitor_softnet_stat script to worker $tx_node_addr"
   scp monitor_softnet_stat.py "root@$tx_node_addr:/tmp/monitor_softnet_stat.py"
   echo "Copying monitor_softnet_stat script to worker $rx_node_addr"
   scp monitor_softnet_stat.py "root@$rx_node_addr:/tmp/monitor_softnet_stat.py"
+  echo "Copying collector_common to workers $tx_node_addr $rx_node_addr"
+  scp collector_common.py "root@$tx_node_addr:/tmp/collector_common.py"
+  scp collector_common.py "root@$rx_node_addr:/tmp/collector_common.py"
+  echo "Copying node_agent to workers $tx_node_addr $rx_node_addr"
+  scp node_agent.py "root@$tx_node_addr:/tmp/node_agent.py"
+  scp node_agent.py "root@$rx_node_addr:/tmp/node_agent.py"
 }
 
 regenerate_monitor=false
@@ -173,6 +183,8 @@ function copy_pps_monitor() {
     (
       kubectl cp monitor_pps.sh "$client_pod":/tmp/monitor_pps.sh
       kubectl exec "$client_pod" -- chmod +x /tmp/monitor_pps.sh
+      kubectl cp monitor_pps.py "$client_pod":/tmp/monitor_pps.py
+      kubectl cp collector_common.py "$client_pod":/tmp/collector_common.py
     ) &
   done
 
@@ -184,6 +196,8 @@ function copy_pps_monitor() {
     (
       kubectl cp monitor_pps.sh "$server_pod":/tmp/monitor_pps.sh
       kubectl exec "$server_pod" -- chmod +x /tmp/monitor_pps.sh
+      kubectl cp monitor_pps.py "$server_pod":/tmp/monitor_pps.py
+      kubectl cp collector_common.py "$server_pod":/tmp/collector_common.py
     ) &
   done
   wait
@@ -213,6 +227,8 @@ execute_in_parallel() {
 
             kubectl cp monitor_pps.sh "$pod":/tmp/monitor_pps.sh
             kubectl exec "$pod" -- chmod +x /tmp/monitor_pps.sh
+            kubectl cp monitor_pps.py "$pod":/tmp/monitor_pps.py
+            kubectl cp collector_common.py "$pod":/tmp/collector_common.py
             kubectl exec "$pod" -- sh -c "env DEST_IP='$dst_addr' \
             /tmp/pkt_generate_template.sh -p ${PD_SIZE} -s ${SRC_PORT} -d ${DST_PORT} > /tmp/udp_$PD_SIZE.trafgen"
             kubectl exec "$pod" -- cat /tmp/udp_"$PD_SIZE".trafgen
@@ -9,7 +9,12 @@
 # Mus mbayramov@vwamrec.om
 """
 
+import hashlib
+import marshal
+import multiprocessing
 import os
+import re
+import time
 from typing import Optional, List, Tuple
 
 import numpy as np
@@ -17,6 +22,288 @@ import matplotlib.pyplot as plt
 import argparse
 import subprocess
 import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import metric_store
+import summary
+from dataset import Dataset
+from log_names import group_runs, parse_log_name, scan_logs
+from run_manifest import index_manifests, matches, parse_where
+from collector_common import TIMESTAMP_COLUMNS
+from profile_compiler import mean_frame_size
+
+# worker metrics where each tick is a block of rows (per queue / per cpu)
+TICK_BLOCK_METRICS = ('tx_pod_int', 'rx_pod_int', 'tx_softnet', 'rx_softnet')
+# plot output dir file, output file name -> plot_digest of its inputs
+PLOT_HASHES = '.plot_hashes.json'
+
+
+def read_columns_header(path: str) -> Optional[List[str]]:
+    """Read column names from "# columns:" header, collectors write it
+    with -T option, older logs have no header.
+
+    :param path: path to a log
+    :return: list of column names or None
+    """
+    with open(path) as f:
+        first = f.readline()
+    if first.startswith('# columns:'):
+        return first[len('# columns:'):].split()
+    return None
+
+
+def load_metric_file(
+        path: str,
+        delimiter: Optional[str] = None
+):
+    """Load collector log and split off timestamp columns.
+
+    :param path: path to a log
+    :param delimiter: ',' for pod logs, None for worker logs.
+    :return: tuple (data, timestamps) where timestamps is (n, 2) matrix
+             mono_ts, wall_ts or None if log has no timestamps.  data comes
+             from metric_store and is read only (memory mapped).
+    """
+    data, columns = metric_store.load(path, delimiter)
+    if columns and columns[-len(TIMESTAMP_COLUMNS):] == TIMESTAMP_COLUMNS:
+        return data[:, :-len(TIMESTAMP_COLUMNS)], data[:, -len(TIMESTAMP_COLUMNS):]
+    return data, None
+
+
+def sample_times(timestamps: np.ndarray) -> np.ndarray:
+    """Place samples on a wall clock time line.
+
+    Monotonic clock is smooth but per host, wall clock is common for
+    all hosts but can step (NTP).  We keep monotonic spacing and anchor
+    it to wall clock with median offset.
+
+    :param timestamps: (n, 2) mono_ts, wall_ts
+    :return: (n,) time of each sample in wall clock seconds
+    """
+    mono, wall = timestamps[:, 0], timestamps[:, 1]
+    return mono + np.median(wall - mono)
+
+
+def group_ticks(data: np.ndarray, times: np.ndarray):
+    """Group rows that belong to same tick, i.e. per queue rows of interrupts
+    or per cpu rows of softnet, incomplete last tick dropped.
+
+    :param data: (n, m) rows
+    :param times: (n,) time of each row
+    :return: tuple (ticks, rows per tick, m) array and (ticks,) times
+    """
+    starts = np.flatnonzero(np.r_[True, np.diff(times) != 0])
+    rows = int(np.median(np.diff(np.r_[starts, len(times)])))
+    n_ticks = len(times) // rows
+    data = data[:n_ticks * rows].reshape(n_ticks, rows, -1)
+    return data, times[:n_ticks * rows:rows]
+
+
+def align_to_grid(
+        times: np.ndarray,
+        values: np.ndarray,
+        grid: np.ndarray,
+        method: str = 'nearest'
+) -> np.ndarray:
+    """Re-sample values onto time grid.
+
+    :param times: (n,) sorted sample times
+    :param values: (n, ...) samples
+    :param grid: (g,) target times
+    :param method: nearest sample or linear interpolation
+    :return: (g, ...) values at grid points
+    """
+    if method == 'linear':
+        flat = values.reshape(len(times), -1)
+        out = np.empty((len(grid), flat.shape[1]))
+        for j in range(flat.shape[1]):
+            out[:, j] = np.interp(grid, times, flat[:, j])
+        return out.reshape((len(grid),) + values.shape[1:])
+
+    idx = np.clip(np.searchsorted(times, grid), 1, len(times) - 1)
+    idx -= (grid - times[idx - 1]) < (times[idx] - grid)
+    return values[idx]
+
+
+def load_aligned_experiment(
+        value: dict,
+        base_dir: str,
+        step: float = 1.0,
+        warmup: float = 0.0,
+        cooldown: float = 0.0,
+        method: str = 'nearest',
+        is_verbose: bool = False
+) -> Optional[dict]:
+    """Load all sources of one experiment and align them on common time grid.
+
+    Grid covers only interval where all sources have samples, trimmed
+    by warmup at start and cooldown at the end.  Logs without timestamps
+    are skipped.
+
+    :param value: experiment entry from combine_file_names
+    :param base_dir: metric dir
+    :param step: grid step in seconds
+    :param warmup: seconds trimmed at start
+    :param cooldown: seconds trimmed at end
+    :param method: 'nearest' or 'linear'
+    :param is_verbose:
+    :return: dict 'time' (g,), 'tx' / 'rx' (pods, g, metrics),
+             worker metrics (g, ...) or None if nothing to align.
+    """
+    series = {}
+    for pod_file in value.get('files', []):
+        data, ts = load_metric_file(pod_file, delimiter=',')
+        if ts is None:
+            if is_verbose:
+                print(f"Skipping {pod_file}, no timestamps")
+            continue
+        side = 'tx' if 'server' in os.path.basename(pod_file) else 'rx'
+        series.setdefault(side, []).append((sample_times(ts), data))
+
+    for metric_type, files in value.get('worker_metrics', {}).items():
+        if not files:
+            continue
+        data, ts = load_metric_file(os.path.join(base_dir, files[0]))
+        if ts is None:
+            if is_verbose:
+                print(f"Skipping {files[0]}, no timestamps")
+            continue
+        times = sample_times(ts)
+        if metric_type in TICK_BLOCK_METRICS:
+            data, times = group_ticks(data, times)
+        series[metric_type] = [(times, data)]
+
+    series = {k: [(t, d) for t, d in v if len(t) > 1] for k, v in series.items()}
+    series = {k: v for k, v in series.items() if v}
+    if not series:
+        return None
+
+    start = max(t[0] for v in series.values() for t, _ in v) + warmup
+    end = min(t[-1] for v in series.values() for t, _ in v) - cooldown
+    if end <= start:
+        return None
+
+    grid = np.arange(start, end, step)
+    aligned = {'time': grid}
+    for name, values in series.items():
+        resampled = [align_to_grid(t, d, grid, method) for t, d in values]
+        aligned[name] = np.stack(resampled) if name in ('tx', 'rx') else resampled[0]
+    return aligned
+
+
+def load_burst_windows(path: str) -> List[dict]:
+    """Load burst capture log written by monitor_pps.py / monitor_queue_rate.py --burst.
+
+    Log holds raw cumulative counters, here we convert each window to
+    per second rates using monotonic time between two samples.
+
+    :param path: path to a burst log
+    :return: list of dict, one per window with keys
+             'window', 'columns', 't_rel' (n,) seconds relative to trigger,
+             'wall_ts' (n,), 'rates' (n, metrics)
+    """
+    columns = read_columns_header(path)
+    if not columns or columns[:2] != ['window', 't_rel']:
+        raise ValueError(f"{path} is not a burst capture log")
+
+    data = np.loadtxt(path, ndmin=2)
+    names = columns[2:-len(TIMESTAMP_COLUMNS)]
+    windows = []
+    for window_id in np.unique(data[:, 0]):
+        rows = data[data[:, 0] == window_id]
+        if len(rows) < 2:
+            continue
+        counters = rows[:, 2:2 + len(names)]
+        mono = rows[:, -2]
+        dt = np.diff(mono)
+        rates = np.divide(np.diff(counters, axis=0), dt[:, None],
+                          out=np.zeros((len(dt), len(names))), where=dt[:, None] > 0)
+        windows.append({
+            'window': int(window_id),
+            'columns': names,
+            't_rel': rows[1:, 1],
+            'wall_ts': rows[1:, -1],
+            'rates': rates,
+        })
+    return windows
+
+
+def find_burst_files(directory: str) -> List[str]:
+    """Burst capture logs in metric dir, pod (burst-client / burst-server)
+    and worker (tx-burst-queue / rx-burst-queue).
+
+    :param directory: metric dir
+    :return: list of path
+    """
+    return sorted(os.path.join(directory, file) for file in os.listdir(directory)
+                  if 'burst' in file.split('_')[0] and file.endswith('.log'))
+
+
+def plot_burst_window(
+        window: dict,
+        output: Optional[str] = None,
+        title: str = ''
+):
+    """Plot one high resolution burst window, pps counters on top
+    and drop / ring full counters below, time in ms relative to trigger.
+
+    :param window: dict from load_burst_windows
+    :param output: Optional. Filepath to save the plot. If not provided, the plot will be displayed.
+    :param title: title prefix
+    :return:
+    """
+    t_ms = window['t_rel'] * 1000.0
+    rates = window['rates']
+    drop_cols = [i for i, name in enumerate(window['columns'])
+                 if 'drop' in name or 'ring_full' in name or 'err' in name]
+    pps_cols = [i for i, name in enumerate(window['columns'])
+                if i not in drop_cols and 'bytes' not in name]
+
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 8), sharex=True)
+    for i in pps_cols:
+        if np.any(rates[:, i]):
+            ax1.plot(t_ms, rates[:, i], label=window['columns'][i])
+    for i in drop_cols:
+        if np.any(rates[:, i]):
+            ax2.plot(t_ms, rates[:, i], label=window['columns'][i])
+
+    for ax in (ax1, ax2):
+        ax.axvline(x=0, color='r', linestyle='--')
+        ax.grid(True)
+        if ax.get_legend_handles_labels()[0]:
+            ax.legend(loc='upper left', fontsize='small')
+
+    ax1.set_ylabel('PPS')
+    ax2.set_ylabel('Drops / Ring full per second')
+    ax2.set_xlabel('Time relative to trigger (ms)')
+    ax1.set_title(f"{title} burst window {window['window']}")
+    plt.tight_layout()
+
+    if output:
+        plt.savefig(output)
+        print(f"Plot saved to {output}")
+        plt.close(fig)
+    else:
+        plt.show()
+
+
+def plot_burst_files(directory: str, output_dir: Optional[str] = None):
+    """Plot every window of every burst capture log in metric dir.
+
+    :param directory: metric dir
+    :param output_dir: a output dir for where we store plots
+    :return:
+    """
+    for path in find_burst_files(directory):
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            windows = load_burst_windows(path)
+        except ValueError as e:
+            print(f"Failed to load burst file: {path}: {e}")
+            continue
+        for window in windows:
+            output = os.path.join(output_dir, f"{name}_w{window['window']}.png") if output_dir else None
+            plot_burst_window(window, output=output, title=name.split('_')[0])
 
 
 def dataset_files(
@@ -104,21 +391,113 @@ def dataset_files(
                 if file.startswith('tx_'):
                     data_file = os.path.join(directory, file)
                     file_details[key]['tx'] = data_file
-                    file_details[key]['tx_data'] = np.loadtxt(data_file, delimiter=',')
+                    file_details[key]['tx_data'], _ = metric_store.load(data_file, ',')
 
                 else:
                     data_file = os.path.join(directory, file)
                     file_details[key]['rx'] = data_file
-                    np_data = np.loadtxt(data_file, delimiter=',')
+                    np_data, _ = metric_store.load(data_file, ',')
                     file_details[key]['rx_data'] = np_data
 
     return file_details
 
 
+def pod_name(path: str) -> str:
+    """Pod name from pod log name, server_<pod>_pr_..._ts_<ts>.log -> <pod>"""
+    name = os.path.basename(path)
+    return name.split('_', 1)[-1].split('_pr_', 1)[0]
+
+
+def pod_sort_key(path: str):
+    """Natural order of pod names, server2 before server10."""
+    return [int(t) if t.isdigit() else t for t in re.split(r'(\d+)', pod_name(path))]
+
+
+def stack_pod_data(arrays: List[np.ndarray], pad: bool = False) -> np.ndarray:
+    """Stack per pod logs into one preallocated (pods, samples, metrics) array.
+
+    Pods stop sampling a tick or two apart, so logs are trimmed to the
+    shortest one (or padded with NaN to the longest with pad).  Result is
+    C contiguous, reshape(-1, metrics) is a view in pod order.
+
+    :param arrays: (n_i, metrics) matrix per pod
+    :param pad: pad to longest log with NaN instead of trimming
+    :return: (pods, samples, metrics) array
+    """
+    n_metrics = arrays[0].shape[1]
+    if any(a.shape[1] != n_metrics for a in arrays):
+        raise ValueError(f"pod logs have different column counts {[a.shape[1] for a in arrays]}")
+    lengths = [len(a) for a in arrays]
+    n_samples = max(lengths) if pad else min(lengths)
+    out = np.full((len(arrays), n_samples, n_metrics), np.nan)
+    for i, a in enumerate(arrays):
+        n = min(len(a), n_samples)
+        out[i, :n] = a[:n]
+    return out
+
+
+def per_pod_mean(details: dict, side: str, metric: str) -> dict:
+    """Mean of a metric per pod.
+
+    :param details: one experiment of dataset_files_from_dict
+    :param side: 'tx' or 'rx'
+    :param metric: metadata key, i.e. 'tx_pps', 'rx_drop'
+    :return: dict pod name -> mean
+    """
+    position = details['metadata'][metric]['position']
+    means = np.nanmean(details[f'{side}_tensor'][:, :, position], axis=1)
+    return dict(zip(details[f'{side}_pods'], means.tolist()))
+
+
+def jain_index(values) -> float:
+    """Jain's fairness index, 1.0 when all pods get the same share."""
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0 or not np.any(values):
+        return float('nan')
+    return float(np.sum(values) ** 2 / (len(values) * np.sum(values ** 2)))
+
+
+def experiment_logs(value: dict, base_dir: str) -> List[Tuple[str, Optional[str]]]:
+    """Every log of one combine_file_names experiment with its delimiter."""
+    logs = [(f, ',') for f in value.get('files', [])]
+    for files in value.get('worker_metrics', {}).values():
+        logs.extend((os.path.join(base_dir, f), None) for f in files)
+    return logs
+
+
+def ingest_parallel(combine_files: dict, base_dir: str, jobs: int, is_verbose: bool = False):
+    """Parse logs of all experiments into metric_store across a process pool.
+
+    :param combine_files: combine_file_names dict
+    :param base_dir: metric dir
+    :param jobs: worker processes
+    :param is_verbose: print each finished experiment
+    :return: dict path -> error of logs that failed
+    """
+    failed = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(metric_store.ingest_logs, experiment_logs(value, base_dir)): data_key
+                   for data_key, value in combine_files.items()}
+        for future in as_completed(futures):
+            try:
+                errors = future.result()
+            except Exception as e:
+                errors = [(str(futures[future]), f"worker failed: {e}")]
+            for path, error in errors:
+                print(f"Failed to load file: {path}: {error}")
+                failed[path] = error
+            if is_verbose:
+                print(f"Ingested experiment {futures[future]}")
+    return failed
+
+
 def dataset_files_from_dict(
         combine_files: dict,
         base_dir: str,
-        is_verbose: bool = False
+        is_verbose: bool = False,
+        align_options: Optional[dict] = None,
+        jobs: int = 1,
+        failed: Optional[dict] = None
 ):
     """
     Load data from files listed in combine_files dictionary into numpy arrays.
@@ -126,9 +505,23 @@ def dataset_files_from_dict(
     :param base_dir:
     :param is_verbose:
     :param combine_files: Dictionary containing file information.
-    :return: Updated dictionary with loaded numpy arrays.
+    :param align_options: if set, kwargs for load_aligned_experiment
+                          (step, warmup, cooldown, method) and result
+                          stored under 'aligned' key.
+    :param jobs: with more than one, logs are first parsed into metric_store
+                 by a process pool and then loaded memory mapped, needs
+                 store enabled.
+    :param failed: path -> error of logs that already failed to parse
+                   (ingest_parallel result), skipped.
+    :return: Updated dictionary with loaded numpy arrays, per side
+             <side>_tensor (pods, samples, metrics), <side>_pods pod
+             names indexing it and <side>_data (pods * samples, metrics)
+             view of the tensor.
     """
     file_details = {}
+    failed = dict(failed or {})
+    if jobs > 1 and metric_store.enabled:
+        failed.update(ingest_parallel(combine_files, base_dir, jobs, is_verbose))
 
     for data_key, value in combine_files.items():
 
@@ -139,10 +532,10 @@ def dataset_files_from_dict(
         if not pod_files:
             continue
 
-        pps, pairs, frame_size, cores_per_pod = data_key
+        pps, pairs, frame_size, cores_per_pod, timestamp = data_key
         key = (f"pps_{pps}_pair_{pairs}_"
                f"cores_per_pod_{cores_per_pod}_"
-               f"cores_{'-'.join(str(c) for c in core_list)}_size_{frame_size}")
+               f"cores_{'-'.join(str(c) for c in core_list)}_size_{frame_size}_ts_{timestamp}")
 
         if key not in file_details:
             file_details[key] = {
@@ -153,6 +546,9 @@ def dataset_files_from_dict(
                 'core_per_pod': cores_per_pod,
                 'cores': core_list,
                 'size': frame_size,
+                'timestamp': timestamp,
+                'manifest': value.get('manifest'),
+                'summaries': {},
                 'metadata': {
                     'rx_pps': {'description': 'Received PPS', 'position': 0},
                     'tx_pps': {'description': 'Transmitted PPS', 'position': 1},
@@ -171,54 +567,88 @@ def dataset_files_from_dict(
                 }
             }
 
-        # load all metric collected form pods.
-        # all TX loaded as one matrix same for RX
-        for pod_file_name in pod_files:
-            if 'server' in pod_file_name:
-                if is_verbose:
-                    print("Loading server file: ", pod_file_name)
-                if 'tx_data' not in file_details[key]:
-                    file_details[key]['tx_data'] = np.loadtxt(pod_file_name, delimiter=',')
-                else:
-                    file_details[key]['tx_data'] = np.append(
-                        file_details[key]['tx_data'],
-                        np.loadtxt(pod_file_name, delimiter=','), axis=0)
-                file_details[key]['tx_files'].append(pod_file_name)
-            else:
-                if is_verbose:
-                    print("Loading client file: ", pod_file_name)
-                if 'rx_data' not in file_details[key]:
-                    file_details[key]['rx_data'] = np.loadtxt(pod_file_name, delimiter=',')
-                else:
-                    file_details[key]['rx_data'] = np.append(
-                        file_details[key]['rx_data'],
-                        np.loadtxt(pod_file_name, delimiter=','), axis=0)
-                    file_details[key]['rx_files'].append(pod_file_name)
+        # load all metric collected form pods into (pods, samples, metrics)
+        # tensor per side, tx_data / rx_data are flattened views of it.
+        sides = {'tx': [], 'rx': []}
+        for pod_file_name in sorted(pod_files, key=pod_sort_key):
+            side = 'tx' if 'server' in pod_file_name else 'rx'
+            if is_verbose:
+                print(f"Loading {'server' if side == 'tx' else 'client'} file: ", pod_file_name)
+            if pod_file_name in failed:
+                continue
+            try:
+                pod_data, _ = load_metric_file(pod_file_name, delimiter=',')
+            except ValueError as e:
+                print(f"Failed to load file: {pod_file_name}: {e}")
+                failed[pod_file_name] = str(e)
+                continue
+            if len(pod_data) == 0:
+                print(f"Warning: no samples in {pod_file_name}, pod skipped")
+                continue
+            sides[side].append((pod_file_name, pod_data))
+
+        for side, loaded in sides.items():
+            if not loaded:
+                continue
+            tensor = stack_pod_data([data for _, data in loaded])
+            file_details[key][f'{side}_files'].extend(f for f, _ in loaded)
+            file_details[key][f'{side}_pods'] = [pod_name(f) for f, _ in loaded]
+            file_details[key][f'{side}_tensor'] = tensor
+            file_details[key][f'{side}_data'] = tensor.reshape(-1, tensor.shape[2])
 
         # load metric collected from each worker node
         for metric_type, files in worker_metrics.items():
             for metric_file in files:
                 metric_full_path = os.path.join(base_dir, metric_file)
+                if metric_full_path in failed:
+                    continue
                 if is_verbose:
                     print(f"Loading metric type: {metric_type} file: {metric_full_path}")
                 try:
                     if metric_type not in file_details[key]:
-                        file_details[key][metric_type] = np.loadtxt(metric_full_path)
+                        file_details[key][metric_type], _ = load_metric_file(metric_full_path)
+                        entry = metric_store.indexed_entry(metric_full_path) if metric_store.enabled else None
+                        if entry is not None and entry['summary']['mean']:
+                            # column means cached by metric_store, timestamp columns dropped
+                            n_cols = file_details[key][metric_type].shape[1]
+                            file_details[key]['summaries'][metric_type] = entry['summary']['mean'][:n_cols]
                         if is_verbose:
                             print("Loaded shape", file_details[key][metric_type].shape)
                 except ValueError as e:
                     print(f"Failed to load file: {metric_full_path}")
                     print(f"Error occurred in file '{metric_full_path}' at line {e.__traceback__.tb_lineno}: {e}")
 
-        file_details[key]['tx_pod_cores'] = file_details[key]['tx_pod_int'].shape[1]
-        file_details[key]['rx_pod_cores'] = file_details[key]['rx_pod_int'].shape[1]
+        if align_options is not None:
+            file_details[key]['aligned'] = load_aligned_experiment(
+                value, base_dir, is_verbose=is_verbose, **align_options)
 
-        file_details[key]['tx_pod_n_queues'] = file_details[key]['tx_queues'].shape[1]
-        file_details[key]['rx_pod_n_queues'] = file_details[key]['rx_queues'].shape[1]
+        # worker logs that failed to load leave their counts out
+        for count, metric_type in (('tx_pod_cores', 'tx_pod_int'), ('rx_pod_cores', 'rx_pod_int'),
+                                   ('tx_pod_n_queues', 'tx_queues'), ('rx_pod_n_queues', 'rx_queues')):
+            if metric_type in file_details[key]:
+                file_details[key][count] = file_details[key][metric_type].shape[1]
 
     return file_details
 
 
+def mean_ci(values: np.ndarray, z: float = 1.96):
+    """Mean and half width of confidence interval (normal approximation,
+    95% by default), runs stopped at steady state have fewer samples so
+    we report interval next to the mean.
+
+    :param values: samples
+    :param z: z score
+    :return: tuple mean, half width
+    """
+    n = len(values)
+    if n == 0:
+        return float('nan'), float('nan')
+    mean = float(np.mean(values))
+    if n < 2:
+        return mean, float('nan')
+    return mean, float(z * np.std(values, ddof=1) / np.sqrt(n))
+
+
 def print_metric(dataset):
     """
     Process the files and calculate metrics and output meat value if we need
@@ -230,31 +660,54 @@ def print_metric(dataset):
         tx_data = details['tx_data']
         rx_data = details['rx_data']
 
-        mean_tx_pps = np.mean(tx_data[:, 1])
-        mean_rx_pps = np.mean(rx_data[:, 0])
+        position = {name: m['position'] for name, m in details['metadata'].items()}
+
+        mean_tx_pps, ci_tx_pps = mean_ci(tx_data[:, position['tx_pps']])
+        mean_rx_pps, ci_rx_pps = mean_ci(rx_data[:, position['rx_pps']])
 
-        tx_drop = tx_data[:, 2]
-        rx_drop = rx_data[:, 2]
-        tx_err = tx_data[:, 4]
-        rx_err = rx_data[:, 4]
+        tx_drop = tx_data[:, position['tx_drop']]
+        rx_drop = rx_data[:, position['rx_drop']]
+        tx_err = tx_data[:, position['tx_err']]
+        rx_err = rx_data[:, position['rx_err']]
 
         mean_tx_drop = np.mean(tx_drop)
         mean_rx_drop = np.mean(rx_drop)
         mean_tx_err = np.mean(tx_err)
         mean_rx_err = np.mean(rx_err)
 
+        # size is frame size or mix tag (imix, mix-64x7-1500x1), bps on L2 frames
+        frame_bytes = mean_frame_size(details['size'])
+        rx_offered = mean_rx_pps + mean_rx_drop
+        rx_drop_rate = mean_rx_drop / rx_offered if rx_offered > 0 else 0.0
+
         print(f"""
         Packet Size: {details['size']}
+        Mean Frame Size: {frame_bytes:.1f}
         Cores: {details['cores']}
         Target PPS: {details['pps']}
-        Mean TX PPS: {mean_tx_pps}
-        Mean RX PPS: {mean_rx_pps}
+        Samples TX / RX: {len(tx_data)} / {len(rx_data)}
+        Mean TX PPS: {mean_tx_pps} ± {ci_tx_pps:.1f} (95% CI)
+        Mean RX PPS: {mean_rx_pps} ± {ci_rx_pps:.1f} (95% CI)
+        Mean TX bps: {mean_tx_pps * frame_bytes * 8:.0f}
+        Mean RX bps: {mean_rx_pps * frame_bytes * 8:.0f}
+        RX Drop Rate: {rx_drop_rate:.6f}
         Mean TX Drop: {mean_tx_drop}
         Mean RX Drop: {mean_rx_drop}
         Mean TX Error: {mean_tx_err}
         Mean RX Error: {mean_rx_err}
         """)
 
+        tx_pod_pps = list(per_pod_mean(details, 'tx', 'tx_pps').values())
+        rx_pod_pps = list(per_pod_mean(details, 'rx', 'rx_pps').values())
+        rx_pod_drop = per_pod_mean(details, 'rx', 'rx_drop')
+        worst = max(rx_pod_drop, key=rx_pod_drop.get)
+        print(f"""        Pods TX / RX: {len(tx_pod_pps)} / {len(rx_pod_pps)}
+        Per pod TX PPS min / max: {min(tx_pod_pps):.1f} / {max(tx_pod_pps):.1f}
+        Per pod RX PPS min / max: {min(rx_pod_pps):.1f} / {max(rx_pod_pps):.1f}
+        RX PPS fairness (Jain): {jain_index(rx_pod_pps):.4f}
+        Max RX Drop pod: {worst} {rx_pod_drop[worst]:.1f}
+        """)
+
 
 def plot_drop_rate(
         dataset: dict,
@@ -272,23 +725,23 @@ def plot_drop_rate(
 
     plt.figure(figsize=(10, 6))
 
+    experiments = Dataset.of(dataset).select(size=size, cores=cores)
     for core in cores:
-        for key, details in dataset.items():
-            if details['size'] == size and details['cores'] == cores:
-                pps = details['pps']
-                tx_data = details['tx_data']
-                rx_data = details['rx_data']
+        for key, details in experiments.items():
+            pps = details['pps']
+            tx_data = details['tx_data']
+            rx_data = details['rx_data']
 
-                tx_pps = tx_data[:, 1]
-                tx_drop = tx_data[:, 3]
-                rx_pps = rx_data[:, 0]
-                rx_drop = rx_data[:, 2]
+            tx_pps = tx_data[:, 1]
+            tx_drop = tx_data[:, 3]
+            rx_pps = rx_data[:, 0]
+            rx_drop = rx_data[:, 2]
 
-                tx_drop_rate = np.divide(tx_drop, tx_pps, out=np.zeros_like(tx_drop), where=tx_pps != 0)
-                rx_drop_rate = np.divide(rx_drop, rx_pps, out=np.zeros_like(rx_drop), where=rx_pps != 0)
+            tx_drop_rate = np.divide(tx_drop, tx_pps, out=np.zeros_like(tx_drop), where=tx_pps != 0)
+            rx_drop_rate = np.divide(rx_drop, rx_pps, out=np.zeros_like(rx_drop), where=rx_pps != 0)
 
-                plt.scatter(tx_pps, tx_drop_rate, label=f"Core {core}, TX Drop Rate, Target PPS: {pps}")
-                plt.scatter(rx_pps, rx_drop_rate, label=f"Core {core}, RX Drop Rate, Target PPS: {pps}")
+            plt.scatter(tx_pps, tx_drop_rate, label=f"Core {core}, TX Drop Rate, Target PPS: {pps}")
+            plt.scatter(rx_pps, rx_drop_rate, label=f"Core {core}, RX Drop Rate, Target PPS: {pps}")
 
     plt.xlabel('PPS (Packets per Second)')
     plt.ylabel('Drop Rate')
@@ -325,13 +778,10 @@ def plot_tx_bound(
     target_pps_list = []
     observed_pps_list = []
 
-    for key, details in dataset.items():
-        if details['size'] == size and tuple(details['cores']) == tuple(cores):
-            target_pps = details['pps']
-            tx_data = details['tx_data']
-            observed_pps = np.mean(tx_data[:, 1])
-            target_pps_list.append(target_pps)
-            observed_pps_list.append(observed_pps)
+    experiments = Dataset.of(dataset).select(size=size, cores=cores)
+    for key, details in experiments.items():
+        target_pps_list.append(details['pps'])
+        observed_pps_list.append(experiments.aggregate(key, 'tx_pps'))
 
     sorted_indices = np.argsort(target_pps_list)
     sorted_target_pps = np.array(target_pps_list, dtype=float)[sorted_indices]
@@ -384,18 +834,11 @@ def plot_rx_bound(
     observed_tx_pps_list = []
     observed_rx_pps_list = []
 
-    for key, details in dataset.items():
-        if details['size'] == size and tuple(details['cores']) == tuple(cores):
-            target_pps = details['pps']
-            tx_data = details['tx_data']
-            rx_data = details['rx_data']
-
-            observed_tx_pps = np.mean(tx_data[:, 1])
-            observed_rx_pps = np.mean(rx_data[:, 0])
-
-            target_pps_list.append(float(target_pps))
-            observed_tx_pps_list.append(observed_tx_pps)
-            observed_rx_pps_list.append(observed_rx_pps)
+    experiments = Dataset.of(dataset).select(size=size, cores=cores)
+    for key, details in experiments.items():
+        target_pps_list.append(float(details['pps']))
+        observed_tx_pps_list.append(experiments.aggregate(key, 'tx_pps'))
+        observed_rx_pps_list.append(experiments.aggregate(key, 'rx_pps'))
 
     # Sorting by target PPS
     sorted_indices = np.argsort(target_pps_list)
@@ -463,58 +906,54 @@ def plot_tx_rx_interrupts(
     :return: None
     """
 
-    for key, details in dataset.items():
-        if (
-                details['size'] == size
-                and tuple(details['cores']) == tuple(cores)
-                and int(details['pps']) == int(pps)
-        ):
-            # data collected txrx is 9 entries.
-            # stride across 9 to compute aggregate.
-            # note interrupts in logs is rate sample each second
-            m = details[f'{side}_pod_int']
-            n_queue = int(np.max(m[:, 0]) + 1)
-            m = m[:, 1:]
-
-            n_cpu = m.shape[1]
-            n_samples = m.shape[0]
-
-            n_chunks = len(m) // n_queue
-            reshaped_m = m.reshape(n_chunks, n_cpu, -1)
-            reshaped_m = np.swapaxes(reshaped_m, 0, 1)
-            # num of cpu, num_queue
-            strided_sum = np.sum(reshaped_m, axis=1)
-            strided_sum = strided_sum.reshape(n_queue, n_cpu)
-
-            # filter cpu with zero interrupts
-            non_zero_cpu_ids = np.where(np.sum(strided_sum, axis=0) > 0)[0]
-            filtered_strided_sum = strided_sum[:, non_zero_cpu_ids]
-
-            fig = plt.figure(figsize=(18, 6))
-            ax = fig.add_subplot(111)
-
-            width = 0.25
-            for i, queue_id in enumerate(range(n_queue)):
-                x = np.arange(len(non_zero_cpu_ids))
-                ax.bar(x + i * width, filtered_strided_sum[queue_id],
-                       width=width, label=f'Queue {queue_id}', alpha=0.7)
-
-            ax.set_xlabel('core id')
-            ax.set_ylabel('Number of Interrupts per queue')
-            ax.set_title(f'({side.upper()} Side) Interrupts per Queue and CPU, pps {pps}')
-            ax.set_xticks(x + (n_queue - 1) * width / 2)
-            ax.set_xticklabels([f'{non_zero_cpu_ids[cpu_idx]}' for cpu_idx in range(len(non_zero_cpu_ids))])
-
-            details_text = f"PPS: {details['pps']} pps\n" \
-                           f"Side: {side.upper()} ({'Transmit' if side == 'tx' else 'Receive'})\n" \
-                           f"Cores Used: {cores}\nSize: {size}\nTolerance: {tolerance}\n" \
-                           f"Byte Size: {details['size']}"
-
-            plt.text(1.01, 0.5, details_text, fontsize=10,
-                     transform=ax.transAxes, verticalalignment='center')
-
-            ax.legend()
-            ax.grid(True)
+    experiments = Dataset.of(dataset).select(size=size, cores=cores, pps=pps)
+    for key, details in experiments.items():
+        # data collected txrx is 9 entries.
+        # stride across 9 to compute aggregate.
+        # note interrupts in logs is rate sample each second
+        m = details[f'{side}_pod_int']
+        n_queue = int(np.max(m[:, 0]) + 1)
+        m = m[:, 1:]
+
+        n_cpu = m.shape[1]
+        n_samples = m.shape[0]
+
+        n_chunks = len(m) // n_queue
+        reshaped_m = m.reshape(n_chunks, n_cpu, -1)
+        reshaped_m = np.swapaxes(reshaped_m, 0, 1)
+        # num of cpu, num_queue
+        strided_sum = np.sum(reshaped_m, axis=1)
+        strided_sum = strided_sum.reshape(n_queue, n_cpu)
+
+        # filter cpu with zero interrupts
+        non_zero_cpu_ids = np.where(np.sum(strided_sum, axis=0) > 0)[0]
+        filtered_strided_sum = strided_sum[:, non_zero_cpu_ids]
+
+        fig = plt.figure(figsize=(18, 6))
+        ax = fig.add_subplot(111)
+
+        width = 0.25
+        for i, queue_id in enumerate(range(n_queue)):
+            x = np.arange(len(non_zero_cpu_ids))
+            ax.bar(x + i * width, filtered_strided_sum[queue_id],
+                   width=width, label=f'Queue {queue_id}', alpha=0.7)
+
+        ax.set_xlabel('core id')
+        ax.set_ylabel('Number of Interrupts per queue')
+        ax.set_title(f'({side.upper()} Side) Interrupts per Queue and CPU, pps {pps}')
+        ax.set_xticks(x + (n_queue - 1) * width / 2)
+        ax.set_xticklabels([f'{non_zero_cpu_ids[cpu_idx]}' for cpu_idx in range(len(non_zero_cpu_ids))])
+
+        details_text = f"PPS: {details['pps']} pps\n" \
+                       f"Side: {side.upper()} ({'Transmit' if side == 'tx' else 'Receive'})\n" \
+                       f"Cores Used: {cores}\nSize: {size}\nTolerance: {tolerance}\n" \
+                       f"Byte Size: {details['size']}"
+
+        plt.text(1.01, 0.5, details_text, fontsize=10,
+                 transform=ax.transAxes, verticalalignment='center')
+
+        ax.legend()
+        ax.grid(True)
 
     plt.tight_layout()
 
@@ -549,51 +988,45 @@ def plot_queue_rate(
     :return: None
     """
 
-    for key, details in dataset.items():
-        if (
-                details['size'] == size
-                and tuple(details['cores']) == tuple(cores)
-                and int(details['pps']) == int(pps)
-        ):
-            queues_data = details[f'{side}_queues']
-
-            n_queues = n_qs * 2
-            queue_means = np.mean(queues_data, axis=0)
-            queue_means = queue_means[:n_qs * 2]
+    experiments = Dataset.of(dataset).select(size=size, cores=cores, pps=pps)
+    for key, details in experiments.items():
+        n_queues = n_qs * 2
+        queue_means = experiments.aggregate(key, f'{side}_queue_means')
+        queue_means = queue_means[:n_qs * 2]
 
-            fig, ax = plt.subplots(figsize=(12, 8))
+        fig, ax = plt.subplots(figsize=(12, 8))
 
-            index = np.arange(n_queues)
-            bar_width = 0.35
+        index = np.arange(n_queues)
+        bar_width = 0.35
 
-            tx_color = 'skyblue'
-            rx_color = 'orange'
+        tx_color = 'skyblue'
+        rx_color = 'orange'
 
-            tx_queue_means = queue_means[:n_qs]
-            rx_queue_means = queue_means[n_qs:]
+        tx_queue_means = queue_means[:n_qs]
+        rx_queue_means = queue_means[n_qs:]
 
-            ax.bar(index[:n_qs], tx_queue_means, bar_width, label=f'TX Queues PPS', color=tx_color)
-            ax.bar(index[n_qs:], rx_queue_means, bar_width, label=f'RX Queues PPS', color=rx_color)
+        ax.bar(index[:n_qs], tx_queue_means, bar_width, label=f'TX Queues PPS', color=tx_color)
+        ax.bar(index[n_qs:], rx_queue_means, bar_width, label=f'RX Queues PPS', color=rx_color)
 
-            if pps is not None:
-                ax.axhline(y=float(pps), color='r',
-                           linestyle='--', label=f'Target PPS ({pps})')
+        if pps is not None:
+            ax.axhline(y=float(pps), color='r',
+                       linestyle='--', label=f'Target PPS ({pps})')
 
-            ax.set_xlabel(f'Queue ID {n_qs}-TX / {n_qs} RX')
-            ax.set_ylabel('Total PPS')
-            ax.set_title(f'Mean PPS for POD-{side.upper()} Queue, Size {size}, Cores {cores} , pps {pps}')
-            ax.set_xticks(range(n_qs * 2))
-            ax.set_xticklabels([f'{i}' for i in range(n_qs * 2)])
-            ax.legend()
-            ax.grid(True, which="both", ls="-")
+        ax.set_xlabel(f'Queue ID {n_qs}-TX / {n_qs} RX')
+        ax.set_ylabel('Total PPS')
+        ax.set_title(f'Mean PPS for POD-{side.upper()} Queue, Size {size}, Cores {cores} , pps {pps}')
+        ax.set_xticks(range(n_qs * 2))
+        ax.set_xticklabels([f'{i}' for i in range(n_qs * 2)])
+        ax.legend()
+        ax.grid(True, which="both", ls="-")
 
-            plt.tight_layout()
+        plt.tight_layout()
 
-            if output:
-                plt.savefig(output)
-                print(f"Plot saved to {output}")
-            else:
-                plt.show()
+        if output:
+            plt.savefig(output)
+            print(f"Plot saved to {output}")
+        else:
+            plt.show()
 
 
 def plot_cpu_core_utilization(
@@ -617,41 +1050,36 @@ def plot_cpu_core_utilization(
     :return: None
     """
 
-    for key, details in dataset.items():
-        if (
-                details['size'] == size
-                and tuple(details['cores']) == tuple(cores)
-                and int(details['pps']) == int(pps)
-        ):
-            cpu_core_util = details[f'{side}_cpu']
-            n_cores = cpu_core_util.shape[1]
-            core_util_means = np.mean(cpu_core_util, axis=0)
-
-            fig, ax = plt.subplots(figsize=(12, 8))
-            index = np.arange(n_cores)
-            bar_width = 0.35
-
-            ax.bar(index, core_util_means, bar_width, label=f'Mean CPU Utilization')
-
-            ax.set_xlabel('Core ID')
-            ax.set_ylabel('Mean Utilization (%)')
-            ax.set_title(f'CPU Mean Core Utilization for '
-                         f'POD-{side.upper()} '
-                         f'Size {size}, '
-                         f'Cores {cores}, '
-                         f'Target PPS {pps}')
-            ax.set_xticks(index)
-            ax.set_xticklabels([f'{i}' for i in range(n_cores)])
-            ax.legend()
-            ax.grid(True, which="both", ls="-")
-
-            plt.tight_layout()
-
-            if output:
-                plt.savefig(output)
-                print(f"Plot saved to {output}")
-            else:
-                plt.show()
+    experiments = Dataset.of(dataset).select(size=size, cores=cores, pps=pps)
+    for key, details in experiments.items():
+        core_util_means = experiments.aggregate(key, f'{side}_cpu_means')
+        n_cores = len(core_util_means)
+
+        fig, ax = plt.subplots(figsize=(12, 8))
+        index = np.arange(n_cores)
+        bar_width = 0.35
+
+        ax.bar(index, core_util_means, bar_width, label=f'Mean CPU Utilization')
+
+        ax.set_xlabel('Core ID')
+        ax.set_ylabel('Mean Utilization (%)')
+        ax.set_title(f'CPU Mean Core Utilization for '
+                     f'POD-{side.upper()} '
+                     f'Size {size}, '
+                     f'Cores {cores}, '
+                     f'Target PPS {pps}')
+        ax.set_xticks(index)
+        ax.set_xticklabels([f'{i}' for i in range(n_cores)])
+        ax.legend()
+        ax.grid(True, which="both", ls="-")
+
+        plt.tight_layout()
+
+        if output:
+            plt.savefig(output)
+            print(f"Plot saved to {output}")
+        else:
+            plt.show()
 
 
 def combine_cpu_interrupt_plots(
@@ -675,68 +1103,63 @@ def combine_cpu_interrupt_plots(
 
     :return: None
     """
-    for key, details in dataset.items():
-        if (
-                details['size'] == size
-                and tuple(details['cores']) == tuple(cores)
-                and int(details['pps']) == int(pps)
-        ):
-            fig, ax1 = plt.subplots(figsize=(12, 8))
-
-            # utilization per core
-            cpu_core_util = details[f'{side}_cpu']
-            n_cores = cpu_core_util.shape[1]
-            core_util_means = np.mean(cpu_core_util, axis=0)
-
-            index = np.arange(n_cores)
-            bar_width = 0.35
-
-            ax1.bar(index, core_util_means, bar_width, label=f'Mean CPU Utilization')
-            ax1.set_xlabel('CPU ID')
-            ax1.set_ylabel('CPU Utilization (%)')
-            ax1.set_title(f'CPU Core Utilization % vs Interrupts % for '
-                          f'POD-{side.upper()} Queues\nSize {size}, '
-                          f'Cores {cores}, PPS {pps}')
-            ax1.set_xticks(index)
-            ax1.set_xticklabels([f'{i}' for i in range(n_cores)])
-            ax1.legend(loc='upper left')
-            ax1.grid(True, which="both", ls="-")
-
-            # Interrupts per queue and CPU.
-            m = details[f'{side}_pod_int']
-            n_queue = int(np.max(m[:, 0]) + 1)
-            m = m[:, 1:]
-            n_cpu = m.shape[1]
-
-            n_chunks = len(m) // n_queue
-            reshaped_m = m.reshape(n_chunks, n_cpu, -1)
-            reshaped_m = np.swapaxes(reshaped_m, 0, 1)
-            strided_sum = np.sum(reshaped_m, axis=1)
-            strided_sum = strided_sum.reshape(n_queue, n_cpu)
-
-            # calculate interrupt percentages
-            total_interrupts = np.sum(strided_sum)
-            core_interrupt_percentages = (strided_sum * 100) / total_interrupts
-            core_interrupt_normalized = np.sum(core_interrupt_percentages, axis=0, keepdims=True)
-
-            # plot interrupts per core
-            bottom = np.zeros(n_cores)
-            for i in range(n_queue):
-                ax1.bar(index, core_interrupt_percentages[i],
-                        bar_width, label=f'Queue {i} Interrupts (%)', bottom=bottom)
-                bottom += core_interrupt_percentages[i]
-
-            ax1.set_ylabel('Percentage')
-            ax1.legend(loc='upper right')
-            ax1.grid(True, which="both", ls="-")
-
-            plt.tight_layout()
-
-            if output:
-                plt.savefig(output)
-                print(f"Plot saved to {output}")
-            else:
-                plt.show()
+    experiments = Dataset.of(dataset).select(size=size, cores=cores, pps=pps)
+    for key, details in experiments.items():
+        fig, ax1 = plt.subplots(figsize=(12, 8))
+
+        # utilization per core
+        core_util_means = experiments.aggregate(key, f'{side}_cpu_means')
+        n_cores = len(core_util_means)
+
+        index = np.arange(n_cores)
+        bar_width = 0.35
+
+        ax1.bar(index, core_util_means, bar_width, label=f'Mean CPU Utilization')
+        ax1.set_xlabel('CPU ID')
+        ax1.set_ylabel('CPU Utilization (%)')
+        ax1.set_title(f'CPU Core Utilization % vs Interrupts % for '
+                      f'POD-{side.upper()} Queues\nSize {size}, '
+                      f'Cores {cores}, PPS {pps}')
+        ax1.set_xticks(index)
+        ax1.set_xticklabels([f'{i}' for i in range(n_cores)])
+        ax1.legend(loc='upper left')
+        ax1.grid(True, which="both", ls="-")
+
+        # Interrupts per queue and CPU.
+        m = details[f'{side}_pod_int']
+        n_queue = int(np.max(m[:, 0]) + 1)
+        m = m[:, 1:]
+        n_cpu = m.shape[1]
+
+        n_chunks = len(m) // n_queue
+        reshaped_m = m.reshape(n_chunks, n_cpu, -1)
+        reshaped_m = np.swapaxes(reshaped_m, 0, 1)
+        strided_sum = np.sum(reshaped_m, axis=1)
+        strided_sum = strided_sum.reshape(n_queue, n_cpu)
+
+        # calculate interrupt percentages
+        total_interrupts = np.sum(strided_sum)
+        core_interrupt_percentages = (strided_sum * 100) / total_interrupts
+        core_interrupt_normalized = np.sum(core_interrupt_percentages, axis=0, keepdims=True)
+
+        # plot interrupts per core
+        bottom = np.zeros(n_cores)
+        for i in range(n_queue):
+            ax1.bar(index, core_interrupt_percentages[i],
+                    bar_width, label=f'Queue {i} Interrupts (%)', bottom=bottom)
+            bottom += core_interrupt_percentages[i]
+
+        ax1.set_ylabel('Percentage')
+        ax1.legend(loc='upper right')
+        ax1.grid(True, which="both", ls="-")
+
+        plt.tight_layout()
+
+        if output:
+            plt.savefig(output)
+            print(f"Plot saved to {output}")
+        else:
+            plt.show()
 
 
 def plot_irq_sw_irq_rate(
@@ -759,20 +1182,11 @@ def plot_irq_sw_irq_rate(
     irq_rates_list = []
     sirq_rates_list = []
 
-    for key, details in dataset.items():
-        if details['size'] == size and cores == details['cores']:
-            target_pps = details['pps']
-            tx_data = details['tx_data']
-
-            irq_idx = details['metadata']['irq_rate']['position']
-            sirq_idx = details['metadata']['s_irq_rate']['position']
-
-            irq_rate = np.mean(tx_data[:, irq_idx])
-            sirq_rate = np.mean(tx_data[:, sirq_idx])
-
-            target_pps_list.append(target_pps)
-            irq_rates_list.append(irq_rate)
-            sirq_rates_list.append(sirq_rate)
+    experiments = Dataset.of(dataset).select(size=size, cores=cores)
+    for key, details in experiments.items():
+        target_pps_list.append(details['pps'])
+        irq_rates_list.append(experiments.aggregate(key, 'irq_rate'))
+        sirq_rates_list.append(experiments.aggregate(key, 's_irq_rate'))
 
     sorted_indices = np.argsort(target_pps_list)
     sorted_target_pps = np.array(target_pps_list)[sorted_indices]
@@ -802,6 +1216,169 @@ def plot_irq_sw_irq_rate(
         plt.show()
 
 
+def plot_jobs(
+        metric_dataset: dict,
+        plot_type: str,
+        plotter: callable,
+        output_dir=None,
+        **kwargs
+):
+    """Plot jobs of one plot type, one per (size, cores) group.
+
+    :param metric_dataset:  a metric dataset.
+    :param plot_type:  a type i.e. description for a callback what is plotting
+    :param plotter: a callback that will use to plot
+    :param output_dir: a output dir for where we store plots
+    :return: list of (output file or None, plotter, size, cores, kwargs)
+    """
+    # only (size, cores) groups that have experiments at the plotted pps
+    grouped_experiments = Dataset.of(metric_dataset).select(pps=kwargs.get('pps')).groupby('size', 'cores')
+
+    jobs = []
+    for size, cores in grouped_experiments:
+        core_str = '-'.join(map(str, cores))
+        output_file = None
+        if output_dir:
+            output_file = os.path.join(output_dir, f"{plot_type}_{size}_cores_{core_str}.png")
+        jobs.append((output_file, plotter, size, list(cores), kwargs))
+    return jobs
+
+
+def plot_digest(metric_dataset: Dataset, job: tuple) -> str:
+    """Content hash of a plot job, plotter code, parameters and the
+    digest of every experiment the plotter selects.
+    """
+    _, plotter, size, cores, kwargs = job
+    h = hashlib.sha1(marshal.dumps(plotter.__code__))
+    h.update(repr((plotter.__name__, size, cores, sorted(kwargs.items()))).encode())
+    for key in metric_dataset.select(size=size, cores=cores, pps=kwargs.get('pps')):
+        h.update(metric_dataset.aggregate(key, 'digest').encode())
+    return h.hexdigest()
+
+
+def load_plot_hashes(output_dir: str) -> dict:
+    """output file name -> plot_digest of plots already in output_dir."""
+    try:
+        with open(os.path.join(output_dir, PLOT_HASHES)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_plot_hashes(output_dir: str, hashes: dict):
+    path = os.path.join(output_dir, PLOT_HASHES)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(hashes, f, indent=4, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# dataset of plot workers, set by _init_plot_worker, inherited on fork
+_plot_dataset = None
+
+
+def _init_plot_worker(metric_dataset):
+    global _plot_dataset
+    plt.switch_backend('Agg')
+    _plot_dataset = metric_dataset
+
+
+def _render_plot(job: tuple):
+    """Run one plot job, every figure it opened closed after.
+
+    :return: error string or None
+    """
+    output_file, plotter, size, cores, kwargs = job
+    try:
+        plotter(_plot_dataset, size, cores, output=output_file, **kwargs)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    finally:
+        plt.close('all')
+    return None
+
+
+def render_plots(metric_dataset: dict, jobs: list, workers: int = 1, force: bool = False):
+    """Render plot jobs, deduplicated by output file.
+
+    Jobs with an output file render with Agg across a process pool and are
+    skipped when the plot_digest saved for that file in PLOT_HASHES of its
+    dir matches and the file exists.  Jobs without an output file are
+    shown interactively one by one.
+
+    :param metric_dataset: a metric dataset.
+    :param jobs: plot_jobs results
+    :param workers: worker processes
+    :param force: render even when digest matches
+    :return: (rendered, skipped, failed) counts
+    """
+    global _plot_dataset
+    metric_dataset = Dataset.of(metric_dataset)
+    unique_jobs = {}
+    interactive = []
+    for job in jobs:
+        if job[0] is None:
+            interactive.append(job)
+        else:
+            unique_jobs.setdefault(job[0], job)
+
+    hashes = {}
+    pending = []
+    skipped = 0
+    for output_file, job in unique_jobs.items():
+        output_dir, name = os.path.split(output_file)
+        if output_dir not in hashes:
+            hashes[output_dir] = load_plot_hashes(output_dir)
+        digest = plot_digest(metric_dataset, job)
+        if not force and hashes[output_dir].get(name) == digest and os.path.exists(output_file):
+            skipped += 1
+            continue
+        hashes[output_dir].pop(name, None)
+        pending.append((job, digest))
+
+    failed = 0
+    if pending:
+        backend = plt.get_backend()
+        results = []
+        if workers > 1 and len(pending) > 1:
+            # fork shares the loaded dataset with workers instead of pickling it
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=context,
+                                     initializer=_init_plot_worker, initargs=(metric_dataset,)) as pool:
+                futures = {pool.submit(_render_plot, job): (job, digest) for job, digest in pending}
+                for future in as_completed(futures):
+                    try:
+                        error = future.result()
+                    except Exception as e:
+                        error = f"worker failed: {e}"
+                    results.append((futures[future], error))
+        else:
+            _init_plot_worker(metric_dataset)
+            results = [((job, digest), _render_plot(job)) for job, digest in pending]
+            _plot_dataset = None
+            if plt.get_backend() != backend:
+                plt.switch_backend(backend)
+        for (job, digest), error in results:
+            output_dir, name = os.path.split(job[0])
+            if error:
+                print(f"Warning: plot {job[0]} failed: {error}")
+                failed += 1
+            else:
+                hashes[output_dir][name] = digest
+        for output_dir, dir_hashes in hashes.items():
+            try:
+                save_plot_hashes(output_dir, dir_hashes)
+            except OSError as e:
+                print(f"Warning: plot hashes not saved in {output_dir}: {e}")
+
+    for output_file, plotter, size, cores, kwargs in interactive:
+        plotter(metric_dataset, size, cores, output=None, **kwargs)
+        plt.close('all')
+
+    return len(pending) - failed + len(interactive), skipped, failed
+
+
 def plot_stats(
         metric_dataset: dict,
         plot_type: str,
@@ -818,39 +1395,34 @@ def plot_stats(
     :param output_dir: a output dir for where we store plots
     :return:
     """
-    grouped_experiments = set()
-    for key, details in metric_dataset.items():
-        size = details['size']
-        cores = tuple(details['cores'])
-        grouped_experiments.add((size, cores))
-
-    for experiment in grouped_experiments:
-        core_str = '-'.join(map(str, experiment[1]))
-        if output_dir:
-            output_file = os.path.join(
-                output_dir,
-                f"{plot_type}_{experiment[0]}_cores_{core_str}.png"
-            )
-        else:
-            output_file = None
-
-        if kwargs:
-            plotter(metric_dataset, experiment[0],
-                    list(experiment[1]), output=output_file, **kwargs)
-        else:
-            plotter(metric_dataset, experiment[0],
-                    list(experiment[1]), output=output_file)
+    render_plots(metric_dataset, plot_jobs(metric_dataset, plot_type, plotter, output_dir, **kwargs))
 
 
 def run_sampling(
         pps_values: List[int],
-        num_cores: List[int]
+        num_cores: List[int],
+        legacy: bool = False,
+        converge: bool = False
 ):
     """Rn sampling script for each target pps.
+
+    By default, orchestrator.py runs the whole sweep, pods and nodes
+    discovered once and remote commands run concurrently, legacy
+    runs ./run_monitor_pps.sh for each point.
+
     :param pps_values: list of pps value we collect samples for.
     :param num_cores: num cores to collect samples for.
+    :param legacy: run ./run_monitor_pps.sh serially.
+    :param converge: stop each run once rates reach steady state.
     :return:
     """
+    if not legacy:
+        import asyncio
+        from orchestrator import run_sweep
+        asyncio.run(run_sweep(pps_values, num_cores, converge=converge))
+        print("Sampling completed.")
+        return
+
     for pps in pps_values:
         for num_core in num_cores:
             print(f"Running sampling for {pps} pps , core count {num_core} ...")
@@ -863,54 +1435,50 @@ def run_sampling(
     print("Sampling completed.")
 
 
-def find_files(
-        key: Tuple[int, int, int, int],
-        files_dict: dict
+def run_rate_search(
+        num_cores: List[int],
+        sizes: List[int],
+        drop_threshold: float = 0.001,
+        trial_seconds: int = 20
 ):
+    """Search max lossless rate for each core count and frame size
+    (orchestrator.py --search) instead of a fixed pps sweep.
+
+    :param num_cores: num cores to search for.
+    :param sizes: frame sizes to search for.
+    :param drop_threshold: max loss ratio of a passing trial.
+    :param trial_seconds: length of each trial.
+    :return: list of search results, also written to metric dir.
     """
-    Find files corresponding to the given key in the dictionary.
-    Key is pps
+    import asyncio
+    from orchestrator import run_search
+    return asyncio.run(run_search(num_cores, sizes, trial_args={'threshold': drop_threshold},
+                                  runtime=trial_seconds))
 
-    :param key: A tuple representing (pps, pairs, size, cores).
-    :param files_dict: A dictionary containing lists of files for different types
-    (tx_pod_int, rx_pod_int, tx_queues, rx_queues).
-    :return: A dictionary containing file lists for each type corresponding to the key.
-    """
-    pps, pairs, size, cores = key
-    result_files = {}
-
-    for file_type, files_list in files_dict.items():
-        # format of file we expect
-        found_files = [file for file in files_list
-                       if f"pr_{pps}_" in file and f"pairs_{pairs}_" in file
-                       and f"size_{size}_" in file and f"cores_{cores}_" in file]
-        result_files[file_type] = found_files
-
-    return result_files
 
-
-def combine_file_names(directory):
+def combine_file_names(directory, where: Optional[dict] = None, names: Optional[List[str]] = None):
     """
-    Combines file names under same experiment.
-    based on PPS rate, number of pairs, and size.
+    Combines file names under same run.  Runs with a run_*.json manifest
+    (run_manifest.py) are indexed from it alone, logs of older runs by one
+    os.scandir pass, names parsed by log_names.py.  Repeated runs of the
+    same pps, pairs, size and cores are kept apart by timestamp of pod logs,
+    worker logs go to the closest run.
 
-    This method create single dict consisting of all files related to experiment.
+    This method create single dict consisting of all files related to run.
 
     Example:
     {
-        "200000 3 64 1": {
+        ("200000", "3", "64", "1", "20240406063337"): {
+            "timestamp": "20240406063337",
             "core_list": [
                 "2",
                 "4",
                 "6"
             ],
             "files": [
-                "/Users/spyroot/dev/trafgen/src/metrics/server_server2-ve-56377f29-e603-11ee-a122-179ee4765847_pr_200000_runtime_120_cores_1_pairs_3_size_64_core_list_6_ts_20240406063337.log",
-                "/Users/spyroot/dev/trafgen/src/metrics/server_server1-ve-56377f29-e603-11ee-a122-179ee4765847_pr_200000_runtime_120_cores_1_pairs_3_size_64_core_list_4_ts_20240406063337.log",
-                "/Users/spyroot/dev/trafgen/src/metrics/client_client0-ve-56377f29-e603-11ee-a122-179ee4765847_pr_200000_runtime_120_cores_1_pairs_3_size_64_core_list_2_ts_20240406063337.log",
-                "/Users/spyroot/dev/trafgen/src/metrics/client_client1-ve-56377f29-e603-11ee-a122-179ee4765847_pr_200000_runtime_120_cores_1_pairs_3_size_64_core_list_4_ts_20240406063337.log",
                 "/Users/spyroot/dev/trafgen/src/metrics/server_server0-ve-56377f29-e603-11ee-a122-179ee4765847_pr_200000_runtime_120_cores_1_pairs_3_size_64_core_list_2_ts_20240406063337.log",
-                "/Users/spyroot/dev/trafgen/src/metrics/client_client2-ve-56377f29-e603-11ee-a122-179ee4765847_pr_200000_runtime_120_cores_1_pairs_3_size_64_core_list_6_ts_20240406063337.log"
+                "/Users/spyroot/dev/trafgen/src/metrics/client_client0-ve-56377f29-e603-11ee-a122-179ee4765847_pr_200000_runtime_120_cores_1_pairs_3_size_64_core_list_2_ts_20240406063337.log",
+                ...
             ],
             "worker_metrics": {
                 "tx_pod_int": [
@@ -922,77 +1490,39 @@ def combine_file_names(directory):
                 "tx_queues": [
                     "tx-pod-queue_pr_200000_runtime_120_cores_1_pairs_3_size_64_ts_20240406063334.log"
                 ],
-                "rx_queues": [
-                    "rx-pod-queue_pr_200000_runtime_120_cores_1_pairs_3_size_64_ts_20240406063334.log"
-                ]
+                ...
+                "tx_softnet": [
+                    "tx-softnet-stat_200000_runtime_120_cores_1_pairs_3_size_64_ts_20240406063334.log"
+                ],
+                ...
             }
         }
     }
 
     :param directory: The directory where the files are located.
-    :return: A dictionary where keys are (PPS rate, number of pairs, size) tuples
-    and values are lists of paths to combined files.
+    :param where: optional run_manifest.parse_where conditions, i.e. {'kernel': '6.1.0'},
+                  only runs with a matching manifest are kept.
+    :param names: log names of the dir, i.e. metric_store manifest files,
+                  the dir is scanned when None.
+    :return: A dictionary where keys are (PPS rate, number of pairs, size, cores, timestamp)
+    tuples and values are lists of paths to combined files, 'manifest' key for runs with one.
     """
-    pod_files = [file for file in os.listdir(directory)
-                 if (file.startswith('server_server') or
-                     file.startswith('client_client')) and file.endswith('.log')]
-
-    tx_pod_int_files = [file for file in os.listdir(directory)
-                        if (file.startswith('tx-pod-int')) and file.endswith('.log')]
-    rx_pod_int_files = [file for file in os.listdir(directory)
-                        if (file.startswith('rx-pod-int')) and file.endswith('.log')]
-
-    tx_queues_files = [file for file in os.listdir(directory)
-                       if (file.startswith('tx-pod-queue')) and file.endswith('.log')]
-    rx_queues_files = [file for file in os.listdir(directory)
-                       if (file.startswith('rx-pod-queue')) and file.endswith('.log')]
-
-    tx_cpu_files = [file for file in os.listdir(directory)
-                    if file.startswith('tx-pod-cpu') and file.endswith('.log')]
-    rx_cpu_files = [file for file in os.listdir(directory)
-                    if file.startswith('rx-pod-cpu') and file.endswith('.log')]
-
-    tx_softnet_files = [file for file in os.listdir(directory)
-                    if file.startswith('tx-softnet-stat') and file.endswith('.log')]
-    rx_softnet_files = [file for file in os.listdir(directory)
-                    if file.startswith('rx-softnet-stat') and file.endswith('.log')]
-
-    # all stats per experiment collected from worker node
-    files_dict = {
-        'tx_pod_int': tx_pod_int_files,
-        'rx_pod_int': rx_pod_int_files,
-        'tx_queues': tx_queues_files,
-        'rx_queues': rx_queues_files,
-        'tx_cpu': tx_cpu_files,
-        'rx_cpu': rx_cpu_files,
-        'tx_softnet': tx_softnet_files,
-        'rx_softnet': rx_softnet_files
-
-    }
-
-    combined_files = {}
-    for file in pod_files:
-        file_parts = file.split('_')
-        pps = file_parts[3].replace('pps', '')
-        cores = file_parts[7]
-        pairs = file_parts[9]
-        size = file_parts[11]
-        core_list = file_parts[14]
-        key = (pps, pairs, size, cores)
-
-        worker_metric_files = find_files(key, files_dict)
-
-        if key not in combined_files:
-            combined_files[key] = {'core_list': set(), 'files': [], 'worker_metrics': {}}
-
-        combined_files[key]['core_list'].add(core_list)
-        combined_files[key]['files'].append(os.path.join(directory, file))
-        combined_files[key]['worker_metrics'].update(worker_metric_files)
-
-    for key, value in combined_files.items():
-        value['core_list'] = sorted(set(value['core_list']))
-
-    return combined_files
+    combined_files = index_manifests(directory)
+    if where:
+        return {k: v for k, v in sorted(combined_files.items()) if matches(v['manifest'], where)}
+
+    indexed = {os.path.basename(f) for v in combined_files.values() for f in v['files']}
+    indexed.update(f for v in combined_files.values() for files in v['worker_metrics'].values() for f in files)
+    logs = scan_logs(directory) if names is None else filter(None, map(parse_log_name, names))
+    legacy = [log for log in logs if log.name not in indexed]
+    for key, run in group_runs(legacy).items():
+        combined_files[key] = {
+            'timestamp': key[-1],
+            'core_list': sorted({log.core_list for log in run['pods']}),
+            'files': [os.path.join(directory, log.name) for log in run['pods']],
+            'worker_metrics': {role: [log.name for log in logs] for role, logs in run['worker'].items()},
+        }
+    return dict(sorted(combined_files.items()))
 
 
 def merge_file(
@@ -1023,14 +1553,21 @@ def merge_files(
     for server and client pods.
 
     :param combined_files: A dictionary where keys are
-                           (PPS rate, number of pairs, size, cores, core list)
+                           (PPS rate, number of pairs, size, cores, timestamp)
     tuples and values are lists of paths to combined files.
     :param metric_dir: The directory where the merged files will be saved.
     """
+    # repeated runs of one point go to the same merged file, name has no timestamp
+    merged = {}
     for key, file_data in combined_files.items():
+        entry = merged.setdefault(key[:4], {'files': [], 'core_list': set()})
+        entry['files'].extend(file_data['files'])
+        entry['core_list'].update(file_data['core_list'])
+
+    for key, file_data in merged.items():
         pps, pairs, size, cores = key
         files_list = file_data['files']
-        cores_list = file_data['core_list']
+        cores_list = sorted(file_data['core_list'])
         cores_list_str = "_".join(map(str, cores_list))
         server_files = [file for file in files_list if 'server_server' in file]
         client_files = [file for file in files_list if 'client_client' in file]
@@ -1071,22 +1608,56 @@ def main(cmd):
     """
 
     if cmd.sample:
-        run_sampling(cmd.pps_values, cmd.cores)
+        run_sampling(cmd.pps_values, cmd.cores, legacy=cmd.legacy_sampling, converge=cmd.converge)
+
+    if cmd.search:
+        run_rate_search(cmd.cores, cmd.sizes, cmd.drop_threshold, cmd.trial_seconds)
 
     if cmd.output_dir:
         os.makedirs(cmd.output_dir, exist_ok=True)
 
     directory = os.path.join(os.getcwd(), cmd.metric_dir)
-    combine_files = combine_file_names(directory)
+    if cmd.jobs == 0:
+        cmd.jobs = os.cpu_count() or 1
+    if cmd.no_store:
+        metric_store.enabled = False
+        if cmd.jobs > 1:
+            print("Warning: --jobs needs metric store, loading sequentially with --no_store")
+    names = None
+    failed = {}
+    if metric_store.enabled:
+        # only logs new since last run are parsed, across the pool with --jobs,
+        # logs are then listed and loaded through the manifest
+        try:
+            manifest, changed, reused, removed, failed = metric_store.update_manifest(
+                directory, is_verbose=cmd.debug, jobs=cmd.jobs)
+            names = list(manifest['files'])
+            print(f"Metric store: {changed} new / changed logs, {reused} up to date, {removed} removed")
+        except OSError as e:
+            print(f"Warning: metric store manifest not updated: {e}")
+    combine_files = combine_file_names(directory, parse_where(cmd.where), names)
 
     if cmd.debug:
         sample_key, sample_value = next(iter(combine_files.items()))
         print(json.dumps(sample_value, indent=4))
 
-    metric_dataset = dataset_files_from_dict(combine_files, directory)
+    align_options = None
+    if cmd.align:
+        align_options = {
+            'step': cmd.grid_step,
+            'warmup': cmd.warmup,
+            'cooldown': cmd.cooldown,
+            'method': cmd.join,
+        }
+
+    metric_dataset = Dataset(dataset_files_from_dict(combine_files, directory, align_options=align_options,
+                                                    failed=failed))
     if cmd.debug:
         sample_entry(metric_dataset)
 
+    if cmd.burst:
+        plot_burst_files(directory, output_dir=cmd.output_dir)
+
     experiments_dir = os.path.join(directory, "experiments")
     if not os.path.exists(experiments_dir):
         os.makedirs(experiments_dir)
@@ -1094,65 +1665,54 @@ def main(cmd):
     if cmd.print_metric:
         print_metric(metric_dataset)
 
-    plot_stats(metric_dataset, "tx_bounded", plot_tx_bound, output_dir=cmd.output_dir)
-    plot_stats(metric_dataset, "rx_bounded", plot_rx_bound, output_dir=cmd.output_dir)
-    plot_stats(metric_dataset, "drop_bounded", plot_drop_rate, output_dir=cmd.output_dir)
-    plot_stats(metric_dataset, "sw_irq_bounded", plot_irq_sw_irq_rate, output_dir=cmd.output_dir)
-
-    all_pps_values = [details['pps'] for details in metric_dataset.values()]
-
-    for pps in all_pps_values:
-        plot_stats(metric_dataset,
-                   f"plot_txrx_interrupts_rx_pps_{pps}",
-                   plot_tx_rx_interrupts,
-                   output_dir=cmd.output_dir,
-                   pps=pps,
-                   side='rx')
-
-        plot_stats(metric_dataset,
-                   f"plot_txrx_interrupts_tx_pps_{pps}",
-                   plot_tx_rx_interrupts,
-                   output_dir=cmd.output_dir,
-                   pps=pps,
-                   side='tx')
-
-    for pps in all_pps_values:
-        plot_stats(metric_dataset,
-                   f"plot_rx_queue_rate_rx_pps_{pps}",
-                   plot_queue_rate,
-                   output_dir=cmd.output_dir,
-                   pps=pps,
-                   side='rx')
-
-        plot_stats(metric_dataset,
-                   f"plot_queue_rate_tx_pps_{pps}",
-                   plot_queue_rate,
-                   output_dir=cmd.output_dir,
-                   pps=pps,
-                   side='tx')
-
-    for pps in all_pps_values:
-        plot_stats(metric_dataset,
-                   f"plot_cpu_core_utilization_rx_pps_{pps}",
-                   plot_cpu_core_utilization,
-                   output_dir=cmd.output_dir,
-                   pps=pps,
-                   side='rx')
-
-        plot_stats(metric_dataset,
-                   f"plot_cpu_core_utilization_tx_pps_{pps}",
-                   plot_cpu_core_utilization,
-                   output_dir=cmd.output_dir,
-                   pps=pps,
-                   side='tx')
-
-    for pps in all_pps_values:
-        plot_stats(metric_dataset,
-                   f"combine_tx_cpu_interrupt_plots_{pps}",
-                   combine_cpu_interrupt_plots,
-                   output_dir=cmd.output_dir,
-                   pps=pps,
-                   side='tx')
+    if cmd.summary:
+        summary.save(summary.summarize(metric_dataset, n_boot=cmd.n_boot), cmd.summary)
+        print(f"Summary of {len(metric_dataset)} experiments written to {cmd.summary}")
+
+    jobs = []
+    jobs += plot_jobs(metric_dataset, "tx_bounded", plot_tx_bound, output_dir=cmd.output_dir)
+    jobs += plot_jobs(metric_dataset, "rx_bounded", plot_rx_bound, output_dir=cmd.output_dir)
+    jobs += plot_jobs(metric_dataset, "drop_bounded", plot_drop_rate, output_dir=cmd.output_dir)
+    jobs += plot_jobs(metric_dataset, "sw_irq_bounded", plot_irq_sw_irq_rate, output_dir=cmd.output_dir)
+
+    for pps in metric_dataset.unique('pps'):
+        for side in ('rx', 'tx'):
+            jobs += plot_jobs(metric_dataset,
+                              f"plot_txrx_interrupts_{side}_pps_{pps}",
+                              plot_tx_rx_interrupts,
+                              output_dir=cmd.output_dir,
+                              pps=pps,
+                              side=side)
+        jobs += plot_jobs(metric_dataset,
+                          f"plot_rx_queue_rate_rx_pps_{pps}",
+                          plot_queue_rate,
+                          output_dir=cmd.output_dir,
+                          pps=pps,
+                          side='rx')
+        jobs += plot_jobs(metric_dataset,
+                          f"plot_queue_rate_tx_pps_{pps}",
+                          plot_queue_rate,
+                          output_dir=cmd.output_dir,
+                          pps=pps,
+                          side='tx')
+        for side in ('rx', 'tx'):
+            jobs += plot_jobs(metric_dataset,
+                              f"plot_cpu_core_utilization_{side}_pps_{pps}",
+                              plot_cpu_core_utilization,
+                              output_dir=cmd.output_dir,
+                              pps=pps,
+                              side=side)
+        jobs += plot_jobs(metric_dataset,
+                          f"combine_tx_cpu_interrupt_plots_{pps}",
+                          combine_cpu_interrupt_plots,
+                          output_dir=cmd.output_dir,
+                          pps=pps,
+                          side='tx')
+
+    start = time.monotonic()
+    rendered, skipped, failed = render_plots(metric_dataset, jobs, workers=cmd.jobs, force=cmd.force_plots)
+    print(f"Plots: {rendered} rendered, {skipped} up to date, {failed} failed, "
+          f"in {time.monotonic() - start:.1f}s")
 
 
 if __name__ == "__main__":
@@ -1167,7 +1727,37 @@ if __name__ == "__main__":
     parser.add_argument('--cores', nargs='*',
                         type=int, default=[1, 2, 3, 4],
                         help='List of num cores for each pps value to run')
+    parser.add_argument('--search', action='store_true',
+                        help='Binary search max lossless pps for each --cores and --sizes before processing metrics')
+    parser.add_argument('--sizes', nargs='*', type=int, default=[64], help='Frame sizes for --search')
+    parser.add_argument('--drop_threshold', type=float, default=0.001, help='Max loss ratio for --search')
+    parser.add_argument('--trial_seconds', type=int, default=20, help='Trial length in seconds for --search')
+    parser.add_argument('--converge', action='store_true',
+                        help='Stop each sampling run once pod rates reach steady state')
+    parser.add_argument('--legacy_sampling', action='store_true',
+                        help='Run ./run_monitor_pps.sh for each sample point instead of orchestrator.py')
     parser.add_argument('-o', '--output_dir', type=str, default='plots', help='Output directory for plots')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('--burst', action='store_true',
+                        help='Plot high resolution windows from burst capture logs')
+    parser.add_argument('--align', action='store_true',
+                        help='Align all timestamped sources of each experiment on common time grid')
+    parser.add_argument('--grid_step', type=float, default=1.0, help='Time grid step in seconds for --align')
+    parser.add_argument('--warmup', type=float, default=0.0, help='Seconds trimmed at start for --align')
+    parser.add_argument('--cooldown', type=float, default=0.0, help='Seconds trimmed at end for --align')
+    parser.add_argument('--join', type=str, default='nearest', choices=['nearest', 'linear'],
+                        help='Join method used by --align')
+    parser.add_argument('--no_store', action='store_true',
+                        help='Parse text logs every time, do not use metric dir .store')
+    parser.add_argument('--where', nargs='*', default=[],
+                        help='Only runs whose run manifest matches key=value, i.e. kernel=6.1.0 rx_queues=8')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Load experiments and render plots across N processes (0 for all cores)')
+    parser.add_argument('--force_plots', action='store_true',
+                        help='Render every plot, even when its inputs did not change')
+    parser.add_argument('--summary', type=str, default=None,
+                        help='Write per experiment summary table, .csv or .json')
+    parser.add_argument('--n_boot', type=int, default=200,
+                        help='Bootstrap resamples for --summary confidence intervals')
     args = parser.parse_args()
     main(args)
\ No newline at end of file
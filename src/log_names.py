@@ -0,0 +1,140 @@
+# Collector log name parser, one directory pass, one compiled pattern per kind.
+#
+# Names written by run_monitor_pps.sh and orchestrator.py:
+#   server_<pod>_pr_<pps>_runtime_<s>_cores_<c>_pairs_<p>_size_<size>_core_list_<cl>_ts_<ts>.log
+#   client_<pod>_pr_<pps>_runtime_<s>_cores_<c>_pairs_<p>_size_<size>_core_list_<cl>_ts_<ts>.log
+#   {tx,rx}-pod-int_pr_<pps>_runtime_<s>_cores_<c>_pairs_<p>_size_<size>_<ts>.log
+#   {tx,rx}-pod-queue_pr_<pps>_runtime_<s>_cores_<c>_pairs_<p>_size_<size>_ts_<ts>.log
+#   {tx,rx}-pod-cpu_pr_<pps>_runtime_<s>_cores_<c>_pairs_<p>_size_<size>_ts_<ts>.log
+#   {tx,rx}-softnet-stat_<pps>_runtime_<s>_cores_<c>_pairs_<p>_size_<size>_ts_<ts>.log
+# size is a frame size or a mix tag (imix, mix-64x7-1500x1).  Every pod of
+# a run shares one timestamp, worker collectors start a few seconds
+# earlier and get their own, group_runs attaches them to the nearest run.
+import os
+import re
+import time
+
+_EXPERIMENT = (r'(?P<pps>\d+)_runtime_(?P<runtime>\d+)_cores_(?P<cores>\d+)'
+               r'_pairs_(?P<pairs>\d+)_size_(?P<size>[^_]+)')
+# kind -> pattern, worker roles are <side>_<kind>, same keys as worker_metrics
+PATTERNS = {
+    'pod': re.compile(rf'^(?P<side>server|client)_(?P<pod>[^_]+)_pr_{_EXPERIMENT}'
+                      rf'_core_list_(?P<core_list>[^_]+)_ts_(?P<ts>\d{{14}})\.log$'),
+    'pod_int': re.compile(rf'^(?P<side>tx|rx)-pod-int_pr_{_EXPERIMENT}_(?:ts_)?(?P<ts>\d{{14}})\.log$'),
+    'queues': re.compile(rf'^(?P<side>tx|rx)-pod-queue_pr_{_EXPERIMENT}_ts_(?P<ts>\d{{14}})\.log$'),
+    'cpu': re.compile(rf'^(?P<side>tx|rx)-pod-cpu_pr_{_EXPERIMENT}_ts_(?P<ts>\d{{14}})\.log$'),
+    'softnet': re.compile(rf'^(?P<side>tx|rx)-softnet-stat_(?:pr_)?{_EXPERIMENT}_ts_(?P<ts>\d{{14}})\.log$'),
+}
+WORKER_ROLES = ('tx_pod_int', 'rx_pod_int', 'tx_queues', 'rx_queues',
+                'tx_cpu', 'rx_cpu', 'tx_softnet', 'rx_softnet')
+TIMESTAMP_FORMAT = "%Y%m%d%H%M%S"
+# worker log further than this from every pod run of its experiment is dropped
+MAX_RUN_GAP = 600
+
+
+class LogName:
+    """Fields of one collector log name, values kept as strings as in file name."""
+
+    def __init__(self, name, role, side, pps, pairs, size, cores, timestamp, pod=None, core_list=None):
+        """
+        :param name: file name
+        :param role: server, client or worker role (tx_pod_int, rx_queues, ...)
+        :param side: tx or rx
+        :param pps: target pps
+        :param pairs: number of pairs
+        :param size: frame size or mix tag
+        :param cores: cores per pod
+        :param timestamp: %Y%m%d%H%M%S
+        :param pod: pod name, pod logs only
+        :param core_list: trafgen cores, pod logs only
+        """
+        self.name = name
+        self.role = role
+        self.side = side
+        self.pps = pps
+        self.pairs = pairs
+        self.size = size
+        self.cores = cores
+        self.timestamp = timestamp
+        self.pod = pod
+        self.core_list = core_list
+
+    @property
+    def is_pod(self):
+        return self.pod is not None
+
+    @property
+    def experiment(self):
+        """(pps, pairs, size, cores), key combine_file_names used before runs were split."""
+        return self.pps, self.pairs, self.size, self.cores
+
+    @property
+    def epoch(self):
+        """Timestamp as seconds since epoch (local time, as written)."""
+        return time.mktime(time.strptime(self.timestamp, TIMESTAMP_FORMAT))
+
+
+def parse_log_name(name):
+    """Parse collector log name.
+
+    :param name: file name without directory
+    :return: LogName or None if name is not a collector log or its timestamp is not a date
+    """
+    for kind, pattern in PATTERNS.items():
+        m = pattern.match(name)
+        if m is None:
+            continue
+        fields = m.groupdict()
+        try:
+            time.strptime(fields['ts'], TIMESTAMP_FORMAT)
+        except ValueError:
+            return None
+        if kind == 'pod':
+            side = 'tx' if fields['side'] == 'server' else 'rx'
+            return LogName(name, fields['side'], side, fields['pps'], fields['pairs'], fields['size'],
+                           fields['cores'], fields['ts'], fields['pod'], fields['core_list'])
+        return LogName(name, f"{fields['side']}_{kind}", fields['side'], fields['pps'], fields['pairs'],
+                       fields['size'], fields['cores'], fields['ts'])
+    return None
+
+
+def scan_logs(directory):
+    """Parse every collector log name of a directory in one os.scandir pass."""
+    logs = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.endswith('.log') and entry.is_file():
+                parsed = parse_log_name(entry.name)
+                if parsed is not None:
+                    logs.append(parsed)
+    return logs
+
+
+def group_runs(logs, max_gap=MAX_RUN_GAP):
+    """Group parsed logs into runs.
+
+    Pod logs are keyed by (pps, pairs, size, cores, timestamp), so a
+    repeated run of the same point is a run of its own.  Each worker log
+    goes to the run of its experiment with the closest timestamp.
+
+    :param logs: list of LogName
+    :param max_gap: seconds, worker logs further from every run are dropped
+    :return: dict run key -> {'pods': [LogName], 'worker': {role: [LogName]}}
+    """
+    runs = {}
+    by_experiment = {}
+    for log in logs:
+        if log.is_pod:
+            key = (*log.experiment, log.timestamp)
+            if key not in runs:
+                runs[key] = {'pods': [], 'worker': {role: [] for role in WORKER_ROLES}}
+                by_experiment.setdefault(log.experiment, []).append((log.epoch, key))
+            runs[key]['pods'].append(log)
+    for log in logs:
+        if log.is_pod or log.experiment not in by_experiment:
+            continue
+        epoch = log.epoch
+        gap, key = min((abs(epoch - t), k) for t, k in by_experiment[log.experiment])
+        if gap <= max_gap:
+            runs[key]['worker'][log.role].append(log)
+    return runs
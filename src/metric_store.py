@@ -0,0 +1,414 @@
+# Binary metric store, every collector log parsed once.
+#
+# inference.py used to np.loadtxt every pod, queue, cpu, interrupt and
+# softnet log on each run, for a metric dir with thousands of logs most of
+# the time went to text parsing, repeated on every plot or print run.  Here
+# a log is parsed once into
+#   <metric dir>/.store/<log name>.npy   float64 matrix, all columns
+#   <metric dir>/.store/<log name>.json  sidecar, source size / mtime,
+#                                        column names and positions
+# and later loads open the .npy with np.load(mmap_mode='r'), only pages
+# actually used are read.  Sidecar size / mtime must match the log, a log
+# that changed (i.e. still being written) is parsed again.
+#
+# Column names come from "# columns:" header (collectors with -T), pod logs
+# without header get TUPLE_COLUMNS positions, same as 'metadata' in
+# inference.py.
+#
+# .store/manifest.json indexes the whole dir, per log name size / mtime,
+# role (server, client, tx_pod_int, ...), run key (worker logs joined to
+# the pod run they belong to), .npy path and a summary (rows, column
+# means), so a run after one new experiment parses only that experiment's
+# logs, across a process pool with -j.  inference.py lists logs from the
+# manifest, load() checks a log against its manifest entry instead of
+# opening the sidecar, and worker queue / cpu means come from the summary.
+#
+# python3 metric_store.py -d metrics -j 8     # ingest new / changed logs
+# python3 metric_store.py -d metrics --list   # and print manifest
+# python3 metric_store.py -d metrics --clean  # drop the store
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from log_names import group_runs, parse_log_name
+from monitor_pps import TUPLE_COLUMNS
+
+STORE_DIR = '.store'
+STORE_VERSION = 1
+# log name prefix -> (role, delimiter), role is inference.py worker_metrics key
+LOG_KINDS = {
+    'server_': ('server', ','),
+    'client_': ('client', ','),
+    'tx-pod-queue': ('tx_queues', None),
+    'rx-pod-queue': ('rx_queues', None),
+    'tx-pod-cpu': ('tx_cpu', None),
+    'rx-pod-cpu': ('rx_cpu', None),
+    'tx-pod-int': ('tx_pod_int', None),
+    'rx-pod-int': ('rx_pod_int', None),
+    'tx-softnet-stat': ('tx_softnet', None),
+    'rx-softnet-stat': ('rx_softnet', None),
+}
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 2
+
+# inference.py --no_store turns store off, logs parsed every time
+enabled = True
+# absolute log path -> manifest entry of manifests updated in this process
+_indexed = {}
+
+
+def log_kind(name):
+    """(role, delimiter) of a collector log by name, KeyError if not a metric log."""
+    for prefix, kind in LOG_KINDS.items():
+        if name.startswith(prefix):
+            return kind
+    raise KeyError(name)
+
+
+def log_delimiter(name):
+    """Delimiter of a collector log by name, KeyError if not a metric log."""
+    return log_kind(name)[1]
+
+
+def run_keys(names):
+    """Log name -> (pps, pairs, size, cores, timestamp) run key as strings.
+
+    Pod logs carry the run timestamp, worker logs are joined to the closest
+    run of their experiment (log_names.group_runs), logs of no run are left out.
+    """
+    logs = [log for log in map(parse_log_name, names) if log is not None]
+    keys = {}
+    for key, run in group_runs(logs).items():
+        for log in run['pods']:
+            keys[log.name] = key
+        for role_logs in run['worker'].values():
+            for log in role_logs:
+                keys[log.name] = key
+    return keys
+
+
+def store_paths(path):
+    """:return: (.npy path, .json path) of a log"""
+    base = os.path.join(os.path.dirname(path), STORE_DIR, os.path.basename(path))
+    return base + '.npy', base + '.json'
+
+
+def read_header(path):
+    """Column names from "# columns:" header or None."""
+    with open(path) as f:
+        first = f.readline()
+    if first.startswith('# columns:'):
+        return first[len('# columns:'):].split()
+    return None
+
+
+def parse_log(path, delimiter=None):
+    """Parse numeric text log into float64 matrix, '#' lines skipped.
+
+    :param path: log path
+    :param delimiter: ',' or None for whitespace
+    :return: (n, m) array
+    """
+    return np.loadtxt(path, delimiter=delimiter, ndmin=2)
+
+
+def column_names(path, n_cols, header=None):
+    """Column names of a log, header if any, TUPLE_COLUMNS for pod logs."""
+    if header and len(header) == n_cols:
+        return header
+    name = os.path.basename(path)
+    if name.startswith(('server_', 'client_')) and n_cols <= len(TUPLE_COLUMNS):
+        return TUPLE_COLUMNS[:n_cols]
+    return [f"c{i}" for i in range(n_cols)]
+
+
+def _source_stat(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def read_sidecar(path):
+    """Sidecar of a log if store entry is current, else None."""
+    npy, meta = store_paths(path)
+    try:
+        with open(meta) as f:
+            sidecar = json.load(f)
+        size, mtime = _source_stat(path)
+    except (OSError, ValueError):
+        return None
+    if (sidecar.get('version') != STORE_VERSION or sidecar.get('size') != size
+            or sidecar.get('mtime_ns') != mtime or not os.path.exists(npy)):
+        return None
+    return sidecar
+
+
+def ingest(path, delimiter=None):
+    """Parse log and write .npy and sidecar.
+
+    :param path: log path
+    :param delimiter: ',' or None
+    :return: (data array, sidecar dict)
+    """
+    size, mtime = _source_stat(path)
+    header = read_header(path)
+    data = parse_log(path, delimiter)
+    columns = column_names(path, data.shape[1], header)
+    sidecar = {
+        'version': STORE_VERSION,
+        'source': os.path.basename(path),
+        'size': size,
+        'mtime_ns': mtime,
+        'delimiter': delimiter,
+        'shape': list(data.shape),
+        'dtype': str(data.dtype),
+        'columns': columns,
+        'positions': {c: i for i, c in enumerate(columns)},
+        'has_header': header is not None,
+    }
+    npy, meta = store_paths(path)
+    os.makedirs(os.path.dirname(npy), exist_ok=True)
+    tmp = f"{npy}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        np.save(f, data)
+    os.replace(tmp, npy)
+    with open(f"{meta}.{os.getpid()}.tmp", 'w') as f:
+        json.dump(sidecar, f, indent=4)
+    os.replace(f"{meta}.{os.getpid()}.tmp", meta)
+    return data, sidecar
+
+
+def indexed_entry(path):
+    """Manifest entry of a log if it is current, else None.
+
+    Only manifests updated in this process are known, one stat, no sidecar read.
+    """
+    entry = _indexed.get(os.path.abspath(path))
+    if entry is None:
+        return None
+    try:
+        size, mtime = _source_stat(path)
+    except OSError:
+        return None
+    if entry['size'] != size or entry['mtime_ns'] != mtime:
+        return None
+    return entry
+
+
+def load(path, delimiter=None, mmap=True):
+    """Load log through the store.
+
+    :param path: log path
+    :param delimiter: ',' or None
+    :param mmap: open store entry memory mapped, read only
+    :return: (data array, column names)
+    """
+    if not enabled:
+        data = parse_log(path, delimiter)
+        return data, column_names(path, data.shape[1], read_header(path))
+    entry = indexed_entry(path)
+    if entry is not None:
+        npy = os.path.join(os.path.dirname(os.path.abspath(path)), entry['store'])
+        return np.load(npy, mmap_mode='r' if mmap else None), entry['columns']
+    sidecar = read_sidecar(path)
+    if sidecar is None:
+        try:
+            data, sidecar = ingest(path, delimiter)
+            return data, sidecar['columns']
+        except OSError:
+            # read only metric dir, parse without store
+            data = parse_log(path, delimiter)
+            return data, column_names(path, data.shape[1], read_header(path))
+    npy, _ = store_paths(path)
+    return np.load(npy, mmap_mode='r' if mmap else None), sidecar['columns']
+
+
+def load_manifest(directory):
+    """Manifest of a metric dir, empty one if missing or other version."""
+    try:
+        with open(os.path.join(directory, STORE_DIR, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        manifest = {'version': MANIFEST_VERSION, 'files': {}}
+    return manifest
+
+
+def save_manifest(directory, manifest):
+    """Write manifest atomically."""
+    path = os.path.join(directory, STORE_DIR, MANIFEST)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp, path)
+
+
+def ingest_logs(logs):
+    """Pool worker, parse logs without a current store entry.
+
+    Only errors travel back, the parent indexes the written sidecars.
+
+    :param logs: (path, delimiter) list
+    :return: list of (path, error) of logs that failed
+    """
+    errors = []
+    for path, delimiter in logs:
+        try:
+            if read_sidecar(path) is None:
+                ingest(path, delimiter)
+        except (OSError, ValueError) as e:
+            errors.append((path, str(e)))
+    return errors
+
+
+def summarize(data):
+    """Cached per log summary, row count and column means."""
+    if data.size == 0:
+        return {'rows': int(data.shape[0]), 'mean': []}
+    return {'rows': int(data.shape[0]), 'mean': np.nanmean(data, axis=0).tolist()}
+
+
+def update_manifest(directory, force=False, is_verbose=False, jobs=1):
+    """Bring manifest of a metric dir up to date, only logs that are new or
+    whose size / mtime changed are parsed, entries of removed logs dropped.
+
+    Entry per log name: size, mtime_ns, role, run key, store .npy path,
+    columns and summary.  Entries are registered for load() of this process.
+
+    :param directory: metric dir
+    :param force: parse every log again
+    :param is_verbose: print each parsed file
+    :param jobs: worker processes parsing new / changed logs
+    :return: (manifest, new or changed logs, reused, removed, failed path -> error)
+    """
+    manifest = load_manifest(directory)
+    files = manifest['files']
+    seen = set()
+    reused = 0
+    pending = []
+    for entry in os.scandir(directory):
+        if not entry.is_file() or not entry.name.endswith('.log'):
+            continue
+        try:
+            role, delimiter = log_kind(entry.name)
+        except KeyError:
+            continue
+        seen.add(entry.name)
+        st = entry.stat()
+        old = files.get(entry.name)
+        npy, _ = store_paths(entry.path)
+        if (not force and old and old['size'] == st.st_size and old['mtime_ns'] == st.st_mtime_ns
+                and os.path.exists(npy)):
+            reused += 1
+            continue
+        pending.append((entry, role, delimiter))
+
+    failed = {}
+    if force:
+        # without sidecar the pool and the loop below parse the log again
+        for entry, _, _ in pending:
+            _, meta = store_paths(entry.path)
+            if os.path.exists(meta):
+                os.remove(meta)
+    if jobs > 1 and len(pending) > 1:
+        logs = [(entry.path, delimiter) for entry, _, delimiter in pending]
+        chunks = [logs[i::jobs * 4] for i in range(jobs * 4)]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for errors in pool.map(ingest_logs, chunks):
+                failed.update(errors)
+
+    indexed = 0
+    for entry, role, delimiter in pending:
+        if entry.path in failed:
+            continue
+        npy, _ = store_paths(entry.path)
+        # store entry written by load(), the pool or an earlier run is only indexed
+        sidecar = read_sidecar(entry.path)
+        try:
+            if sidecar is not None:
+                data = np.load(npy, mmap_mode='r')
+            else:
+                data, sidecar = ingest(entry.path, delimiter)
+        except (OSError, ValueError) as e:
+            failed[entry.path] = str(e)
+            continue
+        files[entry.name] = {
+            'size': sidecar['size'],
+            'mtime_ns': sidecar['mtime_ns'],
+            'role': role,
+            'experiment': None,
+            'store': os.path.relpath(npy, directory),
+            'columns': sidecar['columns'],
+            'summary': summarize(data),
+        }
+        indexed += 1
+        if is_verbose:
+            print(f"{entry.name}: {data.shape}")
+    for path, error in failed.items():
+        print(f"Warning: unable to parse {path}: {error}", file=sys.stderr)
+
+    removed = [name for name in files if name not in seen]
+    for name in removed:
+        del files[name]
+        path = os.path.join(directory, name)
+        _indexed.pop(os.path.abspath(path), None)
+        for stored in store_paths(path):
+            try:
+                os.remove(stored)
+            except OSError:
+                pass
+    # a new run can claim worker logs, run keys of every log are redone
+    keys = run_keys(files)
+    rekeyed = 0
+    for name, entry in files.items():
+        key = list(keys[name]) if name in keys else None
+        if entry['experiment'] != key:
+            entry['experiment'] = key
+            rekeyed += 1
+    if indexed or removed or rekeyed:
+        save_manifest(directory, manifest)
+    for name, entry in files.items():
+        _indexed[os.path.abspath(os.path.join(directory, name))] = entry
+    return manifest, indexed, reused, len(removed), failed
+
+
+def print_manifest(manifest):
+    """One line per log, experiment key, role, rows and first column means."""
+    for name, entry in sorted(manifest['files'].items(),
+                              key=lambda kv: (kv[1]['experiment'] or [], kv[1]['role'], kv[0])):
+        key = ' '.join(entry['experiment']) if entry['experiment'] else '-'
+        means = ' '.join(f"{v:.1f}" for v in entry['summary']['mean'][:4])
+        print(f"{key:<44} {entry['role']:<12} {entry['summary']['rows']:>8} {means}")
+
+
+def main(cmd):
+    if cmd.clean:
+        shutil.rmtree(os.path.join(cmd.directory, STORE_DIR), ignore_errors=True)
+        print(f"Removed store of {cmd.directory}")
+        return
+    start = time.monotonic()
+    manifest, changed, reused, removed, failed = update_manifest(cmd.directory, cmd.force, cmd.verbose,
+                                                                 cmd.jobs or os.cpu_count() or 1)
+    print(f"Indexed {changed} new / changed logs, {reused} up to date, {removed} removed, "
+          f"{len(failed)} failed, in {time.monotonic() - start:.1f}s")
+    if cmd.list:
+        print_manifest(manifest)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert collector logs into memory mapped .npy store.")
+    parser.add_argument("-d", "--directory", type=str, default="metrics", help="Metric dir.")
+    parser.add_argument("--force", action="store_true", help="Parse every log again.")
+    parser.add_argument("--clean", action="store_true", help="Remove store.")
+    parser.add_argument("--list", action="store_true", help="Print manifest, summary of every log.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Parse logs across N processes (0 for all cores).")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print each file.")
+    args = parser.parse_args()
+    main(args)
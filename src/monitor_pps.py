@@ -0,0 +1,314 @@
+# Python version of monitor_pps.sh, read stats inside a pod at sample time rate.
+#
+# monitor_pps.sh forks ~40 processes per sample (cat, grep, awk) and on a pod
+# with one or two pinned cores that perturbs the core we measure.  Here we open
+# all sysfs / procfs files once and re-read them with pread, a single process
+# and a handful of syscalls per sample.
+#
+# Output is the same as monitor_pps.sh, in tuple mode the 14 columns
+# rx_pps, tx_pps, rx_drop, tx_drop, rx_err, tx_err, rx_bytes, tx_bytes,
+# irq_rate, s_irq_rate, net_tx_rate, net_rx_rate, cpu_core, cpu_usage
+# which later loaded by inference.py.  Rates are per second, so
+# sub-second interval produce same units.
+#
+# --cost append one more column, CPU time in microseconds this sampler
+# spent on a sample.
+#
+# -T append mono_ts, wall_ts columns to each tuple and write a
+# "# columns:" header line first (np.loadtxt skips it).
+#
+# --framed [target] write tuple rows as binary frames (FrameWriter in
+# collector_common.py) to stdout or to aggregator.py socket (host:port,
+# unix:/path), timestamps always included.
+#
+# --burst sample only interface counters every -s seconds (1-10 ms) into
+# in memory ring, a window of --burst-history seconds before and
+# --burst-post seconds after a drop is written when rx / tx drop grows,
+# and at exit.  See run_burst in collector_common.py for row layout.
+#
+# python3 /tmp/monitor_pps.py -i eth0 -d tuple -s 0.1
+# python3 /tmp/monitor_pps.py -i eth0 --burst -s 0.002 --burst-history 2
+import argparse
+import os
+import socket
+import sys
+import time
+
+from collector_common import (PersistentFile, CpuCost, tick_deadlines, run_burst,
+                              TIMESTAMP_COLUMNS, timestamp_values, columns_header,
+                              FrameWriter, open_frame_output)
+
+# tuple mode columns, positions match metadata in inference.py
+TUPLE_COLUMNS = [
+    'rx_pps', 'tx_pps', 'rx_drop', 'tx_drop', 'rx_err', 'tx_err', 'rx_bytes', 'tx_bytes',
+    'irq_rate', 's_irq_rate', 'net_tx_rate', 'net_rx_rate', 'cpu_core', 'cpu_usage',
+]
+
+IF_COUNTERS = [
+    'rx_packets',
+    'tx_packets',
+    'rx_dropped',
+    'tx_dropped',
+    'rx_errors',
+    'tx_errors',
+    'rx_bytes',
+    'tx_bytes',
+]
+
+
+class PodSampler:
+    """Sample interface, irq, softirq and cpu counters from one pod.
+
+    Each call to read() return a tuple of cumulative counters, rates
+    computed by caller as a difference of two reads.
+    """
+
+    def __init__(self, if_name, cpu_core, proc_dir='/proc', sys_dir='/sys'):
+        """
+        :param if_name: interface name i.e. eth0
+        :param cpu_core: cpu core for which we sample utilization
+        :param proc_dir: procfs mount point
+        :param sys_dir: sysfs mount point
+        """
+        stats_dir = os.path.join(sys_dir, 'class', 'net', if_name, 'statistics')
+        self.if_name = if_name
+        self.cpu_core = cpu_core
+        self.cpu_label = f'cpu{cpu_core} '.encode()
+        self.counters = [PersistentFile(os.path.join(stats_dir, c), 64) for c in IF_COUNTERS]
+        self.proc_stat = PersistentFile(os.path.join(proc_dir, 'stat'))
+        self.softirqs = PersistentFile(os.path.join(proc_dir, 'softirqs'))
+        # line index of each row we need, resolved on first read.
+        self._stat_rows = None
+        self._softirq_rows = None
+
+    @staticmethod
+    def _find_rows(lines, prefixes):
+        rows = []
+        for prefix in prefixes:
+            for i, line in enumerate(lines):
+                if line.lstrip().startswith(prefix):
+                    rows.append(i)
+                    break
+            else:
+                raise ValueError(f"row {prefix!r} not found")
+        return rows
+
+    @staticmethod
+    def _rows_valid(lines, rows, prefixes):
+        return all(i < len(lines) and lines[i].lstrip().startswith(p)
+                   for i, p in zip(rows, prefixes))
+
+    def _read_proc_stat(self):
+        prefixes = (b'intr ', b'softirq ', self.cpu_label)
+        lines = self.proc_stat.read().split(b'\n')
+        if self._stat_rows is None or not self._rows_valid(lines, self._stat_rows, prefixes):
+            self._stat_rows = self._find_rows(lines, prefixes)
+        intr_row, softirq_row, cpu_row = (lines[i] for i in self._stat_rows)
+        cpu_times = [int(v) for v in cpu_row.split()[1:]]
+        # intr / softirq first value is total since boot,
+        # cpu idle time is 4th value.
+        return int(intr_row.split(None, 2)[1]), int(softirq_row.split(None, 2)[1]), cpu_times[3], sum(cpu_times)
+
+    def _read_softirqs(self):
+        prefixes = (b'NET_TX:', b'NET_RX:')
+        lines = self.softirqs.read().split(b'\n')
+        if self._softirq_rows is None or not self._rows_valid(lines, self._softirq_rows, prefixes):
+            self._softirq_rows = self._find_rows(lines, prefixes)
+        return [sum(int(v) for v in lines[i].split()[1:]) for i in self._softirq_rows]
+
+    def read_interface(self):
+        """Read interface counters only, cheap enough for burst mode.
+        :return: list of int in IF_COUNTERS order
+        """
+        return [c.read_int() for c in self.counters]
+
+    def read(self):
+        """Read all counters.
+        :return: tuple of interface counters in IF_COUNTERS order
+                 followed by intr, softirq, net_tx, net_rx, cpu_idle, cpu_total
+        """
+        values = [c.read_int() for c in self.counters]
+        intr, softirq, cpu_idle, cpu_total = self._read_proc_stat()
+        net_tx, net_rx = self._read_softirqs()
+        return (*values, intr, softirq, net_tx, net_rx, cpu_idle, cpu_total)
+
+    def close(self):
+        for f in (*self.counters, self.proc_stat, self.softirqs):
+            f.close()
+
+
+def compute_rates(t1, t2, elapsed):
+    """Compute per second rates from two PodSampler reads.
+
+    :param t1: previous read
+    :param t2: current read
+    :param elapsed: seconds between two reads
+    :return: dict of rates
+    """
+    d = [b - a for a, b in zip(t1, t2)]
+    scale = 1.0 / elapsed if elapsed > 0 else 0.0
+    rate = [int(round(v * scale)) for v in d[:12]]
+    (rx_pps, tx_pps, rx_drop, tx_drop, rx_err, tx_err,
+     rx_bytes, tx_bytes, irq_rate, s_irq_rate, net_tx_rate, net_rx_rate) = rate
+    idle_delta, total_delta = d[12], d[13]
+    cpu_usage = (total_delta - idle_delta) * 100 // total_delta if total_delta > 0 else 0
+    return {
+        'rx_pps': rx_pps,
+        'tx_pps': tx_pps,
+        'rx_drop': rx_drop,
+        'tx_drop': tx_drop,
+        'rx_err': rx_err,
+        'tx_err': tx_err,
+        'rx_bytes': rx_bytes,
+        'tx_bytes': tx_bytes,
+        'irq_rate': irq_rate,
+        's_irq_rate': s_irq_rate,
+        'net_tx_rate': net_tx_rate,
+        'net_rx_rate': net_rx_rate,
+        'cpu_usage': cpu_usage,
+        'avg_rx_size': d[6] // d[0] if d[0] > 0 else 0,
+        'avg_tx_size': d[7] // d[1] if d[1] > 0 else 0,
+    }
+
+
+def tuple_values(r, cpu_core, cost=None, ts=None):
+    """Tuple mode values as numbers, same order as TUPLE_COLUMNS.
+    :param r: dict from compute_rates
+    :param cpu_core: cpu core
+    :param cost: optional sampler cpu cost in microseconds
+    :param ts: optional (mono, wall) timestamps
+    :return: list
+    """
+    values = [r[c] for c in TUPLE_COLUMNS[:12]] + [cpu_core, r['cpu_usage']]
+    if cost is not None:
+        values.append(cost)
+    if ts is not None:
+        values.extend(ts)
+    return values
+
+
+def format_sample(r, if_name, cpu_core, direction, cost=None, ts=None):
+    """Format sample same way as monitor_pps.sh does.
+    :param r: dict from compute_rates
+    :param if_name: interface name
+    :param cpu_core: cpu core
+    :param direction: tx, rx, tuple or empty for monitor mode
+    :param cost: optional sampler cpu cost in microseconds
+    :param ts: optional (mono, wall) timestamps appended in tuple mode
+    :return: str
+    """
+    if direction == 'tx':
+        return f"{r['tx_pps']}"
+    if direction == 'rx':
+        return f"{r['rx_pps']}"
+    if direction == 'tuple':
+        line = (f"{r['rx_pps']}, {r['tx_pps']}, {r['rx_drop']}, {r['tx_drop']}, "
+                f"{r['rx_err']}, {r['tx_err']}, {r['rx_bytes']}, {r['tx_bytes']}, "
+                f"{r['irq_rate']}, {r['s_irq_rate']}, {r['net_tx_rate']}, {r['net_rx_rate']}, "
+                f"{cpu_core}, {r['cpu_usage']}")
+        if cost is not None:
+            line += f", {cost}"
+        if ts is not None:
+            line += ", " + ", ".join(timestamp_values(*ts))
+        return line
+    line = (f"TX {if_name}: {r['tx_pps']} pkts/s RX {if_name}: {r['rx_pps']} pkts/s "
+            f"TX DROP: {r['tx_drop']} pkts/s RX DROP: {r['rx_drop']} pkts/s "
+            f"IRQ Rate: {r['irq_rate']}, SIRQ Rate: {r['s_irq_rate']} "
+            f"NET_TX_RATE: {r['net_tx_rate']}, NET_RX_RATE: {r['net_rx_rate']} "
+            f"AVG_RX_SIZE: {r['avg_rx_size']} AVG_TX_SIZE: {r['avg_tx_size']} "
+            f"CPU Core {cpu_core} Usage: {r['cpu_usage']}%")
+    if cost is not None:
+        line += f" Sampler CPU: {cost}us"
+    return line
+
+
+def main(cmd):
+    """Sample until killed, i.e. by timeout from run_monitor_pps.sh
+    :param cmd:
+    :return:
+    """
+    if not os.path.isdir(f"/sys/class/net/{cmd.interface}"):
+        print(f"Error: Network interface '{cmd.interface}' is not valid or does not exist.", file=sys.stderr)
+        sys.exit(1)
+
+    sampler = PodSampler(cmd.interface, cmd.core)
+    if cmd.burst:
+        try:
+            run_burst(sampler.read_interface, IF_COUNTERS,
+                      [IF_COUNTERS.index('rx_dropped'), IF_COUNTERS.index('tx_dropped')],
+                      sys.stdout, cmd.sample_time, cmd.burst_history, cmd.burst_post, cmd.burst_windows)
+        finally:
+            sampler.close()
+        return
+
+    cpu_cost = CpuCost()
+    show_cost = cmd.cost or not cmd.direction
+    with_ts = cmd.timestamps and cmd.direction == 'tuple'
+    names = TUPLE_COLUMNS + (['sampler_cpu_us'] if cmd.cost else []) + TIMESTAMP_COLUMNS
+    writer = None
+    if cmd.framed:
+        try:
+            writer = FrameWriter(open_frame_output(cmd.framed))
+        except OSError as e:
+            print(f"Error: unable to open framed output {cmd.framed}: {e}", file=sys.stderr)
+            sys.exit(1)
+        writer.hello(cmd.stream_name)
+        writer.schema(0, 'pod', names)
+        writer.flush()
+    elif with_ts:
+        print(columns_header(names), flush=True)
+
+    prev = sampler.read()
+    prev_ts = time.monotonic()
+    cpu_cost.sample()
+    try:
+        for _ in tick_deadlines(cmd.sample_time):
+            cur = sampler.read()
+            now = time.monotonic()
+            rates = compute_rates(prev, cur, now - prev_ts)
+            if writer:
+                cost = cpu_cost.sample() if cmd.cost else None
+                writer.row(0, tuple_values(rates, cmd.core, cost, (now, time.time())))
+                writer.flush()
+            else:
+                cost = cpu_cost.sample() if show_cost else None
+                ts = (now, time.time()) if with_ts else None
+                print(format_sample(rates, cmd.interface, cmd.core, cmd.direction, cost, ts), flush=True)
+            prev, prev_ts = cur, now
+    except (KeyboardInterrupt, BrokenPipeError, ConnectionError):
+        pass
+    finally:
+        sampler.close()
+        if writer:
+            writer.close()
+
+
+def parse_core(value):
+    """Accept same -c argument as monitor_pps.sh, range 2-4 or list 2,3,4 use first core."""
+    return int(value.replace(',', '-').split('-')[0])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sample interface, irq and cpu stats inside a pod.")
+    parser.add_argument("-i", "--interface", type=str, default="eth0", help="Network interface.")
+    parser.add_argument("-d", "--direction", type=str, default="", choices=['', 'tx', 'rx', 'tuple'],
+                        help="Direction to monitor (tx, rx, or tuple), default is empty (monitor mode)")
+    parser.add_argument("-c", "--core", type=parse_core, default=0, help="CPU core to monitor, default is 0")
+    parser.add_argument("-s", "--sample-time", type=float, default=1.0,
+                        help="Sample time in seconds, can be sub second i.e. 0.1")
+    parser.add_argument("--cost", action="store_true",
+                        help="Append sampler own CPU cost (microseconds) to each sample.")
+    parser.add_argument("-T", "--timestamps", action="store_true",
+                        help="In tuple mode append monotonic and wall clock timestamp columns.")
+    parser.add_argument("--framed", type=str, nargs='?', const='-', default=None,
+                        help="Write tuple rows as binary frames to stdout or host:port / unix:/path.")
+    parser.add_argument("--stream-name", type=str, default=socket.gethostname(),
+                        help="Stream name sent to aggregator, default hostname (pod name).")
+    parser.add_argument("--burst", action="store_true",
+                        help="Burst capture of interface counters into ring buffer, written on drop and at exit.")
+    parser.add_argument("--burst-history", type=float, default=1.0, help="Burst mode, seconds kept before trigger.")
+    parser.add_argument("--burst-post", type=float, default=0.5, help="Burst mode, seconds captured after trigger.")
+    parser.add_argument("--burst-windows", type=int, default=0,
+                        help="Burst mode, stop after that many triggered windows, 0 no limit.")
+    args = parser.parse_args()
+    main(args)
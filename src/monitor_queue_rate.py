@@ -0,0 +1,353 @@
+# Python version of monitor_queue_rate.sh, sample TX and RX queue pps
+# counters of adapter, the main purpose identify imbalance either on TX or RX.
+# It also samples CPU utilization per core.
+#
+# monitor_queue_rate.sh runs ethtool -S twice per interval and pipes the
+# output through 12 awk.  Here we talk to the driver directly,
+# ETHTOOL_GSTRINGS once to resolve index of each per queue counter and
+# then a single ETHTOOL_GSTATS ioctl per sample.
+#
+# Queue counters resolved for VMXNET3 ("Tx Queue#" blocks) and common
+# per queue naming tx0_packets (mlx5), tx_queue_0_packets (ice / ixgbe),
+# tx-0.tx_packets (i40e).  Counter driver does not expose reported as 0.
+#
+# Output same vector as monitor_queue_rate.sh
+# TX_PPS[q] RX_PPS[q] TX_DROPS[q] RX_DROPS[q] TX_RING_FULL[q] RX_RING_FULL[q]
+# values are per second, so sub-second sample time keeps units.
+#
+# -f <file> reads `ethtool -S` text output from file instead of adapter
+# (test mode), same as -t in monitor_txrx_int.sh.
+#
+# -T append mono_ts, wall_ts to each row and write "# columns:" header.
+#
+# --burst sample raw per queue counters every -s seconds (1-10 ms) into
+# in memory ring, a window is written when any drop or ring full counter
+# grows and at exit.  See run_burst in collector_common.py.
+#
+# python3 /tmp/monitor_queue_rate.py -i eth0 -t queue -s 0.05
+# python3 /tmp/monitor_queue_rate.py -i eth0 --burst -s 0.001 --burst-history 2
+import argparse
+import fcntl
+import re
+import socket
+import struct
+import sys
+import time
+from array import array
+
+from collector_common import (PersistentFile, tick_deadlines, run_burst,
+                              TIMESTAMP_COLUMNS, timestamp_values, columns_header)
+
+SIOCETHTOOL = 0x8946
+ETHTOOL_GSTRINGS = 0x0000001b
+ETHTOOL_GSTATS = 0x0000001d
+ETHTOOL_GSSET_INFO = 0x00000037
+ETH_SS_STATS = 1
+ETH_GSTRING_LEN = 32
+IFNAMSIZ = 16
+
+# order of vector we output, same as monitor_queue_rate.sh
+QUEUE_METRICS = ['tx_pps', 'rx_pps', 'tx_drop', 'rx_drop', 'tx_ring_full', 'rx_ring_full']
+
+# vmxnet3 counters inside "Tx Queue#" / "Rx Queue#" block
+VMXNET3_BLOCK_STATS = {
+    'tx': {
+        'pps': ('ucast pkts tx',),
+        'drop': ('tx dropped', 'drv dropped tx total'),
+        'ring_full': ('tx ring full', 'ring full'),
+    },
+    'rx': {
+        'pps': ('ucast pkts rx',),
+        'drop': ('rx dropped', 'drv dropped rx total'),
+        'ring_full': ('rx ring full', 'pkts rx OOB'),
+    },
+}
+
+# flat per queue naming, group 1 direction, group 2 queue id
+QUEUE_STAT_PATTERNS = {
+    'pps': re.compile(r'^(tx|rx)[_-]?(?:queue_)?(\d+)[._](?:(?:tx|rx)_)?packets$'),
+    'drop': re.compile(r'^(tx|rx)[_-]?(?:queue_)?(\d+)[._](?:(?:tx|rx)_)?(?:dropped|drops|buff_alloc_err)$'),
+    'ring_full': re.compile(r'^(tx|rx)[_-]?(?:queue_)?(\d+)[._](?:(?:tx|rx)_)?(?:ring_full|stopped|busy)$'),
+}
+
+
+class EthtoolIoctl:
+    """Read adapter statistics with ETHTOOL ioctls.
+
+    Buffers allocated once, each stats() call is a single ioctl.
+    """
+
+    def __init__(self, if_name):
+        self.if_name = if_name
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.n_stats = self._n_stats()
+        self._stats_buf = array('B', bytes(8 + 8 * self.n_stats))
+        struct.pack_into('II', self._stats_buf, 0, ETHTOOL_GSTATS, self.n_stats)
+        self._stats_req = self._ifreq(self._stats_buf)
+        self._stats_view = memoryview(self._stats_buf).cast('Q')
+
+    def _ifreq(self, buf):
+        addr, _ = buf.buffer_info()
+        return array('B', struct.pack(f'{IFNAMSIZ}sP', self.if_name.encode(), addr).ljust(40, b'\0'))
+
+    def _ioctl(self, buf):
+        fcntl.ioctl(self.sock.fileno(), SIOCETHTOOL, self._ifreq(buf))
+
+    def _n_stats(self):
+        buf = array('B', bytes(16 + 4))
+        struct.pack_into('IIQ', buf, 0, ETHTOOL_GSSET_INFO, 0, 1 << ETH_SS_STATS)
+        self._ioctl(buf)
+        return struct.unpack_from('I', buf, 16)[0]
+
+    def strings(self):
+        """Names of all counters.
+        :return: list of str
+        """
+        buf = array('B', bytes(12 + ETH_GSTRING_LEN * self.n_stats))
+        struct.pack_into('III', buf, 0, ETHTOOL_GSTRINGS, ETH_SS_STATS, self.n_stats)
+        self._ioctl(buf)
+        raw = buf.tobytes()[12:]
+        return [raw[i:i + ETH_GSTRING_LEN].split(b'\0', 1)[0].decode(errors='replace')
+                for i in range(0, len(raw), ETH_GSTRING_LEN)]
+
+    def stats(self):
+        """Values of all counters, view into internal buffer valid until next call.
+        :return: sequence of int
+        """
+        fcntl.ioctl(self.sock.fileno(), SIOCETHTOOL, self._stats_req)
+        return self._stats_view[1:]
+
+    def close(self):
+        self.sock.close()
+
+
+class EthtoolTextFile:
+    """Read `ethtool -S` text output from a file, used in test mode."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def _read(self):
+        with open(self.file_path) as f:
+            pairs = []
+            for line in f:
+                name, sep, value = line.rpartition(':')
+                if sep and value.strip().lstrip('-').isdigit():
+                    pairs.append((name, int(value)))
+            return pairs
+
+    def strings(self):
+        return [name for name, _ in self._read()]
+
+    def stats(self):
+        return [value for _, value in self._read()]
+
+    def close(self):
+        pass
+
+
+class QueueStatsIndex:
+    """Index of each per queue counter inside ethtool stats vector."""
+
+    def __init__(self, names):
+        """
+        :param names: list of counter names from ETHTOOL_GSTRINGS
+        """
+        # (direction, metric) -> {queue: stat index}
+        found = {}
+        self._resolve_vmxnet3(names, found)
+        if not found:
+            self._resolve_flat(names, found)
+        if not found:
+            raise ValueError("unable to find per queue counters")
+
+        self.n_queues = max(max(q) + 1 for q in found.values())
+        self.indices = []
+        for metric in QUEUE_METRICS:
+            direction, name = metric.split('_', 1)
+            per_queue = found.get((direction, name), {})
+            self.indices.extend(per_queue.get(q, -1) for q in range(self.n_queues))
+
+    @staticmethod
+    def _resolve_vmxnet3(names, found):
+        direction, queue = None, {'tx': -1, 'rx': -1}
+        for i, raw in enumerate(names):
+            name = raw.strip()
+            if name in ('Tx Queue#', 'Rx Queue#'):
+                direction = name[:2].lower()
+                queue[direction] += 1
+                continue
+            if direction is None:
+                continue
+            for metric, labels in VMXNET3_BLOCK_STATS[direction].items():
+                per_queue = found.setdefault((direction, metric), {})
+                # first label in list has priority
+                if name in labels and (queue[direction] not in per_queue or labels.index(name) == 0):
+                    per_queue[queue[direction]] = i
+        for key in [k for k, v in found.items() if not v]:
+            del found[key]
+
+    @staticmethod
+    def _resolve_flat(names, found):
+        for i, raw in enumerate(names):
+            name = raw.strip()
+            for metric, pattern in QUEUE_STAT_PATTERNS.items():
+                m = pattern.match(name)
+                if m:
+                    found.setdefault((m.group(1), metric), {}).setdefault(int(m.group(2)), i)
+                    break
+
+    def columns(self):
+        """Column names in output order i.e. tx_pps_q0
+        :return: list of str
+        """
+        return [f'{metric}_q{q}' for metric in QUEUE_METRICS for q in range(self.n_queues)]
+
+    def trigger_columns(self):
+        """Position of drop and ring full counters in select() output.
+        :return: list of int
+        """
+        return [i for i, name in enumerate(self.columns())
+                if ('drop' in name or 'ring_full' in name) and self.indices[i] >= 0]
+
+    def select(self, stats):
+        """Pick per queue counters in output order.
+        :param stats: full ethtool stats vector
+        :return: list of int, len 6 * n_queues
+        """
+        return [stats[i] if i >= 0 else 0 for i in self.indices]
+
+
+def cpu_columns(n_cpus):
+    """Column names of cpu utilization vector.
+    :param n_cpus: number of cpus
+    :return: list of str
+    """
+    return [f'cpu{i}' for i in range(n_cpus)]
+
+
+class CpuUtilization:
+    """Per core utilization from /proc/stat, index position is cpu id."""
+
+    def __init__(self, file_path='/proc/stat'):
+        self.file = PersistentFile(file_path, 1 << 14)
+
+    def read(self):
+        """:return: list of (total, idle) per cpu"""
+        times = []
+        for line in self.file.read().split(b'\n'):
+            if line.startswith(b'cpu') and line[3:4].isdigit():
+                values = [int(v) for v in line.split()[1:10]]
+                times.append((sum(values), values[3]))
+        return times
+
+    def close(self):
+        self.file.close()
+
+
+def cpu_utilization(t1, t2):
+    """Same computation as sample_cpu_utilization in monitor_queue_rate.sh
+    :return: list of int percentages
+    """
+    out = []
+    for (total_1, idle_1), (total_2, idle_2) in zip(t1, t2):
+        total_diff = total_2 - total_1
+        idle_diff = idle_2 - idle_1
+        out.append(100 * (total_diff - idle_diff) // total_diff if total_diff > 0 else 0)
+    return out
+
+
+def queue_rates(prev, cur, elapsed):
+    """Per second rate for each selected counter.
+    :return: list of int
+    """
+    scale = 1.0 / elapsed if elapsed > 0 else 0.0
+    return [int(round((b - a) * scale)) for a, b in zip(prev, cur)]
+
+
+def main(cmd):
+    """Sample until killed, i.e. by timeout from run_monitor_pps.sh
+    :param cmd:
+    :return:
+    """
+    provider = index = cpu = None
+    if cmd.type in ('queue', 'all'):
+        try:
+            provider = EthtoolTextFile(cmd.file_path) if cmd.file_path else EthtoolIoctl(cmd.interface)
+            index = QueueStatsIndex(provider.strings())
+        except (OSError, ValueError) as e:
+            print(f"Error: Unable to fetch ethtool counters for {cmd.interface}: {e}", file=sys.stderr)
+            sys.exit(1)
+    if cmd.burst:
+        if index is None:
+            print("Error: burst mode requires queue counters (-t queue).", file=sys.stderr)
+            sys.exit(1)
+        try:
+            run_burst(lambda: index.select(provider.stats()), index.columns(), index.trigger_columns(),
+                      sys.stdout, cmd.sample_time, cmd.burst_history, cmd.burst_post, cmd.burst_windows)
+        finally:
+            provider.close()
+        return
+
+    if cmd.type in ('cpu', 'all'):
+        cpu = CpuUtilization()
+
+    prev_q = index.select(provider.stats()) if index else None
+    prev_cpu = cpu.read() if cpu else None
+    prev_ts = time.monotonic()
+    with_ts = cmd.timestamps and not cmd.monitor
+    if with_ts:
+        names = (index.columns() if index else []) + (cpu_columns(len(prev_cpu)) if cpu else [])
+        print(columns_header(names + TIMESTAMP_COLUMNS))
+    try:
+        for _ in tick_deadlines(cmd.sample_time):
+            now = time.monotonic()
+            out = []
+            if index:
+                cur_q = index.select(provider.stats())
+                rates = queue_rates(prev_q, cur_q, now - prev_ts)
+                prev_q = cur_q
+                if cmd.monitor:
+                    n = index.n_queues
+                    print(f"tx_q: {' '.join(map(str, rates[:n]))}")
+                    print(f"rx_q: {' '.join(map(str, rates[n:2 * n]))}")
+                else:
+                    out.extend(rates)
+            if cpu:
+                cur_cpu = cpu.read()
+                out.extend(cpu_utilization(prev_cpu, cur_cpu))
+                prev_cpu = cur_cpu
+            if out:
+                if with_ts:
+                    out.extend(timestamp_values(now, time.time()))
+                print(' '.join(map(str, out)))
+            sys.stdout.flush()
+            prev_ts = now
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    finally:
+        if provider:
+            provider.close()
+        if cpu:
+            cpu.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sample per queue pps, drops and ring full counters and cpu utilization.")
+    parser.add_argument("-i", "--interface", type=str, default="eth1", help="Adapter name.")
+    parser.add_argument("-m", "--monitor", action="store_true", help="Monitor mode, print tx_q / rx_q rates.")
+    parser.add_argument("-t", "--type", type=str, default="queue", choices=['queue', 'cpu', 'all'],
+                        help="Type of data to collect, all output queue vector followed by cpu vector.")
+    parser.add_argument("-f", "--file-path", type=str, default=None,
+                        help="Read `ethtool -S` output from file instead of adapter (test mode).")
+    parser.add_argument("-s", "--sample-time", type=float, default=1.0, help="Sample time in seconds.")
+    parser.add_argument("-T", "--timestamps", action="store_true",
+                        help="Append monotonic and wall clock timestamp columns.")
+    parser.add_argument("--burst", action="store_true",
+                        help="Burst capture of raw queue counters into ring buffer, written on drop and at exit.")
+    parser.add_argument("--burst-history", type=float, default=1.0, help="Burst mode, seconds kept before trigger.")
+    parser.add_argument("--burst-post", type=float, default=0.5, help="Burst mode, seconds captured after trigger.")
+    parser.add_argument("--burst-windows", type=int, default=0,
+                        help="Burst mode, stop after that many triggered windows, 0 no limit.")
+    args = parser.parse_args()
+    main(args)
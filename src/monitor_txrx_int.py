@@ -0,0 +1,223 @@
+# Python version of monitor_txrx_int.sh collect mode, sample interrupts
+# for each TxRx queue of target adapter and output per queue x per CPU
+# interrupt deltas.
+#
+# /proc/interrupts on 96 CPU worker is hundreds of KB, so we scan it once,
+# find the $IF-TxRx (or rxtx) lines and remember byte range they occupy.
+# Each sample re-reads only that range with pread.  Columns in
+# /proc/interrupts are fixed width, if range moved (i.e. a counter in a line
+# above grew wider than column) labels will not match and we re-index.
+#
+# Output for each sample is n_queues rows, first value queue id followed by
+# number of interrupts for each CPU during sample interval, same layout as
+# monitor_txrx_int.sh but deltas instead of cumulative counters.
+# -T append mono_ts, wall_ts to each row and write "# columns:" header.
+#
+# python3 /tmp/monitor_txrx_int.py -i eth0 -s 0.5
+import argparse
+import re
+import sys
+import time
+
+from collector_common import PersistentFile, tick_deadlines, TIMESTAMP_COLUMNS, timestamp_values, columns_header
+
+COUNTER_MASK = 0xffffffff
+
+
+class InterruptsIndex:
+    """Cached location of queue interrupt lines in /proc/interrupts."""
+
+    def __init__(self, n_cpus, labels, span_start, span_len):
+        """
+        :param n_cpus: number of CPU columns
+        :param labels: queue labels in order they appear i.e. eth0-TxRx-0
+        :param span_start: byte offset of first queue line
+        :param span_len: length of bytes covering all queue lines
+        """
+        self.n_cpus = n_cpus
+        self.labels = labels
+        self.span_start = span_start
+        self.span_len = span_len
+
+
+class TxRxInterrupts:
+    """Reads per CPU interrupt counters for all queues of an adapter."""
+
+    def __init__(self, if_name, file_path='/proc/interrupts', pattern=None):
+        """
+        :param if_name: adapter name
+        :param file_path: interrupts file, test file in test mode
+        :param pattern: optional regex for queue label, by default $IF-TxRx or $IF-rxtx
+        """
+        self.file = PersistentFile(file_path, 1 << 16)
+        if pattern is None:
+            pattern = rf"{re.escape(if_name)}-(?:TxRx|rxtx)-\d+"
+        self.pattern = re.compile(pattern.encode())
+        self.index = None
+        self.reindex_count = 0
+
+    def build_index(self):
+        """Scan entire file and cache location of queue lines.
+        :return: InterruptsIndex
+        """
+        data = self.file.read()
+        header_end = data.find(b'\n')
+        n_cpus = len(re.findall(rb'CPU\d+', data[:header_end]))
+
+        labels = []
+        span_start = span_end = None
+        offset = header_end + 1
+        for line in data[header_end + 1:].split(b'\n'):
+            m = self.pattern.search(line)
+            if m:
+                if span_start is None:
+                    span_start = offset
+                span_end = offset + len(line) + 1
+                labels.append(m.group(0))
+            offset += len(line) + 1
+
+        if not labels:
+            raise ValueError(f"no interrupts found for {self.pattern.pattern.decode()} in {self.file.path}")
+
+        self.index = InterruptsIndex(n_cpus, labels, span_start, span_end - span_start)
+        return self.index
+
+    def _parse(self, data):
+        """Parse queue lines from span, return None if span moved."""
+        idx = self.index
+        matrix = []
+        lines = data.split(b'\n')
+        pos = 0
+        for label in idx.labels:
+            # skip non queue lines that can sit in between
+            m = None
+            while pos < len(lines):
+                m = self.pattern.search(lines[pos])
+                if m:
+                    break
+                pos += 1
+            if m is None or m.group(0) != label:
+                return None
+            fields = lines[pos].split(None, idx.n_cpus + 1)
+            if len(fields) < idx.n_cpus + 1 or not fields[0].endswith(b':'):
+                return None
+            matrix.append([int(v) for v in fields[1:idx.n_cpus + 1]])
+            pos += 1
+        return matrix
+
+    def read(self):
+        """Read counters for all queues.
+
+        If span moved we re-index once, if that fails too (queues gone for a
+        moment, file changed between the two reads) the sample is skipped
+        and next read re-indexes again.
+
+        :return: list of n_queues lists, each n_cpus counters, None if sample was skipped
+        """
+        if self.index is not None:
+            matrix = self._parse(self.file.pread(self.index.span_len, self.index.span_start))
+            if matrix is not None:
+                return matrix
+            self.reindex_count += 1
+        try:
+            self.build_index()
+        except ValueError:
+            self.index = None
+            return None
+        matrix = self._parse(self.file.pread(self.index.span_len, self.index.span_start))
+        if matrix is None:
+            self.index = None
+        return matrix
+
+    def close(self):
+        self.file.close()
+
+
+def interrupt_deltas(prev, cur):
+    """Wrap safe delta of two reads, counters in /proc/interrupts are 32 bit.
+    :param prev: previous matrix
+    :param cur: current matrix
+    :return: matrix n_queues x n_cpus
+    """
+    return [[(b - a) & COUNTER_MASK for a, b in zip(row_a, row_b)]
+            for row_a, row_b in zip(prev, cur)]
+
+
+def interrupt_columns(n_cpus):
+    """Column names of collect rows.
+    :param n_cpus: number of cpus
+    :return: list of str
+    """
+    return ['queue'] + [f'cpu{i}' for i in range(n_cpus)]
+
+
+def format_collect(deltas, ts=None):
+    """Format same as monitor_txrx_int.sh collect, queue id and per cpu values.
+    :param deltas: matrix n_queues x n_cpus
+    :param ts: optional (mono, wall) timestamps appended to each row
+    :return: str
+    """
+    suffix = f" {' '.join(timestamp_values(*ts))}" if ts is not None else ""
+    return ''.join(f"{q} {' '.join(map(str, row))}{suffix}\n" for q, row in enumerate(deltas))
+
+
+def format_monitor(deltas):
+    """Format same as monitor_txrx_int.sh monitor, cores that had interrupts per queue.
+    :param deltas: matrix n_queues x n_cpus
+    :return: str
+    """
+    cores = [' '.join(str(c) for c, v in enumerate(row) if v > 0) for row in deltas]
+    values = [' '.join(str(v) for v in row if v > 0) for row in deltas]
+    return "Core IDs:\n" + '\n'.join(cores) + "\nValues corresponding to Core IDs:\n" + '\n'.join(values) + "\n"
+
+
+def main(cmd):
+    """Sample until killed, i.e. by timeout from run_monitor_pps.sh
+    :param cmd:
+    :return:
+    """
+    reader = TxRxInterrupts(cmd.interface, cmd.file_path, cmd.pattern)
+    try:
+        reader.build_index()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    with_ts = cmd.timestamps and not cmd.monitor
+    if with_ts:
+        print(columns_header(interrupt_columns(reader.index.n_cpus) + TIMESTAMP_COLUMNS))
+    prev = reader.read()
+    try:
+        for _ in tick_deadlines(cmd.sample_time):
+            cur = reader.read()
+            if cur is None:
+                continue
+            if prev is None or len(cur) != len(prev):
+                prev = cur
+                continue
+            deltas = interrupt_deltas(prev, cur)
+            if cmd.monitor:
+                sys.stdout.write(format_monitor(deltas))
+            else:
+                sys.stdout.write(format_collect(deltas, (time.monotonic(), time.time()) if with_ts else None))
+            sys.stdout.flush()
+            prev = cur
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sample per queue per CPU interrupt deltas for an adapter.")
+    parser.add_argument("-i", "--interface", type=str, default="eth1", help="Adapter name.")
+    parser.add_argument("-m", "--monitor", action="store_true", help="Monitor mode, show only cores with interrupts.")
+    parser.add_argument("-f", "--file-path", type=str, default="/proc/interrupts",
+                        help="Interrupts file, i.e. test.int.data in test mode.")
+    parser.add_argument("-p", "--pattern", type=str, default=None,
+                        help="Regex for queue label, default <interface>-TxRx-N or <interface>-rxtx-N.")
+    parser.add_argument("-s", "--sample-time", type=float, default=1.0, help="Sample time in seconds.")
+    parser.add_argument("-T", "--timestamps", action="store_true",
+                        help="Append monotonic and wall clock timestamp columns.")
+    args = parser.parse_args()
+    main(args)
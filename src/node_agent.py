@@ -0,0 +1,292 @@
+# Worker node collection agent, samples queue rates, per core cpu utilization,
+# soft net stats and per queue interrupts in a single loop.
+#
+# Before we started monitor_queue_rate (queue, cpu), monitor_softnet_stat and
+# monitor_txrx_int as separate ssh sessions each with own sleep loop, so logs
+# drift apart and row i in one log is not row i in another.  The agent reads
+# all sources on the same monotonic tick and writes one record per source
+# per tick, thus row k (or block of rows k for per queue / per cpu sources)
+# in every log is the same instant.
+#
+# Stream on stdout, each line is
+#   <source> <tick> <values...>
+# source is queue, cpu, softnet or int, values same as standalone collector.
+# If a source fails to read on a tick it repeats previous counters (zero
+# rates) so all sources stay aligned.  With -T every row gets mono_ts,
+# wall_ts columns and each source starts with "# columns:" header (tick 0).
+#
+# --framed [target] write the same rows as binary frames (one schema per
+# source, see FrameWriter in collector_common.py) to stdout or to
+# aggregator.py socket, timestamps always included.
+#
+# On the orchestrator side same script splits stream into per source logs
+# with the layout of the standalone collectors:
+#
+#   ssh root@node python3 /tmp/node_agent.py -i eth0 | \
+#       python3 node_agent.py --split --queue q.log --cpu cpu.log --softnet sn.log --int int.log
+import argparse
+import socket
+import sys
+import time
+
+from collector_common import (tick_deadlines, TIMESTAMP_COLUMNS, timestamp_values, columns_header,
+                              FrameWriter, open_frame_output)
+from monitor_queue_rate import (EthtoolIoctl, QueueStatsIndex, CpuUtilization,
+                                cpu_utilization, cpu_columns, queue_rates)
+from monitor_softnet_stat import SoftnetReader, softnet_rates, rate_columns
+from monitor_txrx_int import TxRxInterrupts, interrupt_deltas, interrupt_columns
+
+AGENT_SOURCES = ['queue', 'cpu', 'softnet', 'int']
+
+
+class QueueSource:
+    """Per queue pps, drops and ring full, same vector as monitor_queue_rate.py -t queue"""
+    tag = 'queue'
+
+    def __init__(self, cmd):
+        self.provider = EthtoolIoctl(cmd.interface)
+        self.index = QueueStatsIndex(self.provider.strings())
+
+    def read(self):
+        return self.index.select(self.provider.stats())
+
+    def columns(self, first):
+        return self.index.columns()
+
+    def rows(self, prev, cur, elapsed, ts):
+        return [queue_rates(prev, cur, elapsed)]
+
+    def close(self):
+        self.provider.close()
+
+
+class CpuSource:
+    """Per core utilization, same vector as monitor_queue_rate.py -t cpu"""
+    tag = 'cpu'
+
+    def __init__(self, cmd):
+        self.reader = CpuUtilization()
+
+    def read(self):
+        return self.reader.read()
+
+    def columns(self, first):
+        return cpu_columns(len(first))
+
+    def rows(self, prev, cur, elapsed, ts):
+        return [cpu_utilization(prev, cur)]
+
+    def close(self):
+        self.reader.close()
+
+
+class SoftnetSource:
+    """Per cpu soft net rates, same rows as monitor_softnet_stat.py --rate"""
+    tag = 'softnet'
+
+    def __init__(self, cmd):
+        self.reader = SoftnetReader()
+
+    def read(self):
+        return self.reader.read()
+
+    def columns(self, first):
+        return ['ts', 'cpu'] + rate_columns
+
+    def rows(self, prev, cur, elapsed, ts):
+        n_cols, values = cur
+        if len(prev[1]) != len(values):
+            prev = cur
+        return [[ts, *r] for r in softnet_rates(prev[1], values, n_cols, elapsed)]
+
+    def close(self):
+        self.reader.close()
+
+
+class InterruptSource:
+    """Per queue x per cpu interrupt deltas, same rows as monitor_txrx_int.py"""
+    tag = 'int'
+
+    def __init__(self, cmd):
+        self.reader = TxRxInterrupts(cmd.interface, pattern=cmd.int_pattern)
+        self.reader.build_index()
+
+    def read(self):
+        matrix = self.reader.read()
+        if matrix is None:
+            raise ValueError(f"interrupt queues not found in {self.reader.file.path}")
+        return matrix
+
+    def columns(self, first):
+        return interrupt_columns(self.reader.index.n_cpus)
+
+    def rows(self, prev, cur, elapsed, ts):
+        if len(prev) != len(cur):
+            prev = cur
+        return [[q, *row] for q, row in enumerate(interrupt_deltas(prev, cur))]
+
+    def close(self):
+        self.reader.close()
+
+
+SOURCE_TYPES = {
+    'queue': QueueSource,
+    'cpu': CpuSource,
+    'softnet': SoftnetSource,
+    'int': InterruptSource,
+}
+
+
+def open_sources(cmd):
+    """Open each requested source, source that fails to open skipped.
+    :param cmd:
+    :return: list of sources
+    """
+    sources = []
+    for name in cmd.sources.split(','):
+        try:
+            sources.append(SOURCE_TYPES[name](cmd))
+        except (OSError, ValueError) as e:
+            print(f"Warning: source {name} disabled: {e}", file=sys.stderr)
+    return sources
+
+
+def read_source(source):
+    """Read one source, a failed read is reported and returns None so the
+    source skips this tick without stopping the others.
+    :param source: source
+    :return: read value or None
+    """
+    try:
+        return source.read()
+    except (OSError, ValueError) as e:
+        print(f"Warning: source {source.tag} skipped: {e}", file=sys.stderr)
+        return None
+
+
+def format_row(values):
+    """Text row, floats (timestamps) with microsecond precision.
+    :param values: list of numbers
+    :return: str
+    """
+    return ' '.join(f"{v:.6f}" if isinstance(v, float) else str(v) for v in values)
+
+
+def run_agent(cmd):
+    """Sample all sources on a shared tick until killed.
+    :param cmd:
+    :return:
+    """
+    sources = []
+    prev = []
+    # first read gives column layout, source that can not be read now is dropped.
+    for source in open_sources(cmd):
+        first = read_source(source)
+        if first is None:
+            source.close()
+            continue
+        sources.append(source)
+        prev.append(first)
+    if not sources:
+        print("Error: no source to sample.", file=sys.stderr)
+        sys.exit(1)
+
+    out = sys.stdout
+    writer = None
+    prev_ts = [time.monotonic()] * len(sources)
+    if cmd.framed:
+        try:
+            writer = FrameWriter(open_frame_output(cmd.framed))
+        except OSError as e:
+            print(f"Error: unable to open framed output {cmd.framed}: {e}", file=sys.stderr)
+            sys.exit(1)
+        writer.hello(cmd.stream_name)
+        for i, (source, first) in enumerate(zip(sources, prev)):
+            writer.schema(i, source.tag, source.columns(first) + TIMESTAMP_COLUMNS)
+        writer.flush()
+    elif cmd.timestamps:
+        for source, first in zip(sources, prev):
+            out.write(f"{source.tag} 0 {columns_header(source.columns(first) + TIMESTAMP_COLUMNS)}\n")
+    try:
+        for tick in tick_deadlines(cmd.sample_time):
+            now = time.monotonic()
+            ts = time.time()
+            suffix = f" {' '.join(timestamp_values(now, ts))}" if cmd.timestamps else ""
+            lines = []
+            for i, source in enumerate(sources):
+                cur = read_source(source)
+                if cur is None:
+                    continue
+                for row in source.rows(prev[i], cur, now - prev_ts[i], ts):
+                    if writer:
+                        writer.row(i, row + [now, ts])
+                    else:
+                        lines.append(f"{source.tag} {tick} {format_row(row)}{suffix}\n")
+                prev[i] = cur
+                prev_ts[i] = now
+            if writer:
+                writer.flush()
+            else:
+                out.write(''.join(lines))
+                out.flush()
+    except (KeyboardInterrupt, BrokenPipeError, ConnectionError):
+        pass
+    finally:
+        for source in sources:
+            source.close()
+        if writer:
+            writer.close()
+
+
+def split_stream(stream, outputs):
+    """Split agent stream into per source files, source tag and tick dropped,
+    so each file has the layout of the standalone collector.
+
+    :param stream: text stream from agent
+    :param outputs: dict source -> output path
+    :return:
+    """
+    files = {tag: open(path, 'w') for tag, path in outputs.items() if path}
+    try:
+        for line in stream:
+            tag, _, values = line.split(' ', 2)
+            f = files.get(tag)
+            if f is not None:
+                f.write(values)
+    finally:
+        for f in files.values():
+            f.close()
+
+
+def main(cmd):
+    if cmd.split:
+        split_stream(sys.stdin, {
+            'queue': cmd.queue,
+            'cpu': cmd.cpu,
+            'softnet': cmd.softnet,
+            'int': cmd.int,
+        })
+    else:
+        run_agent(cmd)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker node agent, sample all node metrics on a shared tick.")
+    parser.add_argument("-i", "--interface", type=str, default="eth1", help="Adapter name.")
+    parser.add_argument("-s", "--sample-time", type=float, default=1.0, help="Sample time in seconds.")
+    parser.add_argument("--sources", type=str, default=','.join(AGENT_SOURCES),
+                        help=f"Comma separated list of sources ({', '.join(AGENT_SOURCES)}).")
+    parser.add_argument("-T", "--timestamps", action="store_true",
+                        help="Append monotonic and wall clock timestamp columns.")
+    parser.add_argument("--framed", type=str, nargs='?', const='-', default=None,
+                        help="Write rows as binary frames to stdout or host:port / unix:/path.")
+    parser.add_argument("--stream-name", type=str, default=socket.gethostname(),
+                        help="Stream name sent to aggregator, default hostname.")
+    parser.add_argument("--int-pattern", type=str, default=None, help="Regex for interrupt queue label.")
+    parser.add_argument("--split", action="store_true", help="Read agent stream from stdin and split per source.")
+    parser.add_argument("--queue", type=str, help="Split mode, output file for queue rates.")
+    parser.add_argument("--cpu", type=str, help="Split mode, output file for cpu utilization.")
+    parser.add_argument("--softnet", type=str, help="Split mode, output file for soft net rates.")
+    parser.add_argument("--int", type=str, help="Split mode, output file for interrupts.")
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,961 @@
+# Experiment orchestrator, python asyncio version of run_monitor_pps.sh
+# (inter pod collect mode) and of inference.py run_sampling sweep.
+#
+# run_monitor_pps.sh does each kubectl / ssh round trip serially, i.e.
+# `kubectl get pods` per pod, two `numactl -s` per TX pod, `kubectl get
+# node` per node, before traffic starts, and run_sampling starts the
+# script again for every (pps, cores) point.  Here
+#   - pods and nodes discovered once per sweep with a single
+#     `kubectl get pods -o json` and `kubectl get nodes -o json`,
+#   - numactl -s on every TX pod, pkill of old trafgen, trafgen start
+#     and collectors start run concurrently,
+#   - ssh reuse one master connection per worker (ControlMaster).
+#   - pods, cores and worker layout cached in topology.py snapshot,
+#     later sweeps only check pod UIDs with one `kubectl get pods`.
+#   - --compile_profiles pushes trafgen profiles of every size first,
+#     compiled locally by profile_compiler.py, no per size kubectl exec.
+#   - --rss_per_queue K sends K flows to every RX queue (or --rss_queues),
+#     flows picked with adapter Toeplitz key by rss.py.
+#   - --mixes imix / 64:7,1500:1 runs weighted frame size mixes, mix tag
+#     replaces frame size in file names and records.
+#   - trafgen cores planned by placement.py away from adapter queue
+#     interrupt cores and their SMT siblings (--placement middle for the
+#     run_monitor_pps.sh rule), plan saved in stop_*.json.
+#   - every run writes run_*.json manifest (run_manifest.py), parameters,
+#     produced files and worker kernel / driver / queues / rings / IRQs.
+#
+# Output files are the same as run_monitor_pps.sh so inference.py does
+# not change.  --framed runs collectors with --framed and aggregator.py
+# StreamAggregator writes one .npz per experiment instead.
+#
+# --kubectl / --ssh point to any executable with the same CLI, i.e. a fake
+# script that prints canned json, so the orchestrator can run offline.
+#
+# --search replaces the fixed pps list with RFC 2544 style binary search
+# of max rate with loss under --drop_threshold, for each core count and
+# frame size.  Each trial streams pod samplers (--framed) into aggregator,
+# loss read live ends a clearly failing trial early.  Trials (.npz) and
+# search_cores_<c>_size_<s>_ts_<ts>.json are written to metric dir.
+#
+# --converge watches pod pps and drops live and stops a run once the last
+# --window samples of every pod have coefficient of variation under
+# --cv_threshold, -s becomes upper bound.  Stop reason and elapsed time
+# of every run written to stop_<...>_ts_<ts>.json in metric dir.
+#
+# python3 orchestrator.py --pps_values 10000 100000 --cores 1 2 -s 120
+# python3 orchestrator.py --search --cores 1 2 --sizes 64 512 --drop_threshold 0.001
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import sys
+import tempfile
+import time
+
+from placement import plan_placement, load_interrupt_cpus, latest_interrupt_log
+from profile_compiler import mean_frame_size, parse_mix
+from rss import flow_tag, parse_queues
+from run_manifest import build_manifest, node_environment, write_manifest
+from topology import cached_snapshot, DEFAULT_CACHE, DEFAULT_TTL
+
+DEFAULT_KUBECONFIG = "/etc/rancher/rke2/rke2.yaml"
+TRAFGEN = "/usr/local/sbin/trafgen"
+ETHERNET_HEADER_SIZE = 14
+IP_HEADER_SIZE = 20
+UDP_HEADER_SIZE = 8
+TOTAL_OVERHEAD = ETHERNET_HEADER_SIZE + IP_HEADER_SIZE + UDP_HEADER_SIZE
+
+
+def ensure_kubeconfig():
+    """Use rke2 kubeconfig when KUBECONFIG is not set, as run_monitor_pps.sh does."""
+    if "KUBECONFIG" not in os.environ and os.path.isfile(DEFAULT_KUBECONFIG):
+        os.environ["KUBECONFIG"] = DEFAULT_KUBECONFIG
+
+
+class Remote:
+    """Runs kubectl and ssh commands as asyncio subprocesses."""
+
+    def __init__(self, kubectl="kubectl", ssh="ssh", control_dir=None, is_verbose=False):
+        """
+        :param kubectl: kubectl executable, can be a fake for offline run
+        :param ssh: ssh executable, can be a fake for offline run
+        :param control_dir: directory for ssh ControlMaster sockets
+        :param is_verbose: print each command
+        """
+        ensure_kubeconfig()
+        self.kubectl_bin = kubectl
+        self.ssh_bin = ssh
+        self.control_dir = control_dir or tempfile.mkdtemp(prefix="trafgen-ssh-")
+        self.is_verbose = is_verbose
+        self.procs = []
+
+    def ssh_argv(self, node, *cmd):
+        return [self.ssh_bin,
+                "-o", "ControlMaster=auto",
+                "-o", f"ControlPath={self.control_dir}/%r@%h:%p",
+                "-o", "ControlPersist=600",
+                f"root@{node}", *cmd]
+
+    def kubectl_argv(self, *args):
+        return [self.kubectl_bin, *args]
+
+    def exec_argv(self, pod, *cmd, stdin=False):
+        return self.kubectl_argv("exec", *(["-i"] if stdin else []), pod, "--", *cmd)
+
+    async def run(self, argv, check=False, input=None):
+        """Run command and wait.
+        :param argv: command
+        :param check: raise RuntimeError on non zero exit
+        :param input: optional bytes written to stdin
+        :return: (returncode, stdout str)
+        """
+        if self.is_verbose:
+            print(" ".join(shlex.quote(a) for a in argv))
+        proc = await asyncio.create_subprocess_exec(
+            *argv, stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+        out, _ = await proc.communicate(input)
+        if check and proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(argv)} failed with exit code {proc.returncode}")
+        return proc.returncode, out.decode(errors="replace")
+
+    async def start(self, argv, output=None, stdout=None):
+        """Start background command.
+        :param argv: command
+        :param output: optional path, stdout written to file
+        :param stdout: or explicit stdout i.e. asyncio.subprocess.PIPE
+        :return: process
+        """
+        if self.is_verbose:
+            print(" ".join(shlex.quote(a) for a in argv) + (f" > {output}" if output else ""))
+        if output:
+            with open(output, "wb") as f:
+                proc = await asyncio.create_subprocess_exec(*argv, stdout=f, stderr=asyncio.subprocess.DEVNULL)
+        else:
+            proc = await asyncio.create_subprocess_exec(
+                *argv, stdout=stdout if stdout is not None else asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL)
+        self.procs.append(proc)
+        return proc
+
+    async def wait_all(self, timeout=None):
+        """Wait for all background commands, terminate what is left after timeout."""
+        pending = [asyncio.ensure_future(p.wait()) for p in self.procs if p.returncode is None]
+        if pending:
+            _, still = await asyncio.wait(pending, timeout=timeout)
+            if still:
+                self.terminate()
+                await asyncio.wait(still, timeout=5)
+        self.procs = [p for p in self.procs if p.returncode is None]
+
+    def terminate(self):
+        for proc in self.procs:
+            if proc.returncode is None:
+                try:
+                    proc.terminate()
+                except ProcessLookupError:
+                    pass
+
+    async def close_masters(self, nodes):
+        """Stop ssh master connections."""
+        await asyncio.gather(*(self.run([self.ssh_bin, "-o", f"ControlPath={self.control_dir}/%r@%h:%p",
+                                         "-O", "exit", f"root@{n}"]) for n in set(nodes)))
+
+
+def generate_core_range(cores, num_cores):
+    """Same as generate_core_range in run_monitor_pps.sh, num_cores
+    in the middle of physcpubind list.
+
+    :param cores: list of cores from numactl physcpubind
+    :param num_cores: number of cores
+    :return: str range i.e. 2-4
+    """
+    if num_cores < 1 or num_cores > len(cores):
+        raise ValueError(f"Invalid number of cores requested {num_cores}, pod has {len(cores)}")
+    start = (len(cores) - num_cores) // 2
+    return f"{cores[start]}-{cores[start + num_cores - 1]}"
+
+
+def expand_core_range(core_range):
+    """2-5 -> 2,3,4,5"""
+    start, _, end = core_range.partition("-")
+    return ",".join(str(c) for c in range(int(start), int(end or start) + 1))
+
+
+class Topology:
+    """Pods, nodes and pod cores discovered once for a whole sweep."""
+
+    def __init__(self, tx_pods, rx_pods, pod_nodes, node_addrs, pod_cores, snapshot=None):
+        self.tx_pods = tx_pods
+        self.rx_pods = rx_pods
+        self.pod_nodes = pod_nodes
+        self.node_addrs = node_addrs
+        self.pod_cores = pod_cores
+        # topology.TopologySnapshot, NUMA / adapter queue / IRQ layout
+        self.snapshot = snapshot
+        # tx-pod-int log picked at start of sweep and plans made from it,
+        # so every point of a sweep gets the same placement.
+        self.int_log = None
+        self.plans = {}
+
+    @property
+    def tx_node_addr(self):
+        return self.node_addrs[self.pod_nodes[self.tx_pods[0]]]
+
+    @property
+    def rx_node_addr(self):
+        return self.node_addrs[self.pod_nodes[self.rx_pods[0]]]
+
+    def use_interrupt_log(self, output_dir):
+        """Pick newest tx-pod-int log in output_dir for placement, called
+        once at start of sweep, logs written by the sweep itself are not used.
+
+        :param output_dir: metric dir
+        :return: log path or None
+        """
+        self.int_log = latest_interrupt_log(output_dir) if output_dir else None
+        self.plans = {}
+        return self.int_log
+
+    def plan_cores(self, num_cores, placement="irq"):
+        """Trafgen cores per TX pod, planned once per core count.
+
+        :param num_cores: cores per pod
+        :param placement: 'middle' same rule as run_monitor_pps.sh, 'irq'
+                          placement.py planner, avoids adapter interrupt cores,
+                          cpus that serviced interrupts in int_log added
+        :return: (list of (default_core, task_set_core), list of CorePlan or None)
+        """
+        if placement == "middle" or self.snapshot is None:
+            return self.core_assignment(num_cores), None
+        plans = self.plans.get(num_cores)
+        if plans is None:
+            extra = {}
+            int_log = None
+            if self.int_log:
+                try:
+                    extra[self.pod_nodes[self.tx_pods[0]]] = load_interrupt_cpus(self.int_log)
+                    int_log = os.path.basename(self.int_log)
+                except OSError:
+                    pass
+            plans = plan_placement(self.snapshot, num_cores, extra, int_log)
+            self.plans[num_cores] = plans
+        return [(p.default_core, p.task_set) for p in plans], plans
+
+    def environment(self, if_name):
+        """Run manifest environment of TX and RX worker."""
+        out = {}
+        for side, pods in (("tx", self.tx_pods), ("rx", self.rx_pods)):
+            node = self.pod_nodes[pods[0]]
+            info = self.snapshot.node_info.get(node) if self.snapshot else None
+            out[side] = node_environment(node, self.node_addrs[node], info, if_name)
+        return out
+
+    def core_assignment(self, num_cores):
+        """Per TX pod (bind cores list, taskset range), same rule as run_monitor_pps.sh
+        :param num_cores: cores per pod
+        :return: list of (default_core, task_set_core)
+        """
+        out = []
+        for pod in self.tx_pods:
+            cores = self.pod_cores[pod]
+            if num_cores > 1:
+                task_set = generate_core_range(cores, num_cores)
+                out.append((expand_core_range(task_set), task_set))
+            else:
+                out.append((cores[0], cores[0]))
+        return out
+
+
+async def discover(remote, num_pairs, node_if_name="eth1", cache=DEFAULT_CACHE, ttl=DEFAULT_TTL,
+                   refresh=False):
+    """Resolve server / client pods, their nodes, node address and cores,
+    served from topology snapshot cache while pods are unchanged.
+
+    :param remote: Remote
+    :param num_pairs: number of tx / rx pairs
+    :param node_if_name: worker adapter
+    :param cache: snapshot file, None disables cache
+    :param ttl: max snapshot age in seconds
+    :param refresh: gather again even if cache is valid
+    :return: Topology
+    """
+    snapshot = await cached_snapshot(remote, num_pairs, node_if_name, cache, ttl, refresh,
+                                     is_verbose=remote.is_verbose)
+    return Topology(snapshot.tx_pods, snapshot.rx_pods, snapshot.pod_nodes, snapshot.node_addrs,
+                    snapshot.pod_cores, snapshot)
+
+
+async def compile_profiles(remote, topology, sizes, profile_args):
+    """Push trafgen profiles for sizes to every TX pod (profile_compiler.py)."""
+    from profile_compiler import deploy_profiles
+
+    start = time.monotonic()
+    pushed = await deploy_profiles(remote, topology.snapshot, sizes, **profile_args)
+    print(f"Profiles for sizes {' '.join(map(str, sizes))} pushed to "
+          f"{sum(1 for n in pushed.values() if n)}/{len(pushed)} pods in {time.monotonic() - start:.1f}s")
+
+
+async def kill_all_trafgen(remote, topology):
+    """Stop trafgen left from previous run on every TX pod, concurrently."""
+    await asyncio.gather(*(remote.run(remote.exec_argv(pod, "pkill", "-f", "trafgen"))
+                           for pod in topology.tx_pods))
+
+
+async def check_monitor_script(remote, topology, monitor_file):
+    """Every RX pod must have the monitor script."""
+    results = await asyncio.gather(*(remote.run(remote.exec_argv(pod, "ls", monitor_file))
+                                     for pod in topology.rx_pods))
+    missing = [pod for pod, (rc, _) in zip(topology.rx_pods, results) if rc != 0]
+    if missing:
+        raise RuntimeError(f"pods missing the monitor script {monitor_file}: {' '.join(missing)}")
+
+
+class Experiment:
+    """Parameters of one run, same options as run_monitor_pps.sh"""
+
+    def __init__(self, pps, num_cores=1, num_pairs=3, runtime=120, margin=10, packet_size=64,
+                 if_name="eth0", node_if_name="eth1", output_dir="metrics", randomized_src_port=False,
+                 use_taskset=False, use_node_agent=True, framed=False, converge=False,
+                 window=10, cv_threshold=0.02, min_runtime=15.0, placement="irq", profile_variant=None,
+                 mix=None):
+        self.pps = pps
+        self.num_cores = num_cores
+        self.num_pairs = num_pairs
+        self.runtime = runtime
+        self.margin = margin
+        self.packet_size = packet_size
+        self.if_name = if_name
+        self.node_if_name = node_if_name
+        self.output_dir = output_dir
+        self.randomized_src_port = randomized_src_port
+        self.use_taskset = use_taskset
+        self.use_node_agent = use_node_agent
+        self.framed = framed
+        # steady state, stop run early when last window samples settled
+        self.converge = converge
+        self.window = window
+        self.cv_threshold = cv_threshold
+        self.min_runtime = min_runtime
+        # trafgen core placement, 'middle' or 'irq' (placement.py)
+        self.placement = placement
+        # profile file variant, i.e. rss_2 (profile_compiler.py), None default profile
+        self.profile_variant = profile_variant
+        # frame size mix tag (profile_compiler.parse_mix), replaces packet_size
+        self.mix = mix
+
+    @property
+    def monitor_timeout(self):
+        return self.runtime + self.margin
+
+    @property
+    def size_tag(self):
+        """Frame size or mix tag, size field of file names"""
+        return self.mix or self.packet_size
+
+    @property
+    def profile(self):
+        if self.mix:
+            return f"/tmp/udp_{self.mix}.trafgen"
+        payload = self.packet_size - TOTAL_OVERHEAD
+        if payload <= 0:
+            raise ValueError("Packet size too small to accommodate headers.")
+        suffix = ".random" if self.randomized_src_port else ""
+        if self.profile_variant:
+            suffix = f".{self.profile_variant}"
+        return f"/tmp/udp_{payload}{suffix}.trafgen"
+
+    @property
+    def file_suffix(self):
+        return (f"pr_{self.pps}_runtime_{self.runtime}_cores_{self.num_cores}"
+                f"_pairs_{self.num_pairs}_size_{self.size_tag}")
+
+
+async def start_trafgen(remote, topology, exp, cores):
+    """Start trafgen on each TX pod, return processes."""
+    procs = []
+    for pod, (default_core, task_set_core) in zip(topology.tx_pods, cores):
+        taskset = ["taskset", "-c", task_set_core] if exp.use_taskset else []
+        print(f"Starting on pod {pod} with core {default_core} and pps {exp.pps} "
+              f"for {exp.runtime} sec profile {exp.profile}")
+        procs.append(remote.start(remote.exec_argv(
+            pod, "timeout", f"{exp.runtime}s", *taskset, TRAFGEN, "--cpp", "--dev", exp.if_name,
+            "-i", exp.profile, "--no-sock-mem", "--rate", f"{exp.pps}pps",
+            "--bind-cpus", default_core, "-H")))
+    procs = await asyncio.gather(*procs)
+    await asyncio.sleep(1)
+    for pod, proc in zip(topology.tx_pods, procs):
+        state = "is running" if proc.returncode is None else f"failed to start ({proc.returncode})"
+        print(f" - Trafgen on pod {pod} {state}.")
+    return procs
+
+
+async def split_agent_stream(reader, outputs):
+    """Async version of node_agent.split_stream, demux agent stream into per source logs."""
+    files = {tag: open(path, "wb") for tag, path in outputs.items()}
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            tag, _, values = line.split(b" ", 2)
+            f = files.get(tag.decode())
+            if f is not None:
+                f.write(values)
+    finally:
+        for f in files.values():
+            f.close()
+
+
+# pod sampler tuple columns used for steady state, rx_pps, tx_pps, rx_drop, tx_drop
+STEADY_COLUMNS = 4
+
+
+async def tee_pod_stream(reader, path, series):
+    """Write pod sampler text output to log and keep numeric rows for live checks."""
+    with open(path, "wb") as f:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            f.write(line)
+            if not line.startswith(b"#"):
+                try:
+                    series.append([float(v) for v in line.split(b",")[:STEADY_COLUMNS]])
+                except ValueError:
+                    pass
+
+
+class SteadyState:
+    """Decide run has settled from last window samples of every pod.
+
+    TX pods are judged on tx_pps / tx_drop, RX pods on rx_pps / rx_drop.
+    A pod is steady when coefficient of variation of pps and std of
+    drops relative to mean pps both under cv_threshold.
+    """
+
+    def __init__(self, window=10, cv_threshold=0.02):
+        self.window = window
+        self.cv_threshold = cv_threshold
+
+    def check(self, series, tx_pods):
+        """
+        :param series: dict pod -> sequence of rows rx_pps, tx_pps, rx_drop, tx_drop
+        :param tx_pods: set of TX pod names
+        :return: (steady, dict pod -> {'cv', 'drop_cv', 'mean_pps'})
+        """
+        stats = {}
+        steady = bool(series)
+        for pod, rows in series.items():
+            if len(rows) < self.window:
+                return False, stats
+            last = rows[-self.window:]
+            pps_col, drop_col = (1, 3) if pod in tx_pods else (0, 2)
+            pps = [r[pps_col] for r in last]
+            drops = [r[drop_col] for r in last]
+            mean = sum(pps) / len(pps)
+            cv = _std(pps) / mean if mean > 0 else (0.0 if not any(pps) else float("inf"))
+            drop_cv = _std(drops) / mean if mean > 0 else (0.0 if not any(drops) else float("inf"))
+            stats[pod] = {"cv": cv, "drop_cv": drop_cv, "mean_pps": mean}
+            steady = steady and cv <= self.cv_threshold and drop_cv <= self.cv_threshold
+        return steady, stats
+
+
+def _std(values):
+    mean = sum(values) / len(values)
+    return (sum((v - mean) ** 2 for v in values) / len(values)) ** 0.5
+
+
+def aggregator_series(aggregator, pods):
+    """Pod rows from framed streams, same layout as tee_pod_stream."""
+    series = {}
+    for pod in pods:
+        for source in aggregator.streams.get(pod, {}).values():
+            if source.name == "pod" and len(source):
+                series[pod] = source.matrix()[:, :STEADY_COLUMNS].tolist()
+    return series
+
+
+async def start_collectors(remote, topology, exp, cores, aggregator=None, series=None, files=None):
+    """Start pod samplers and node agents, same files as collect_pps_rate_all
+    and collect_node_metrics, or framed streams into aggregator.
+
+    :param series: optional dict, pod text output also parsed into
+                   series[pod] rows while written to log.
+    :param files: optional dict, filled role -> log names, run manifest files
+    :return: list of awaitables that finish when collectors exit
+    """
+    timestamp = time.strftime("%Y%m%d%H%M%S")
+    suffix = exp.file_suffix
+    waiters = []
+    framed = ["--framed"] if aggregator else []
+
+    pods = [("client", pod, cores[i][1], exp.if_name) for i, pod in enumerate(topology.rx_pods)]
+    pods += [("server", pod, cores[i][1], "eth0") for i, pod in enumerate(topology.tx_pods)]
+    for role, pod, core_list, if_name in pods:
+        argv = remote.exec_argv(pod, "timeout", f"{exp.monitor_timeout}s", "python3", "/tmp/monitor_pps.py",
+                                "-i", if_name, "-d", "tuple", "-T", *framed)
+        output = os.path.join(exp.output_dir, f"{role}_{pod}_{suffix}_core_list_{core_list}_ts_{timestamp}.log")
+        if files is not None and not aggregator:
+            files.setdefault(role, []).append(os.path.basename(output))
+        if aggregator:
+            waiters.append(aggregator.run_command(pod, argv))
+        elif series is not None:
+            proc = await remote.start(argv, stdout=asyncio.subprocess.PIPE)
+            waiters.append(tee_pod_stream(proc.stdout, output, series.setdefault(pod, [])))
+        else:
+            waiters.append((await remote.start(argv, output)).wait())
+
+    for side, node_addr in (("tx", topology.tx_node_addr), ("rx", topology.rx_node_addr)):
+        argv = remote.ssh_argv(node_addr, "timeout", f"{exp.monitor_timeout}s", "python3", "/tmp/node_agent.py",
+                               "-i", exp.node_if_name, "-T", *framed)
+        if aggregator:
+            waiters.append(aggregator.run_command(f"{side}-node", argv))
+            continue
+        outputs = {
+            "queue": f"{side}-pod-queue_{suffix}_ts_{timestamp}.log",
+            "cpu": f"{side}-pod-cpu_{suffix}_ts_{timestamp}.log",
+            "softnet": f"{side}-softnet-stat_{exp.pps}_runtime_{exp.runtime}_cores_{exp.num_cores}"
+                       f"_pairs_{exp.num_pairs}_size_{exp.size_tag}_ts_{timestamp}.log",
+            "int": f"{side}-pod-int_{suffix}_{timestamp}.log",
+        }
+        if files is not None:
+            for kind, role in (("queue", "queues"), ("cpu", "cpu"), ("softnet", "softnet"), ("int", "pod_int")):
+                files.setdefault(f"{side}_{role}", []).append(outputs[kind])
+        outputs = {k: os.path.join(exp.output_dir, v) for k, v in outputs.items()}
+        proc = await remote.start(argv, stdout=asyncio.subprocess.PIPE)
+        waiters.append(split_agent_stream(proc.stdout, outputs))
+    return waiters, timestamp
+
+
+async def run_experiment(remote, topology, exp):
+    """One point of a sweep: kill old trafgen, start trafgen and collectors, wait.
+
+    With exp.converge pod rates watched live and run stopped as soon as
+    SteadyState holds, why and when run stopped written to
+    stop_<suffix>_ts_<ts>.json
+
+    :return: dict stop record
+    """
+    os.makedirs(exp.output_dir, exist_ok=True)
+    cores, plans = topology.plan_cores(exp.num_cores, exp.placement)
+    for i, (pod, (default_core, task_set_core)) in enumerate(zip(topology.tx_pods, cores)):
+        print(f" - Allocated for tx pod {pod} cores: {default_core} taskset cores: {task_set_core}")
+        if plans and plans[i].contention:
+            warn = " ".join(f"{c}:{'/'.join(r)}" for c, r in plans[i].contention.items())
+            print(f"   predicted contention {warn}")
+
+    await kill_all_trafgen(remote, topology)
+
+    aggregator = None
+    if exp.framed:
+        from aggregator import StreamAggregator
+        aggregator = StreamAggregator()
+    series = {} if exp.converge and not aggregator else None
+    files = {}
+
+    # trafgen and collectors start together, as in run_monitor_pps.sh
+    start = time.time()
+    (waiters, timestamp), _ = await asyncio.gather(
+        start_collectors(remote, topology, exp, cores, aggregator, series, files),
+        start_trafgen(remote, topology, exp, cores))
+    collectors = asyncio.ensure_future(asyncio.gather(*waiters))
+
+    stop_reason = "runtime"
+    stats = {}
+    detector = SteadyState(exp.window, exp.cv_threshold) if exp.converge else None
+    pods = topology.tx_pods + topology.rx_pods
+    while not collectors.done():
+        await asyncio.wait([collectors], timeout=1)
+        elapsed = time.time() - start
+        if elapsed > exp.monitor_timeout + 5:
+            print("Warning: collectors did not exit in time, terminating.")
+            stop_reason = "timeout"
+            break
+        if detector and elapsed >= exp.min_runtime:
+            current = aggregator_series(aggregator, pods) if aggregator else series
+            steady, stats = detector.check(current, set(topology.tx_pods))
+            if steady:
+                print(f" - Steady state after {elapsed:.1f}s, stopping run.")
+                stop_reason = "converged"
+                await kill_all_trafgen(remote, topology)
+                break
+
+    if aggregator:
+        aggregator.terminate()
+    remote.terminate()
+    await asyncio.wait([collectors], timeout=5)
+    await remote.wait_all(timeout=5)
+
+    record = {
+        "pps": exp.pps,
+        "cores": exp.num_cores,
+        "pairs": exp.num_pairs,
+        "size": exp.size_tag,
+        "stop_reason": stop_reason,
+        "elapsed": round(time.time() - start, 1),
+        "runtime": exp.runtime,
+        "converge": exp.converge,
+        "window": exp.window,
+        "cv_threshold": exp.cv_threshold,
+        "stats": stats,
+        "profile": exp.profile,
+        "placement": exp.placement if plans else "middle",
+        "core_plan": [p.to_dict() for p in plans] if plans else
+                     [{"pod": pod, "task_set": c[1]} for pod, c in zip(topology.tx_pods, cores)],
+    }
+    stop_file = f"stop_{exp.file_suffix}_ts_{timestamp}.json"
+    with open(os.path.join(exp.output_dir, stop_file), "w") as f:
+        json.dump(record, f, indent=4)
+    files["stop"] = [stop_file]
+
+    if aggregator:
+        output = os.path.join(exp.output_dir, f"experiment_{exp.file_suffix}_ts_{timestamp}.npz")
+        rows = aggregator.save(output)
+        print(f"Saved {rows} rows to {output}")
+        files["npz"] = [os.path.basename(output)]
+
+    write_manifest(exp.output_dir, build_manifest(
+        exp.pps, exp.runtime, exp.num_cores, exp.num_pairs, exp.size_tag, timestamp, files,
+        topology.environment(exp.node_if_name),
+        tx_pods=topology.tx_pods, rx_pods=topology.rx_pods, core_list=[c[1] for c in cores],
+        mix=exp.mix, profile=exp.profile, placement=record["placement"],
+        stop_reason=stop_reason, elapsed=record["elapsed"], writer="orchestrator.py"), exp.file_suffix)
+    return record
+
+
+async def run_sweep(pps_values, num_cores, remote=None, num_pairs=3, monitor_file="/tmp/monitor_pps.py",
+                    topology_args=None, profile_args=None, mixes=None, **kwargs):
+    """Discover once and run every (pps, cores) point.
+
+    :param pps_values: list of pps
+    :param num_cores: list of core counts
+    :param remote: Remote, default real kubectl / ssh
+    :param num_pairs: number of tx / rx pairs
+    :param monitor_file: monitor script that must exist on RX pods
+    :param topology_args: discover kwargs (cache, ttl, refresh)
+    :param profile_args: if set, deploy_profiles kwargs, profiles compiled and pushed first
+    :param mixes: optional frame size mix tags, each point runs once per mix instead of packet_size
+    :param kwargs: Experiment parameters
+    :return:
+    """
+    remote = remote or Remote()
+    topology = await discover(remote, num_pairs, kwargs.get('node_if_name', 'eth1'), **(topology_args or {}))
+    if profile_args is not None:
+        await compile_profiles(remote, topology, [kwargs.get('packet_size', 64)], dict(profile_args, mixes=mixes or ()))
+    print("\nNode Information:")
+    print(f"{'TX pod worker address:':<30} {topology.tx_node_addr}")
+    print(f"{'RX pod worker address:':<30} {topology.rx_node_addr}")
+    await check_monitor_script(remote, topology, monitor_file)
+    topology.use_interrupt_log(kwargs.get('output_dir', 'metrics'))
+    try:
+        for pps in pps_values:
+            for cores in num_cores:
+                for mix in mixes or [None]:
+                    print(f"Running sampling for {pps} pps , core count {cores}"
+                          f"{f' , mix {mix}' if mix else ''} ...")
+                    await run_experiment(remote, topology, Experiment(pps, cores, num_pairs, mix=mix, **kwargs))
+    finally:
+        remote.terminate()
+        await remote.close_masters([topology.tx_node_addr, topology.rx_node_addr])
+
+
+def trial_totals(aggregator, topology, since):
+    """Pod rates of a running trial, only samples taken after since.
+
+    :param aggregator: StreamAggregator with framed pod streams
+    :param topology: Topology, stream name is pod name
+    :param since: wall clock, i.e. trial start + warmup
+    :return: dict tx_pps, rx_pps (sum of per pod mean rate), tx_drop,
+             rx_drop (per second), loss ratio and samples (min per pod),
+             loss counts TX drops and the larger of TX - RX gap and RX
+             drops, over TX offered (tx_pps + tx_drop)
+    """
+    totals = {'tx_pps': 0.0, 'rx_pps': 0.0, 'tx_drop': 0.0, 'rx_drop': 0.0}
+    samples = []
+    tx_pods = set(topology.tx_pods)
+    rx_pods = set(topology.rx_pods)
+    for stream, sources in aggregator.streams.items():
+        if stream not in tx_pods and stream not in rx_pods:
+            continue
+        for source in sources.values():
+            if source.name != 'pod' or not len(source):
+                continue
+            m = source.matrix()
+            m = m[m[:, source.columns.index('wall_ts')] >= since]
+            samples.append(len(m))
+            if not len(m):
+                continue
+            side = 'tx' if stream in tx_pods else 'rx'
+            totals[f'{side}_pps'] += m[:, source.columns.index(f'{side}_pps')].mean()
+            totals[f'{side}_drop'] += m[:, source.columns.index(f'{side}_drop')].mean()
+    offered = totals['tx_pps'] + totals['tx_drop']
+    lost = max(0.0, totals['tx_pps'] - totals['rx_pps'], totals['rx_drop']) + totals['tx_drop']
+    totals['loss'] = lost / offered if offered > 0 else 1.0
+    totals['samples'] = min(samples) if samples else 0
+    return totals
+
+
+async def run_trial(remote, topology, exp, warmup=3.0, threshold=0.001, fail_fast=0.05, min_tx_ratio=0.95):
+    """One search trial, trafgen at exp.pps on every TX pod, pod samplers
+    stream framed rows into aggregator and loss, including TX / RX drop
+    counters, is checked every second.
+    Trial stops early when loss after warmup is clearly above fail_fast.
+
+    :param remote: Remote
+    :param topology: Topology
+    :param exp: Experiment, runtime is trial length
+    :param warmup: seconds ignored at start
+    :param threshold: max loss ratio for trial to pass
+    :param fail_fast: loss ratio that ends trial early
+    :param min_tx_ratio: TX pods must reach this fraction of offered rate
+    :return: dict trial result
+    """
+    from aggregator import StreamAggregator
+
+    os.makedirs(exp.output_dir, exist_ok=True)
+    cores, plans = topology.plan_cores(exp.num_cores, exp.placement)
+    await kill_all_trafgen(remote, topology)
+    aggregator = StreamAggregator()
+    (waiters, timestamp), _ = await asyncio.gather(
+        start_collectors(remote, topology, exp, cores, aggregator),
+        start_trafgen(remote, topology, exp, cores))
+    tasks = [asyncio.ensure_future(w) for w in waiters]
+
+    start = time.time()
+    stop_reason = 'duration'
+    while time.time() - start < exp.runtime:
+        await asyncio.sleep(1)
+        totals = trial_totals(aggregator, topology, start + warmup)
+        if totals['samples'] >= 3 and totals['loss'] > fail_fast:
+            stop_reason = 'fail_fast'
+            break
+
+    aggregator.terminate()
+    await kill_all_trafgen(remote, topology)
+    remote.terminate()
+    await asyncio.wait(tasks, timeout=5)
+    await remote.wait_all(timeout=5)
+
+    totals = trial_totals(aggregator, topology, start + warmup)
+    offered = exp.pps * len(topology.tx_pods)
+    output = os.path.join(exp.output_dir, f"trial_{exp.file_suffix}_ts_{timestamp}.npz")
+    aggregator.save(output)
+    result = {
+        'pps': exp.pps,
+        'offered_pps': offered,
+        'passed': bool(totals['loss'] <= threshold and totals['tx_pps'] >= min_tx_ratio * offered),
+        'duration': round(time.time() - start, 1),
+        'stop_reason': stop_reason,
+        'file': output,
+        'core_plan': [p.to_dict() for p in plans] if plans else None,
+        **{k: float(v) for k, v in totals.items()},
+    }
+    print(f" - Trial {exp.pps} pps: tx {result['tx_pps']:.0f} rx {result['rx_pps']:.0f} "
+          f"drop {result['tx_drop']:.0f}/{result['rx_drop']:.0f} loss {result['loss']:.5f} {'pass' if result['passed'] else 'fail'} ({stop_reason})")
+    return result
+
+
+async def search_max_rate(remote, topology, exp_args, min_pps=1000, max_pps=1000000, resolution=0.02,
+                          max_trials=12, **trial_args):
+    """RFC 2544 style binary search of the highest per pod rate with loss under threshold.
+
+    First trial at max_pps, if it passes we are done, otherwise halve the
+    interval [min_pps, max_pps] until it is narrower than resolution * max_pps.
+
+    :param remote: Remote
+    :param topology: Topology
+    :param exp_args: Experiment kwargs (num_cores, packet_size, runtime ...) without pps
+    :param min_pps: lower bound, assumed lossless
+    :param max_pps: upper bound
+    :param resolution: stop when interval narrower than this fraction of max_pps
+    :param max_trials: upper bound on trials
+    :param trial_args: run_trial kwargs
+    :return: (max lossless pps or None, list of trial results)
+    """
+    trials = []
+
+    async def trial(pps):
+        result = await run_trial(remote, topology, Experiment(pps, **exp_args), **trial_args)
+        trials.append(result)
+        return result['passed']
+
+    if await trial(max_pps):
+        return max_pps, trials
+
+    best = None
+    lo, hi = min_pps, max_pps
+    while len(trials) < max_trials and hi - lo > resolution * max_pps:
+        mid = (lo + hi) // 2
+        if await trial(mid):
+            lo = best = mid
+        else:
+            hi = mid
+    return best, trials
+
+
+async def run_search(num_cores, sizes, remote=None, num_pairs=3, monitor_file="/tmp/monitor_pps.py",
+                     search_args=None, trial_args=None, topology_args=None, profile_args=None, mixes=None,
+                     **kwargs):
+    """Search max lossless rate for each core count and frame size, each
+    search written to <output_dir>/search_cores_<c>_size_<s>_ts_<ts>.json
+    with every trial.
+
+    :param num_cores: list of core counts
+    :param sizes: list of frame sizes
+    :param remote: Remote, default real kubectl / ssh
+    :param num_pairs: number of tx / rx pairs
+    :param monitor_file: monitor script that must exist on RX pods
+    :param search_args: search_max_rate kwargs (min_pps, max_pps, resolution, max_trials)
+    :param trial_args: run_trial kwargs (warmup, threshold, fail_fast)
+    :param topology_args: discover kwargs (cache, ttl, refresh)
+    :param profile_args: if set, deploy_profiles kwargs, profiles compiled and pushed first
+    :param mixes: optional frame size mix tags searched after sizes
+    :param kwargs: Experiment parameters, runtime is trial length
+    :return: list of search results
+    """
+    remote = remote or Remote()
+    topology = await discover(remote, num_pairs, kwargs.get('node_if_name', 'eth1'), **(topology_args or {}))
+    if profile_args is not None:
+        await compile_profiles(remote, topology, sizes, dict(profile_args, mixes=mixes or ()))
+    await check_monitor_script(remote, topology, monitor_file)
+    output_dir = kwargs.get('output_dir', 'metrics')
+    os.makedirs(output_dir, exist_ok=True)
+    topology.use_interrupt_log(output_dir)
+    results = []
+    try:
+        for cores in num_cores:
+            for size in list(sizes) + list(mixes or []):
+                print(f"Searching max lossless rate, core count {cores}, size {size} ...")
+                start = time.time()
+                exp_args = dict(kwargs, num_cores=cores, num_pairs=num_pairs, framed=True,
+                                **({'mix': size} if isinstance(size, str) else {'packet_size': size}))
+                best, trials = await search_max_rate(remote, topology, exp_args,
+                                                     **(search_args or {}), **(trial_args or {}))
+                result = {
+                    'cores': cores,
+                    'size': size,
+                    'pairs': num_pairs,
+                    'max_pps': best,
+                    'mean_frame_size': mean_frame_size(size),
+                    'max_bps': best * mean_frame_size(size) * 8 if best else None,
+                    'search': search_args or {},
+                    'trial': trial_args or {},
+                    'elapsed': round(time.time() - start, 1),
+                    'trials': trials,
+                }
+                output = os.path.join(output_dir, f"search_cores_{cores}_size_{size}_ts_"
+                                                  f"{time.strftime('%Y%m%d%H%M%S')}.json")
+                with open(output, 'w') as f:
+                    json.dump(result, f, indent=4)
+                print(f"Max lossless rate cores {cores} size {size}: {best} pps per pod "
+                      f"({len(trials)} trials, {result['elapsed']}s), saved {output}")
+                results.append(result)
+    finally:
+        remote.terminate()
+        await remote.close_masters([topology.tx_node_addr, topology.rx_node_addr])
+    return results
+
+
+def main(cmd):
+    remote = Remote(cmd.kubectl, cmd.ssh, is_verbose=cmd.verbose)
+    topology_args = {'cache': cmd.topology_cache or None, 'ttl': cmd.topology_ttl,
+                     'refresh': cmd.refresh_topology}
+    profile_args = None
+    profile_variant = None
+    try:
+        mixes = [parse_mix(m)[0] for m in cmd.mixes]
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if cmd.compile_profiles or cmd.rss_per_queue or mixes:
+        rss_queues = parse_queues(cmd.rss_queues) if cmd.rss_queues else None
+        profile_args = {'if_name': cmd.interface, 'rss_per_queue': cmd.rss_per_queue, 'rss_queues': rss_queues}
+        if cmd.rss_per_queue:
+            profile_variant = flow_tag(cmd.rss_per_queue, rss_queues)
+    if cmd.search:
+        try:
+            asyncio.run(run_search(
+                cmd.cores, cmd.sizes or ([] if mixes else [cmd.size]), remote, num_pairs=cmd.num_pairs,
+                search_args={'min_pps': cmd.search_min, 'max_pps': cmd.search_max,
+                             'resolution': cmd.resolution, 'max_trials': cmd.max_trials},
+                trial_args={'threshold': cmd.drop_threshold, 'warmup': cmd.warmup},
+                topology_args=topology_args, profile_args=profile_args, mixes=mixes,
+                runtime=cmd.trial_seconds, if_name=cmd.interface, node_if_name=cmd.node_interface,
+                output_dir=cmd.output_dir, randomized_src_port=cmd.random, use_taskset=cmd.taskset,
+                placement=cmd.placement, profile_variant=profile_variant))
+        except (RuntimeError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    try:
+        asyncio.run(run_sweep(
+            cmd.pps_values, cmd.cores, remote, num_pairs=cmd.num_pairs, topology_args=topology_args,
+            profile_args=profile_args, mixes=mixes,
+            runtime=cmd.seconds, packet_size=cmd.size, if_name=cmd.interface,
+            node_if_name=cmd.node_interface, output_dir=cmd.output_dir,
+            randomized_src_port=cmd.random, use_taskset=cmd.taskset, framed=cmd.framed,
+            converge=cmd.converge, window=cmd.window, cv_threshold=cmd.cv_threshold,
+            min_runtime=cmd.min_runtime, placement=cmd.placement, profile_variant=profile_variant))
+    except (RuntimeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print("Sampling completed.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run trafgen experiments and collect metrics.")
+    parser.add_argument("--pps_values", nargs="*", type=int, default=[1000, 10000, 20000, 50000,
+                                                                       100000, 200000, 500000, 1000000],
+                        help="List of PPS values for sampling")
+    parser.add_argument("--cores", nargs="*", type=int, default=[1, 2, 3, 4],
+                        help="List of num cores for each pps value to run")
+    parser.add_argument("-n", "--num_pairs", type=int, default=3, help="Number of server-client pairs.")
+    parser.add_argument("-s", "--seconds", type=int, default=120, help="Duration of each run in seconds.")
+    parser.add_argument("-z", "--size", type=int, default=64, help="Packet size in bytes.")
+    parser.add_argument("-r", "--random", action="store_true", help="Use randomized source port profile.")
+    parser.add_argument("-i", "--interface", type=str, default="eth0", help="Pod interface.")
+    parser.add_argument("--node_interface", type=str, default="eth1", help="Worker node adapter.")
+    parser.add_argument("--taskset", action="store_true", help="Run trafgen under taskset.")
+    parser.add_argument("--placement", choices=["irq", "middle"], default="irq",
+                        help="Trafgen cores, irq avoids adapter interrupt cores (placement.py), "
+                             "middle same as run_monitor_pps.sh.")
+    parser.add_argument("--framed", action="store_true", help="Aggregate framed streams into one .npz per run.")
+    parser.add_argument("--converge", action="store_true",
+                        help="Stop each run once pod rates reach steady state, -s is upper bound.")
+    parser.add_argument("--window", type=int, default=10, help="Steady state, number of last samples checked.")
+    parser.add_argument("--cv_threshold", type=float, default=0.02,
+                        help="Steady state, max coefficient of variation of pps and drops.")
+    parser.add_argument("--min_runtime", type=float, default=15.0, help="Steady state, minimum run seconds.")
+    parser.add_argument("--search", action="store_true",
+                        help="Binary search max lossless rate for each --cores and --sizes instead of sweep.")
+    parser.add_argument("--sizes", nargs="*", type=int, default=None, help="Search mode, frame sizes.")
+    parser.add_argument("--drop_threshold", type=float, default=0.001, help="Search mode, max loss ratio.")
+    parser.add_argument("--search_min", type=int, default=1000, help="Search mode, lower bound pps per pod.")
+    parser.add_argument("--search_max", type=int, default=1000000, help="Search mode, upper bound pps per pod.")
+    parser.add_argument("--resolution", type=float, default=0.02,
+                        help="Search mode, stop when interval is narrower than this fraction of --search_max.")
+    parser.add_argument("--max_trials", type=int, default=12, help="Search mode, max trials per search.")
+    parser.add_argument("--trial_seconds", type=int, default=20, help="Search mode, trial length in seconds.")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Search mode, seconds ignored at trial start.")
+    parser.add_argument("--compile_profiles", action="store_true",
+                        help="Compile and push trafgen profiles for the run sizes first (profile_compiler.py).")
+    parser.add_argument("--mixes", nargs="*", default=[],
+                        help="Frame size mixes run instead of -z (search: after --sizes), imix or "
+                             "size:weight,... i.e. 64:7,594:4,1518:1, implies --compile_profiles.")
+    parser.add_argument("--rss_per_queue", type=int, default=0,
+                        help="Send K flows per RX queue, ports picked from RX adapter RSS key (rss.py), "
+                             "implies --compile_profiles.")
+    parser.add_argument("--rss_queues", type=str, default=None, help="RX queues loaded with --rss_per_queue, i.e. 0-3.")
+    parser.add_argument("--topology_cache", type=str, default=DEFAULT_CACHE,
+                        help="Topology snapshot file, empty disables cache.")
+    parser.add_argument("--topology_ttl", type=float, default=DEFAULT_TTL, help="Max topology snapshot age in seconds.")
+    parser.add_argument("--refresh_topology", action="store_true", help="Gather topology again, ignore cache.")
+    parser.add_argument("-o", "--output_dir", type=str, default="metrics", help="Metric dir.")
+    parser.add_argument("--kubectl", type=str, default="kubectl", help="kubectl executable, i.e. fake for offline run.")
+    parser.add_argument("--ssh", type=str, default="ssh", help="ssh executable, i.e. fake for offline run.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print each command.")
+    args = parser.parse_args()
+    main(args)
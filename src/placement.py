@@ -0,0 +1,271 @@
+# Core placement planner for trafgen pinning.
+#
+# run_monitor_pps.sh generate_core_range takes the middle slice of pod
+# physcpubind list (first core for a single core run).  It does not know
+# which CPUs service the adapter TxRx queue interrupts, which NUMA node
+# holds the adapter or which CPUs are SMT siblings, so trafgen often shares
+# a core (or physical core) with softirq processing of the very traffic it
+# sends and rates flatten for reasons unrelated to the pod.
+#
+# The planner scores every core of pod cpuset:
+#   irq        core is in affinity of a queue interrupt, or had
+#              interrupts in a previous tx-pod-int log
+#   smt_irq    SMT sibling of such core
+#   shared     already given to trafgen of another pod on the same worker
+#   smt_self   SMT sibling of a core already picked for the same pod
+#   remote_numa  core not on NUMA node of the adapter
+# and picks the cheapest cores, ties go to the legacy slice so without
+# topology info the plan equals generate_core_range.  Reasons left on
+# picked cores are the predicted contention, saved with the run.
+#
+# python3 placement.py -c 2                 # plan from topology.py snapshot
+# python3 placement.py -c 2 --int-log metrics/tx-pod-int_..._ts.log
+import argparse
+import os
+import sys
+
+PENALTY = {
+    'irq': 8,
+    'shared': 6,
+    'smt_irq': 4,
+    'smt_self': 2,
+    'remote_numa': 1,
+}
+
+
+def format_cpu_list(cpus):
+    """List of ints to kernel cpu list, [2, 3, 4, 8] -> 2-4,8"""
+    parts = []
+    cpus = sorted(set(cpus))
+    i = 0
+    while i < len(cpus):
+        j = i
+        while j + 1 < len(cpus) and cpus[j + 1] == cpus[j] + 1:
+            j += 1
+        parts.append(str(cpus[i]) if i == j else f"{cpus[i]}-{cpus[j]}")
+        i = j + 1
+    return ",".join(parts)
+
+
+def legacy_slice(cpuset, num_cores):
+    """Indices generate_core_range (run_monitor_pps.sh) would use."""
+    if num_cores == 1:
+        return [0]
+    start = (len(cpuset) - num_cores) // 2
+    return list(range(start, start + num_cores))
+
+
+def irq_cpus(node_info):
+    """CPUs in affinity of any adapter queue interrupt.
+    :param node_info: topology.parse_node_info dict
+    :return: set of cpus
+    """
+    cpus = set()
+    for irq in node_info.get('irqs', []):
+        cpus.update(irq['cpus'])
+    return cpus
+
+
+def load_interrupt_cpus(path):
+    """CPUs that serviced queue interrupts in a tx-pod-int / rx-pod-int log.
+
+    Rows are queue id followed by per cpu deltas, with -T two timestamp
+    columns at the end and "# columns:" header.
+
+    :param path: log written by monitor_txrx_int.py or node_agent.py
+    :return: set of cpus
+    """
+    cpus = set()
+    n_cpus = None
+    with open(path) as f:
+        for line in f:
+            if line.startswith('#'):
+                n_cpus = sum(1 for c in line.split() if c.startswith('cpu'))
+                continue
+            values = line.split()
+            if len(values) < 2:
+                continue
+            counts = values[1:1 + n_cpus] if n_cpus else values[1:]
+            for cpu, v in enumerate(counts):
+                try:
+                    if float(v) > 0:
+                        cpus.add(cpu)
+                except ValueError:
+                    break
+    return cpus
+
+
+def latest_interrupt_log(output_dir, side='tx'):
+    """Newest <side>-pod-int log in metric dir or None."""
+    try:
+        logs = [e for e in os.scandir(output_dir) if e.name.startswith(f"{side}-pod-int_") and e.is_file()]
+    except OSError:
+        return None
+    return max(logs, key=lambda e: e.stat().st_mtime).path if logs else None
+
+
+class CorePlan:
+    """Cores picked for trafgen of one pod and contention expected on them."""
+
+    def __init__(self, pod, node, cores, contention, irq_source, int_log=None):
+        """
+        :param pod: pod name
+        :param node: worker node
+        :param cores: picked cores, in cpuset order
+        :param contention: core -> list of reasons (keys of PENALTY)
+        :param irq_source: where interrupt cpus came from
+        :param int_log: name of interrupt log observed cpus were read from
+        """
+        self.pod = pod
+        self.node = node
+        self.cores = cores
+        self.contention = contention
+        self.irq_source = irq_source
+        self.int_log = int_log
+
+    @property
+    def default_core(self):
+        """--bind-cpus value"""
+        return ",".join(str(c) for c in self.cores)
+
+    @property
+    def task_set(self):
+        """taskset -c value"""
+        return format_cpu_list(self.cores)
+
+    @property
+    def score(self):
+        return sum(PENALTY[r] for reasons in self.contention.values() for r in reasons)
+
+    def to_dict(self):
+        return {
+            'pod': self.pod,
+            'node': self.node,
+            'cores': self.cores,
+            'task_set': self.task_set,
+            'score': self.score,
+            'contention': {str(c): reasons for c, reasons in self.contention.items()},
+            'irq_source': self.irq_source,
+            'int_log': self.int_log,
+        }
+
+
+def plan_pod(cpuset, num_cores, node_info=None, extra_irq_cpus=(), taken=()):
+    """Pick num_cores of cpuset for trafgen.
+
+    :param cpuset: pod physcpubind cores (int or str)
+    :param num_cores: cores to pick
+    :param node_info: topology.parse_node_info dict of pod worker, or None
+    :param extra_irq_cpus: cpus observed servicing interrupts
+    :param taken: cores already picked for other pods on the same worker
+    :return: (cores, contention dict core -> reasons)
+    """
+    cpuset = [int(c) for c in cpuset]
+    if num_cores < 1 or num_cores > len(cpuset):
+        raise ValueError(f"Invalid number of cores requested {num_cores}, pod has {len(cpuset)}")
+    node_info = node_info or {}
+    irq = irq_cpus(node_info) | set(extra_irq_cpus)
+    smt = {int(c): set(s) - {int(c)} for c, s in node_info.get('smt', {}).items()}
+    smt_irq = set().union(*(smt.get(c, ()) for c in irq)) - irq if irq else set()
+    nic_numa = node_info.get('nic_numa', -1)
+    local = set(node_info.get('numa', {}).get(str(nic_numa), [])) if nic_numa is not None and nic_numa >= 0 else None
+    taken = set(taken)
+
+    preferred = legacy_slice(cpuset, num_cores)
+    lo, hi = preferred[0], preferred[-1]
+
+    def reasons(core, picked):
+        out = []
+        if core in irq:
+            out.append('irq')
+        if core in taken:
+            out.append('shared')
+        if core in smt_irq:
+            out.append('smt_irq')
+        if smt.get(core, set()) & picked:
+            out.append('smt_self')
+        if local and core not in local:
+            out.append('remote_numa')
+        return out
+
+    picked = []
+    contention = {}
+    remaining = list(range(len(cpuset)))
+    for _ in range(num_cores):
+        chosen = set(picked)
+
+        def cost(i):
+            penalty = sum(PENALTY[r] for r in reasons(cpuset[i], chosen))
+            distance = 0 if lo <= i <= hi else min(abs(i - lo), abs(i - hi))
+            return penalty, distance, i
+
+        best = min(remaining, key=cost)
+        remaining.remove(best)
+        core = cpuset[best]
+        picked.append(core)
+        found = reasons(core, chosen)
+        if found:
+            contention[core] = found
+    order = {c: i for i, c in enumerate(cpuset)}
+    return sorted(picked, key=order.get), contention
+
+
+def plan_placement(snapshot, num_cores, extra_irq_cpus=None, int_log=None):
+    """Plan trafgen cores of every TX pod, pods on the same worker do not
+    get the same cores while free ones left.
+
+    :param snapshot: topology.TopologySnapshot
+    :param num_cores: cores per pod
+    :param extra_irq_cpus: optional node -> cpus observed servicing interrupts
+    :param int_log: name of log extra_irq_cpus came from, recorded in plans
+    :return: list of CorePlan in tx_pods order
+    """
+    extra_irq_cpus = extra_irq_cpus or {}
+    taken = {}
+    plans = []
+    for pod in snapshot.tx_pods:
+        node = snapshot.pod_nodes[pod]
+        info = snapshot.node_info.get(node)
+        extra = extra_irq_cpus.get(node, set())
+        cores, contention = plan_pod(snapshot.pod_cores[pod], num_cores, info, extra, taken.get(node, ()))
+        taken.setdefault(node, set()).update(cores)
+        sources = (['affinity'] if info and info.get('irqs') else []) + (['log'] if extra else [])
+        plans.append(CorePlan(pod, node, cores, contention, '+'.join(sources) or 'none', int_log))
+    return plans
+
+
+def print_plan(plans):
+    for plan in plans:
+        warn = ' '.join(f"{c}:{','.join(r)}" for c, r in plan.contention.items()) or 'none'
+        print(f"{plan.pod:<30} {plan.node:<20} cores {plan.task_set:<12} "
+              f"irq info {plan.irq_source:<12} contention {warn}")
+
+
+def main(cmd):
+    from topology import load_snapshot
+
+    snapshot = load_snapshot(cmd.cache)
+    if snapshot is None:
+        print(f"Error: no topology snapshot in {cmd.cache}, run topology.py first.", file=sys.stderr)
+        sys.exit(1)
+    extra = {}
+    if cmd.int_log:
+        tx_node = snapshot.pod_nodes[snapshot.tx_pods[0]]
+        extra[tx_node] = load_interrupt_cpus(cmd.int_log)
+    try:
+        plans = plan_placement(snapshot, cmd.cores, extra, os.path.basename(cmd.int_log) if cmd.int_log else None)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print_plan(plans)
+
+
+if __name__ == "__main__":
+    from topology import DEFAULT_CACHE
+
+    parser = argparse.ArgumentParser(description="Plan trafgen cores away from adapter interrupts.")
+    parser.add_argument("-c", "--cores", type=int, default=1, help="Cores per pod.")
+    parser.add_argument("--cache", type=str, default=DEFAULT_CACHE, help="Topology snapshot file.")
+    parser.add_argument("--int-log", type=str, default=None, help="tx-pod-int log, cpus with interrupts avoided.")
+    args = parser.parse_args()
+    main(args)
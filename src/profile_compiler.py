@@ -0,0 +1,498 @@
+# Trafgen profile compiler, python version of pkt_generate_template.sh
+# driven by generate_per_pod.sh.
+#
+# generate_per_pod.sh copies pkt_generate_template.sh into every TX pod and
+# runs it once per payload size and port mode, each run resolves gateway MAC
+# again (ip route, arp, ping, arping) and writes one .trafgen file, so a
+# matrix of sizes costs sizes x modes x pods kubectl round trips.  Here
+#   - every pod (TX and RX) is probed once with PROBE_SCRIPT, interface
+#     address, MAC, gateway and gateway MAC, result cached per pod UID,
+#   - the whole matrix (frame sizes, fixed / random source port, N flows)
+#     is compiled locally, IPv4 header checksum computed here instead of
+#     csumip(), so trafgen does not evaluate it per packet,
+#   - profiles of a pod are pushed as one tar over `kubectl exec -i`, the
+#     set is keyed by hash of addressing and parameters and a pod that
+#     already holds the same set is skipped.
+#
+# File names are the same as generate_per_pod.sh, /tmp/udp_<payload>.trafgen,
+# /tmp/udp_<payload>.random.trafgen, /tmp/udp.loopback_<payload>.trafgen on
+# first TX pod, N > 1 flows /tmp/udp_<payload>.flows_<N>.trafgen, RSS
+# flows (rss.py, K per RX queue) /tmp/udp_<payload>.rss_<K>[_q<queues>].trafgen.
+#
+# --mixes imix (7:4:1 of 64 / 594 / 1518) or 64:7,1500:1 compiles one
+# profile per mix, one packet per weight slot with sizes interleaved, file
+# /tmp/udp_<tag>.trafgen, tag (imix or mix-64x7-1500x1) replaces frame size
+# in experiment file names, so inference.py groups runs per mix.
+#
+# python3 profile_compiler.py --sizes 64 128 256 512 1024 1468 9000 --flows 1 8
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import struct
+import sys
+import tarfile
+import time
+
+from topology import DEFAULT_CACHE as TOPOLOGY_CACHE
+
+DEFAULT_CACHE = os.path.join(os.path.dirname(TOPOLOGY_CACHE), "addressing.json")
+ETHERNET_HEADER_SIZE = 14
+IP_HEADER_SIZE = 20
+UDP_HEADER_SIZE = 8
+TOTAL_OVERHEAD = ETHERNET_HEADER_SIZE + IP_HEADER_SIZE + UDP_HEADER_SIZE
+DEFAULT_SIZES = [64, 128, 256, 512, 1024, 1468]
+MAX_FRAME_SIZE = 9000
+BASE_PORT = 1024
+PROFILE_DIR = "/tmp"
+PROFILE_KEY_FILE = "trafgen_profiles.key"
+IP_IDENT = 2
+IP_TTL = 64
+IP_PROTO_UDP = 17
+
+# named frame size mixes, frame size -> weight, simple IMIX is 7:4:1
+MIXES = {
+    'imix': [(64, 7), (594, 4), (1518, 1)],
+    'imix-jumbo': [(64, 7), (594, 4), (1518, 1), (9000, 1)],
+}
+MAX_MIX_PACKETS = 1024
+
+PROBE_SCRIPT = r"""
+IF={if_name}
+echo "ip $(ip -o -4 addr show dev $IF | awk '{{print $4}}' | cut -d/ -f1 | head -1)"
+echo "mac $(cat /sys/class/net/$IF/address)"
+GW=$(ip route | awk '/^default/ {{print $3; exit}}')
+echo "gw $GW"
+lookup() {{ arp -n 2>/dev/null | awk -v gw="$GW" '$1 == gw {{print $3}}'; }}
+MAC=$(lookup)
+if [ -z "$MAC" ]; then
+  ping -c 2 -W 1 "$GW" > /dev/null 2>&1
+  arping -c 1 -I $IF "$GW" > /dev/null 2>&1
+  MAC=$(lookup)
+fi
+echo "gw_mac $MAC"
+"""
+
+
+class PodAddressing:
+    """Interface address of a pod and its gateway MAC."""
+
+    def __init__(self, ip, mac, gw, gw_mac):
+        self.ip = ip
+        self.mac = mac
+        self.gw = gw
+        self.gw_mac = gw_mac
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def parse(cls, out):
+        """Output of PROBE_SCRIPT, raise ValueError if incomplete."""
+        values = {}
+        for line in out.splitlines():
+            key, _, value = line.partition(" ")
+            values[key] = value.strip()
+        missing = [k for k in ("ip", "mac", "gw", "gw_mac") if not values.get(k)]
+        if missing:
+            raise ValueError(f"probe did not return {', '.join(missing)}")
+        return cls(values["ip"], values["mac"], values["gw"], values["gw_mac"])
+
+
+def ipv4_checksum(header):
+    """RFC 1071 checksum of header with checksum field zero."""
+    total = sum(struct.unpack(f"!{len(header) // 2}H", header))
+    while total >> 16:
+        total = (total & 0xffff) + (total >> 16)
+    return ~total & 0xffff
+
+
+def ip_bytes(ip):
+    return [int(b) for b in ip.split(".")]
+
+
+def mac_bytes(mac):
+    return ", ".join(f"0x{b}" for b in mac.split(":"))
+
+
+def payload_size(frame_size):
+    """Frame size to UDP payload, same as generate_traffic_profile."""
+    payload = frame_size - TOTAL_OVERHEAD
+    if payload <= 0 or frame_size > MAX_FRAME_SIZE:
+        raise ValueError(f"frame size {frame_size} outside {TOTAL_OVERHEAD + 1}..{MAX_FRAME_SIZE}")
+    return payload
+
+
+def parse_mix(value):
+    """Mix name or custom distribution to (tag, mix).
+
+    imix                  -> ('imix', [(64, 7), (594, 4), (1518, 1)])
+    64:7,594:4,1518:1     -> ('mix-64x7-594x4-1518x1', ...)
+    mix-64x7-594x4-1518x1 -> same, tag is used in file names and parsed back
+
+    :param value: str
+    :return: (tag, list of (frame size, weight))
+    """
+    if value in MIXES:
+        return value, MIXES[value]
+    if value.startswith('mix-'):
+        parts = [p.split('x') for p in value[len('mix-'):].split('-')]
+    else:
+        parts = [p.split(':') for p in value.split(',')]
+    try:
+        mix = [(int(size), int(weight)) for size, weight in parts]
+    except ValueError:
+        raise ValueError(f"invalid size mix {value!r}, expected name ({', '.join(MIXES)}) or size:weight,...")
+    if not mix or any(w <= 0 for _, w in mix) or sum(w for _, w in mix) > MAX_MIX_PACKETS:
+        raise ValueError(f"invalid size mix {value!r}, weights must be positive, sum up to {MAX_MIX_PACKETS}")
+    for size, _ in mix:
+        payload_size(size)
+    return 'mix-' + '-'.join(f"{size}x{weight}" for size, weight in mix), mix
+
+
+def mean_frame_size(size):
+    """Mean frame size in bytes of a size field, single size or mix tag.
+    :param size: int, '64' or mix tag
+    :return: float
+    """
+    if isinstance(size, int) or str(size).isdigit():
+        return float(size)
+    _, mix = parse_mix(str(size))
+    return sum(s * w for s, w in mix) / sum(w for _, w in mix)
+
+
+def mix_sequence(mix):
+    """Packet order with sizes spread evenly, smooth weighted round robin,
+    7:4:1 -> 64 594 64 64 594 64 1518 ... rather than 7 small packets in a row.
+    """
+    total = sum(w for _, w in mix)
+    current = [0] * len(mix)
+    out = []
+    for _ in range(total):
+        for i, (_, w) in enumerate(mix):
+            current[i] += w
+        best = max(range(len(mix)), key=lambda i: current[i])
+        current[best] -= total
+        out.append(mix[best][0])
+    return out
+
+
+def packet_block(src, dst_ip, payload, src_port, dst_port, src_ip=None):
+    """One packet in trafgen C struct syntax, same layout as pkt_generate_template.sh.
+
+    :param src: PodAddressing of TX pod
+    :param dst_ip: destination address
+    :param payload: UDP payload bytes
+    :param src_port: source port, None for drnd(2)
+    :param dst_port: destination port
+    :param src_ip: source address, default pod address
+    :return: str
+    """
+    src_ip = src_ip or src.ip
+    total_length = IP_HEADER_SIZE + UDP_HEADER_SIZE + payload
+    udp_length = UDP_HEADER_SIZE + payload
+    header = struct.pack("!BBHHHBBH4B4B", 0x45, 0, total_length, IP_IDENT, 0x4000, IP_TTL, IP_PROTO_UDP, 0,
+                         *ip_bytes(src_ip), *ip_bytes(dst_ip))
+    src_port_field = "drnd(2)," if src_port is None else f"const16({src_port}), /* UDP Source Port */"
+    return (
+        "{\n"
+        f"{mac_bytes(src.gw_mac)},\n"
+        f"{mac_bytes(src.mac)},\n"
+        "const16(ETH_P_IP),\n"
+        "0b01000101, 0,  /* IPv4 Version, IHL, TOS */\n"
+        f"const16({total_length}),    /* IPv4 Total Len (UDP len + IP hdr 20 bytes)*/\n"
+        f"const16({IP_IDENT}),     /* IPv4 Ident */\n"
+        "0b01000000, 0,  /* IPv4 Flags, Frag Off */\n"
+        f"{IP_TTL},             /* IPv4 TTL */\n"
+        f"{IP_PROTO_UDP},             /* Proto UDP */\n"
+        f"const16(0x{ipv4_checksum(header):04x}), /* IPv4 Checksum, precomputed */\n"
+        f"{', '.join(map(str, ip_bytes(src_ip)))},\n"
+        f"{', '.join(map(str, ip_bytes(dst_ip)))},\n"
+        f"{src_port_field}\n"
+        f"const16({dst_port}), /* UDP Dest Port */\n"
+        f"const16({udp_length}),   /* UDP length (UDP hdr 8 bytes + payload size */\n"
+        "const16(0),\n"
+        f"fill('B', {payload}),\n"
+        "}\n"
+    )
+
+
+def compile_profile(src, dst_ip, payload, src_ports, dst_port):
+    """Profile with one packet per source port, trafgen sends them round robin.
+
+    :param src: PodAddressing
+    :param dst_ip: destination address
+    :param payload: UDP payload bytes
+    :param src_ports: list of source ports, [None] for random source port
+    :param dst_port: destination port
+    :return: str
+    """
+    return "#define ETH_P_IP 0x0800\n" + "".join(
+        packet_block(src, dst_ip, payload, port, dst_port) for port in src_ports)
+
+
+def compile_mix(src, dst_ip, mix, src_port, dst_port):
+    """Profile with one packet per mix slot, frame sizes weighted as mix.
+
+    :param src: PodAddressing
+    :param dst_ip: destination address
+    :param mix: list of (frame size, weight)
+    :param src_port: source port
+    :param dst_port: destination port
+    :return: str
+    """
+    return "#define ETH_P_IP 0x0800\n" + "".join(
+        packet_block(src, dst_ip, payload_size(size), src_port, dst_port) for size in mix_sequence(mix))
+
+
+def compile_flows(src, dst_ip, payload, flows, dst_port):
+    """Profile with one packet per (src_ip, src_port) flow, i.e. rss.select_flows result.
+
+    :param src: PodAddressing
+    :param dst_ip: destination address
+    :param payload: UDP payload bytes
+    :param flows: list of (queue, src_ip, src_port)
+    :param dst_port: destination port
+    :return: str
+    """
+    return "#define ETH_P_IP 0x0800\n" + "".join(
+        packet_block(src, dst_ip, payload, port, dst_port, ip) for _, ip, port in flows)
+
+
+def mix_path(tag):
+    """Path in pod of mix profile, i.e. /tmp/udp_imix.trafgen"""
+    return f"{PROFILE_DIR}/udp_{tag}.trafgen"
+
+
+def profile_path(payload, random_port=False, flows=1, loopback=False, variant=None):
+    """Path in pod, same names as generate_per_pod.sh, variant i.e. rss_2"""
+    if variant:
+        return f"{PROFILE_DIR}/udp_{payload}.{variant}.trafgen"
+    if loopback:
+        return f"{PROFILE_DIR}/udp.loopback_{payload}.trafgen"
+    if random_port:
+        return f"{PROFILE_DIR}/udp_{payload}.random.trafgen"
+    if flows > 1:
+        return f"{PROFILE_DIR}/udp_{payload}.flows_{flows}.trafgen"
+    return f"{PROFILE_DIR}/udp_{payload}.trafgen"
+
+
+def compile_matrix(src, dst_ip, sizes, flows=(1,), base_port=BASE_PORT, loopback_ip=None, rss_flows=None,
+                   mixes=()):
+    """All profiles of one TX pod.
+
+    :param src: PodAddressing of TX pod
+    :param dst_ip: RX pod address
+    :param sizes: frame sizes
+    :param flows: flow counts, fixed source ports base_port .. base_port + N - 1
+    :param base_port: source / destination port of the pod
+    :param loopback_ip: if set also loopback profile towards this address
+    :param rss_flows: optional (variant, flows) from rss.select_flows
+    :param mixes: size mixes, list of parse_mix values
+    :return: dict path -> profile text
+    """
+    profiles = {}
+    for value in mixes:
+        tag, mix = parse_mix(value)
+        profiles[mix_path(tag)] = compile_mix(src, dst_ip, mix, base_port, base_port)
+    for size in sizes:
+        payload = payload_size(size)
+        for n in flows:
+            profiles[profile_path(payload, flows=n)] = compile_profile(
+                src, dst_ip, payload, [base_port + i for i in range(n)], base_port)
+        profiles[profile_path(payload, random_port=True)] = compile_profile(src, dst_ip, payload, [None], base_port)
+        if loopback_ip:
+            profiles[profile_path(payload, loopback=True)] = compile_profile(
+                src, loopback_ip, payload, [base_port], base_port)
+        if rss_flows:
+            variant, selected = rss_flows
+            profiles[profile_path(payload, variant=variant)] = compile_flows(
+                src, dst_ip, payload, selected, base_port)
+    return profiles
+
+
+def rss_flow_sets(snapshot, addressing, per_queue, queues=None):
+    """RSS flows of every TX -> RX pair from RX worker adapter RSS config.
+
+    :param snapshot: topology.TopologySnapshot, node_info has ethtool output
+    :param addressing: pod -> PodAddressing
+    :param per_queue: flows per RX queue
+    :param queues: RX queues, default all
+    :return: dict tx pod -> (variant, flows)
+    """
+    from rss import parse_ethtool_rss, select_flows, flow_tag
+
+    out = {}
+    for i, (tx_pod, rx_pod) in enumerate(zip(snapshot.tx_pods, snapshot.rx_pods)):
+        node = snapshot.pod_nodes[rx_pod]
+        info = snapshot.node_info.get(node, {})
+        if not info.get("rss"):
+            raise RuntimeError(f"no RSS configuration of {snapshot.node_if_name} on {node}, "
+                               f"refresh topology with ethtool installed")
+        config = parse_ethtool_rss(info["rss"], info.get("rss_fields", ""))
+        flows = select_flows(config, addressing[tx_pod].ip, addressing[rx_pod].ip, BASE_PORT + i,
+                             per_queue, queues)
+        out[tx_pod] = (flow_tag(per_queue, queues), flows)
+    return out
+
+
+def matrix_key(profiles):
+    """Hash of a profile set, addressing and parameters are part of the text."""
+    digest = hashlib.sha256()
+    for path in sorted(profiles):
+        digest.update(path.encode())
+        digest.update(profiles[path].encode())
+    return digest.hexdigest()
+
+
+def tar_profiles(profiles, key):
+    """Profiles and key file as tar relative to PROFILE_DIR."""
+    buf = io.BytesIO()
+    mtime = time.time()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for path, text in list(profiles.items()) + [(f"{PROFILE_DIR}/{PROFILE_KEY_FILE}", key + "\n")]:
+            data = text.encode()
+            info = tarfile.TarInfo(os.path.relpath(path, PROFILE_DIR))
+            info.size = len(data)
+            info.mtime = mtime
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def load_addressing(path):
+    """Cached probes, pod UID -> PodAddressing"""
+    try:
+        with open(path) as f:
+            return {uid: PodAddressing(**v) for uid, v in json.load(f).items()}
+    except (OSError, ValueError, TypeError):
+        return {}
+
+
+def save_addressing(cache, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({uid: a.to_dict() for uid, a in cache.items()}, f, indent=4)
+    os.replace(tmp, path)
+
+
+async def probe_pods(remote, snapshot, if_name="eth0", cache_path=DEFAULT_CACHE, refresh=False):
+    """Addressing of every TX and RX pod, probed once per pod UID.
+
+    :param remote: orchestrator.Remote
+    :param snapshot: topology.TopologySnapshot
+    :param if_name: pod interface
+    :param cache_path: probe cache, None disables it
+    :param refresh: probe again
+    :return: dict pod -> PodAddressing
+    """
+    cache = {} if refresh or not cache_path else load_addressing(cache_path)
+    pods = snapshot.tx_pods + snapshot.rx_pods
+    todo = [pod for pod in pods if f"{snapshot.pod_uids.get(pod)}/{if_name}" not in cache]
+    results = await asyncio.gather(*(remote.run(remote.exec_argv(pod, "sh", "-c", PROBE_SCRIPT.format(if_name=if_name)))
+                                     for pod in todo))
+    for pod, (rc, out) in zip(todo, results):
+        try:
+            cache[f"{snapshot.pod_uids.get(pod)}/{if_name}"] = PodAddressing.parse(out)
+        except ValueError as e:
+            raise RuntimeError(f"unable to probe {pod} {if_name}: {e}")
+    if todo and cache_path:
+        try:
+            save_addressing(cache, cache_path)
+        except OSError as e:
+            print(f"Warning: unable to save addressing cache {cache_path}: {e}", file=sys.stderr)
+    return {pod: cache[f"{snapshot.pod_uids.get(pod)}/{if_name}"] for pod in pods}
+
+
+async def push_profiles(remote, pod, profiles, force=False):
+    """Extract profiles in pod unless it holds the same set.
+    :return: True if pushed
+    """
+    key = matrix_key(profiles)
+    if not force:
+        _, current = await remote.run(remote.exec_argv(pod, "cat", f"{PROFILE_DIR}/{PROFILE_KEY_FILE}"))
+        if current.strip() == key:
+            return False
+    await remote.run(remote.exec_argv(pod, "tar", "xf", "-", "-C", PROFILE_DIR, stdin=True),
+                     check=True, input=tar_profiles(profiles, key))
+    return True
+
+
+async def deploy_profiles(remote, snapshot, sizes, flows=(1,), if_name="eth0", cache_path=DEFAULT_CACHE,
+                          refresh=False, force=False, rss_per_queue=0, rss_queues=None, mixes=()):
+    """Probe, compile and push profile matrix to every TX pod.
+
+    TX pod i sends to RX pod i, ports BASE_PORT + i, first TX pod also gets
+    loopback profiles towards second TX pod, as generate_per_pod.sh does.
+
+    :param remote: orchestrator.Remote
+    :param snapshot: topology.TopologySnapshot
+    :param sizes: frame sizes
+    :param flows: flow counts
+    :param if_name: pod interface
+    :param cache_path: probe cache
+    :param refresh: probe pods again
+    :param force: push even if pod holds same profile set
+    :param rss_per_queue: if > 0 also RSS profile with this many flows per RX queue
+    :param rss_queues: RSS profile RX queues, default all
+    :param mixes: size mixes, names or size:weight lists
+    :return: dict pod -> number of profiles pushed (0 if up to date)
+    """
+    addressing = await probe_pods(remote, snapshot, if_name, cache_path, refresh)
+    rss_sets = rss_flow_sets(snapshot, addressing, rss_per_queue, rss_queues) if rss_per_queue > 0 else {}
+    matrices = {}
+    for i, (tx_pod, rx_pod) in enumerate(zip(snapshot.tx_pods, snapshot.rx_pods)):
+        loopback_ip = addressing[snapshot.tx_pods[1]].ip if i == 0 and len(snapshot.tx_pods) > 1 else None
+        matrices[tx_pod] = compile_matrix(addressing[tx_pod], addressing[rx_pod].ip, sizes, flows,
+                                          BASE_PORT + i, loopback_ip, rss_sets.get(tx_pod), mixes)
+    pushed = await asyncio.gather(*(push_profiles(remote, pod, profiles, force)
+                                    for pod, profiles in matrices.items()))
+    return {pod: len(matrices[pod]) if p else 0 for pod, p in zip(matrices, pushed)}
+
+
+def main(cmd):
+    from orchestrator import Remote
+    from topology import cached_snapshot
+    from rss import parse_queues
+
+    remote = Remote(cmd.kubectl, cmd.ssh, is_verbose=cmd.verbose)
+
+    async def run():
+        snapshot = await cached_snapshot(remote, cmd.num_pairs, cmd.node_interface, is_verbose=cmd.verbose)
+        return await deploy_profiles(remote, snapshot, cmd.sizes, cmd.flows, cmd.interface, cmd.cache,
+                                     cmd.refresh, cmd.force, cmd.rss_per_queue,
+                                     parse_queues(cmd.rss_queues) if cmd.rss_queues else None, cmd.mixes)
+
+    start = time.monotonic()
+    try:
+        pushed = asyncio.run(run())
+    except (RuntimeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    for pod, n in pushed.items():
+        print(f"{pod:<30} {f'{n} profiles pushed' if n else 'up to date'}")
+    print(f"Done in {time.monotonic() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile and push trafgen profiles to every TX pod.")
+    parser.add_argument("--sizes", nargs="*", type=int, default=DEFAULT_SIZES, help="Frame sizes in bytes.")
+    parser.add_argument("--flows", nargs="*", type=int, default=[1], help="Flow counts, fixed source ports.")
+    parser.add_argument("--mixes", nargs="*", default=[],
+                        help=f"Frame size mixes, {', '.join(MIXES)} or size:weight,... i.e. 64:7,594:4,1518:1.")
+    parser.add_argument("--rss_per_queue", type=int, default=0,
+                        help="Also RSS profile, flows per RX queue predicted from adapter Toeplitz key (rss.py).")
+    parser.add_argument("--rss_queues", type=str, default=None, help="RSS profile RX queues, i.e. 0-3, default all.")
+    parser.add_argument("-n", "--num_pairs", type=int, default=3, help="Number of server-client pairs.")
+    parser.add_argument("-i", "--interface", type=str, default="eth0", help="Pod interface, net1 for SR-IOV.")
+    parser.add_argument("--node_interface", type=str, default="eth1", help="Worker node adapter.")
+    parser.add_argument("--cache", type=str, default=DEFAULT_CACHE, help="Pod addressing cache.")
+    parser.add_argument("--refresh", action="store_true", help="Probe pods again.")
+    parser.add_argument("--force", action="store_true", help="Push even if pod holds the same profiles.")
+    parser.add_argument("--kubectl", type=str, default="kubectl", help="kubectl executable, i.e. fake for offline run.")
+    parser.add_argument("--ssh", type=str, default="ssh", help="ssh executable, i.e. fake for offline run.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print each command.")
+    args = parser.parse_args()
+    main(args)
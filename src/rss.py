@@ -0,0 +1,207 @@
+# RSS aware flow selection, predicts RX queue of each flow with the
+# adapter's own Toeplitz key and indirection table.
+#
+# A profile with one constant source port puts all RX load on one queue,
+# drnd(2) source port spreads it unevenly and differently on every run,
+# so per queue scaling in plot_queue_rate is hard to compare.  Here we read
+# RSS key, indirection table and hashed fields of RX adapter (`ethtool -x`,
+# `ethtool -n <if> rx-flow-hash udp4`, collected by topology.py in the
+# worker pass), compute Toeplitz hash of candidate flows and keep source
+# ports (or source addresses if adapter hashes UDP on addresses only) that
+# land exactly K flows on every queue, or on a chosen subset of queues.
+# profile_compiler.py emits the flows as one profile, trafgen cycles
+# through its packets.
+#
+# Prediction holds when RX adapter sees pod addresses as sent, i.e.
+# SR-IOV / macvlan pods, not overlay encapsulated traffic.
+#
+# python3 rss.py --ethtool ethtool-x.txt --src 10.1.0.10 --dst 10.1.1.10 --per_queue 2
+import argparse
+import ipaddress
+import struct
+import sys
+
+PORT_RANGE = (1024, 65535)
+# Microsoft RSS verification key, default of many drivers
+DEFAULT_KEY = bytes.fromhex("6d5a56da255b0ec24167253d43a38fb0d0ca2bcbae7b30b477cb2da38030f20c6a42b73bbeac01fa")
+
+
+class RssConfig:
+    """RSS key, indirection table and hashed fields of one adapter."""
+
+    def __init__(self, key, table, l4=True, function="toeplitz"):
+        """
+        :param key: hash key bytes
+        :param table: indirection table, entry -> RX queue
+        :param l4: UDP ports part of hash input
+        :param function: active hash function
+        """
+        self.key = key
+        self.table = table
+        self.l4 = l4
+        self.function = function
+
+    @property
+    def queues(self):
+        return sorted(set(self.table))
+
+    def to_dict(self):
+        return {'key': self.key.hex(), 'table': self.table, 'l4': self.l4, 'function': self.function}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(bytes.fromhex(data['key']), data['table'], data['l4'], data['function'])
+
+    def queue(self, src_ip, dst_ip, src_port, dst_port):
+        """RX queue of an IPv4 UDP flow."""
+        data = ipaddress.IPv4Address(src_ip).packed + ipaddress.IPv4Address(dst_ip).packed
+        if self.l4:
+            data += struct.pack("!HH", src_port, dst_port)
+        return self.table[toeplitz_hash(self.key, data) % len(self.table)]
+
+
+def toeplitz_hash(key, data):
+    """32 bit Toeplitz hash of data, key must be at least len(data) + 4 bytes."""
+    if len(key) < len(data) + 4:
+        raise ValueError(f"RSS key of {len(key)} bytes too short for {len(data)} bytes input")
+    key_int = int.from_bytes(key, "big")
+    key_bits = len(key) * 8
+    result = 0
+    for i, byte in enumerate(data):
+        for bit in range(8):
+            if byte & (0x80 >> bit):
+                # 32 bit window of key starting at bit position of input bit
+                result ^= (key_int >> (key_bits - 32 - (i * 8 + bit))) & 0xffffffff
+    return result
+
+
+def parse_ethtool_rss(indir_out, fields_out=""):
+    """Parse `ethtool -x <if>` and `ethtool -n <if> rx-flow-hash udp4` output.
+
+    :param indir_out: ethtool -x output
+    :param fields_out: rx-flow-hash output, empty assumes ports hashed
+    :return: RssConfig
+    """
+    table = []
+    key = b""
+    function = "toeplitz"
+    section = None
+    for line in indir_out.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("RX flow hash indirection table"):
+            section = "table"
+        elif stripped.startswith("RSS hash key"):
+            section = "key"
+        elif stripped.startswith("RSS hash function"):
+            section = "function"
+        elif section == "table" and ":" in stripped:
+            table.extend(int(v) for v in stripped.split(":", 1)[1].split())
+        elif section == "key" and stripped:
+            key = bytes.fromhex(stripped.replace(":", ""))
+            section = None
+        elif section == "function" and stripped.endswith(": on"):
+            function = stripped.split(":", 1)[0].strip()
+    if not table:
+        raise ValueError("no RSS indirection table in ethtool output")
+    if not key:
+        raise ValueError("no RSS hash key in ethtool output")
+    l4 = "L4 bytes 0 & 1" in fields_out if fields_out.strip() else True
+    return RssConfig(key, table, l4, function)
+
+
+def select_flows(rss, src_ip, dst_ip, dst_port, per_queue=1, queues=None, port_range=PORT_RANGE,
+                 base_ip=None, max_candidates=1 << 20):
+    """Flows that land exactly per_queue on every selected RX queue.
+
+    Source port varies when ports are hashed, otherwise source address
+    counts up from base_ip (default src_ip) and source port stays fixed.
+
+    :param rss: RssConfig
+    :param src_ip: TX pod address
+    :param dst_ip: RX pod address
+    :param dst_port: destination port
+    :param per_queue: flows per queue
+    :param queues: RX queues to load, default every queue of indirection table
+    :param port_range: candidate source ports (start, end)
+    :param base_ip: first candidate source address when addresses vary
+    :param max_candidates: give up after this many candidates
+    :return: list of (queue, src_ip, src_port) ordered round robin over queues
+    """
+    if rss.function != "toeplitz":
+        raise ValueError(f"adapter uses {rss.function} RSS hash, only toeplitz can be predicted")
+    queues = sorted(set(queues if queues is not None else rss.queues))
+    unknown = set(queues) - set(rss.queues)
+    if unknown:
+        raise ValueError(f"queues {sorted(unknown)} not in indirection table")
+
+    found = {q: [] for q in queues}
+    missing = len(queues) * per_queue
+    if rss.l4:
+        candidates = ((src_ip, port) for port in range(port_range[0], port_range[1] + 1))
+    else:
+        start = int(ipaddress.IPv4Address(base_ip or src_ip))
+        candidates = ((str(ipaddress.IPv4Address(start + i)), port_range[0]) for i in range(max_candidates))
+    for n, (ip, port) in enumerate(candidates):
+        if n >= max_candidates or not missing:
+            break
+        q = rss.queue(ip, dst_ip, port, dst_port)
+        if q in found and len(found[q]) < per_queue:
+            found[q].append((ip, port))
+            missing -= 1
+    if missing:
+        short = [q for q in queues if len(found[q]) < per_queue]
+        raise ValueError(f"unable to find {per_queue} flows for queues {short}")
+    return [(q, *found[q][i]) for i in range(per_queue) for q in queues]
+
+
+def flow_tag(per_queue, queues=None):
+    """Profile name part, rss_<K> for all queues, rss_<K>_q<queues> for a subset, i.e. rss_1_q0_1_2"""
+    if queues is None:
+        return f"rss_{per_queue}"
+    return f"rss_{per_queue}_q{'_'.join(map(str, sorted(set(queues))))}"
+
+
+def parse_queues(value):
+    """0,2,4-7 -> [0, 2, 4, 5, 6, 7]"""
+    out = []
+    for part in value.split(","):
+        start, _, end = part.partition("-")
+        out.extend(range(int(start), int(end or start) + 1))
+    return out
+
+
+def main(cmd):
+    if cmd.ethtool:
+        with open(cmd.ethtool) as f:
+            indir = f.read()
+        fields = ""
+        if cmd.fields:
+            with open(cmd.fields) as f:
+                fields = f.read()
+        rss = parse_ethtool_rss(indir, fields)
+    else:
+        rss = RssConfig(DEFAULT_KEY, [i % cmd.num_queues for i in range(128)], not cmd.ip_only)
+    try:
+        flows = select_flows(rss, cmd.src, cmd.dst, cmd.dst_port, cmd.per_queue,
+                             parse_queues(cmd.queues) if cmd.queues else None)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"{'queue':>5} {'src':>15} {'sport':>6}")
+    for q, ip, port in flows:
+        print(f"{q:>5} {ip:>15} {port:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick UDP flows that land on chosen RX queues.")
+    parser.add_argument("--ethtool", type=str, help="File with `ethtool -x <if>` output, default Microsoft key.")
+    parser.add_argument("--fields", type=str, help="File with `ethtool -n <if> rx-flow-hash udp4` output.")
+    parser.add_argument("--num_queues", type=int, default=8, help="Queues of default table without --ethtool.")
+    parser.add_argument("--ip_only", action="store_true", help="Default table, hash addresses only.")
+    parser.add_argument("--src", type=str, required=True, help="TX pod address.")
+    parser.add_argument("--dst", type=str, required=True, help="RX pod address.")
+    parser.add_argument("--dst_port", type=int, default=1024, help="Destination port.")
+    parser.add_argument("--per_queue", type=int, default=1, help="Flows per queue.")
+    parser.add_argument("--queues", type=str, default=None, help="RX queues, i.e. 0-3 or 0,2,4.")
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,273 @@
+# Run manifest, one JSON per run next to its logs.
+#
+# Experiment parameters used to live only in log names (pr_, runtime_,
+# cores_, pairs_, size_, core_list_, ts_) and the environment of a run was
+# not recorded at all.  orchestrator.py and run_monitor_pps.sh now write
+#   <metric dir>/run_pr_<pps>_runtime_<s>_cores_<c>_pairs_<p>_size_<size>_ts_<ts>.json
+# with the parameters, TX / RX pods and trafgen cores, every file the run
+# produced by role, and per worker kernel, CNI, adapter driver / firmware,
+# queue counts, ring sizes and queue IRQ affinity (topology.py NODE_SCRIPT).
+# inference.py indexes runs from manifests and only parses log names of
+# runs that have none, --where filters on any manifest field.
+#
+# python3 run_manifest.py -d metrics                        # list runs
+# python3 run_manifest.py -d metrics --where kernel=6.1.0 rx_queues=8
+# python3 run_manifest.py --write -o metrics --pps 1000 ... # run_monitor_pps.sh
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from log_names import WORKER_ROLES, scan_logs
+from topology import NODE_SCRIPT, parse_node_info
+
+MANIFEST_VERSION = 1
+MANIFEST_PREFIX = 'run_'
+
+
+def manifest_name(suffix, timestamp):
+    """run_<file suffix>_ts_<ts>.json"""
+    return f"{MANIFEST_PREFIX}{suffix}_ts_{timestamp}.json"
+
+
+def node_environment(node, addr, node_info, if_name):
+    """Environment part of a manifest for one worker.
+
+    :param node: node name
+    :param addr: node address
+    :param node_info: topology.parse_node_info dict or None
+    :param if_name: worker adapter
+    :return: dict
+    """
+    info = node_info or {}
+    driver = info.get('driver', {})
+    return {
+        'node': node,
+        'address': addr,
+        'interface': if_name,
+        'kernel': info.get('kernel', ''),
+        'cni': info.get('cni', ''),
+        'driver': driver.get('driver', ''),
+        'driver_version': driver.get('version', ''),
+        'firmware': driver.get('firmware-version', ''),
+        'rx_queues': info.get('rx_queues', 0),
+        'tx_queues': info.get('tx_queues', 0),
+        'rings': info.get('rings', {}),
+        'nic_numa': info.get('nic_numa', -1),
+        'irq_affinity': {irq['label']: irq['cpus'] for irq in info.get('irqs', [])},
+    }
+
+
+def build_manifest(pps, runtime, cores, pairs, size, timestamp, files, environment=None, **extra):
+    """Manifest dict of one run.
+
+    :param pps: target pps per pod
+    :param runtime: seconds
+    :param cores: cores per pod
+    :param pairs: number of tx / rx pairs
+    :param size: frame size or mix tag
+    :param timestamp: ts of pod logs, %Y%m%d%H%M%S
+    :param files: role -> list of file names (server, client, tx_queues, ...)
+    :param environment: {'tx': node_environment, 'rx': node_environment}
+    :param extra: tx_pods, rx_pods, core_list, stop_reason, ... stored as is
+    """
+    return {
+        'version': MANIFEST_VERSION,
+        'timestamp': timestamp,
+        'created': time.time(),
+        'pps': int(pps),
+        'runtime': int(runtime),
+        'cores': int(cores),
+        'pairs': int(pairs),
+        'size': str(size),
+        **extra,
+        'files': {role: sorted(names) for role, names in files.items()},
+        'environment': environment or {},
+    }
+
+
+def write_manifest(directory, manifest, suffix):
+    """Write manifest atomically, return its path."""
+    path = os.path.join(directory, manifest_name(suffix, manifest['timestamp']))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp, path)
+    return path
+
+
+def load_manifests(directory):
+    """Every run manifest of a metric dir, newest last, 'path' key added."""
+    manifests = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if not (entry.name.startswith(MANIFEST_PREFIX) and entry.name.endswith('.json')):
+                continue
+            try:
+                with open(entry.path) as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: unable to read {entry.path}: {e}", file=sys.stderr)
+                continue
+            if manifest.get('version') != MANIFEST_VERSION:
+                continue
+            manifest['path'] = entry.path
+            manifests.append(manifest)
+    return sorted(manifests, key=lambda m: m['timestamp'])
+
+
+def run_key(manifest):
+    """(pps, pairs, size, cores, timestamp) as strings, combine_file_names key."""
+    return (str(manifest['pps']), str(manifest['pairs']), manifest['size'], str(manifest['cores']),
+            manifest['timestamp'])
+
+
+def flatten(manifest, prefix=''):
+    """Nested manifest to dotted keys, i.e. environment.tx.kernel"""
+    out = {}
+    for k, v in manifest.items():
+        if k == 'files':
+            continue
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(flatten(v, f"{key}."))
+        else:
+            out[key] = v
+    return out
+
+
+def parse_where(conditions):
+    """['kernel=6.1', 'tx.rx_queues=8'] -> dict"""
+    where = {}
+    for condition in conditions or []:
+        key, sep, value = condition.partition('=')
+        if not sep:
+            raise ValueError(f"condition {condition} is not key=value")
+        where[key] = value
+    return where
+
+
+def matches(manifest, where):
+    """Every condition holds on some field whose dotted key is the
+    condition key or ends with it, values compared as strings."""
+    flat = flatten(manifest)
+    for key, value in where.items():
+        found = [v for k, v in flat.items() if k == key or k.endswith(f".{key}")]
+        if not any(str(v) == value for v in found):
+            return False
+    return True
+
+
+def index_manifests(directory, manifests=None):
+    """Runs of a metric dir in combine_file_names form, from manifests alone.
+
+    :param directory: metric dir
+    :param manifests: load_manifests result, read if None
+    :return: dict run key -> {'timestamp', 'core_list', 'files', 'worker_metrics', 'manifest'}
+    """
+    runs = {}
+    for manifest in load_manifests(directory) if manifests is None else manifests:
+        files = manifest['files']
+        pod_files = files.get('server', []) + files.get('client', [])
+        if not pod_files:
+            continue
+        runs[run_key(manifest)] = {
+            'timestamp': manifest['timestamp'],
+            'core_list': sorted({str(c) for c in manifest.get('core_list', [])}),
+            'files': [os.path.join(directory, f) for f in pod_files],
+            'worker_metrics': {role: list(files.get(role, [])) for role in WORKER_ROLES},
+            'manifest': manifest,
+        }
+    return runs
+
+
+def gather_environment(tx_addr, rx_addr, if_name, ssh="ssh"):
+    """Run NODE_SCRIPT on both workers over ssh, for run_monitor_pps.sh."""
+    environment = {}
+    for side, addr in (('tx', tx_addr), ('rx', rx_addr)):
+        if not addr:
+            continue
+        try:
+            out = subprocess.run([ssh, f"root@{addr}", NODE_SCRIPT.format(if_name=if_name)],
+                                 capture_output=True, text=True, timeout=30).stdout
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"Warning: unable to read environment of {addr}: {e}", file=sys.stderr)
+            out = ""
+        environment[side] = node_environment(addr, addr, parse_node_info(out), if_name)
+    return environment
+
+
+def write_from_logs(cmd):
+    """--write, manifest of a run_monitor_pps.sh run from logs it produced.
+
+    Shell functions stamp their logs separately, pod logs of the newest
+    run of the point give the timestamp, worker logs no older than
+    --since join it.
+    """
+    logs = [log for log in scan_logs(cmd.output_dir)
+            if log.experiment == (str(cmd.pps), str(cmd.pairs), str(cmd.size), str(cmd.cores))]
+    pods = [log for log in logs if log.is_pod]
+    if not pods:
+        print(f"Error: no pod logs of this run in {cmd.output_dir}", file=sys.stderr)
+        sys.exit(1)
+    timestamp = max(log.timestamp for log in pods)
+    files = {}
+    for log in logs:
+        if log.is_pod and log.timestamp != timestamp:
+            continue
+        if not log.is_pod and log.timestamp < cmd.since:
+            continue
+        files.setdefault(log.role, []).append(log.name)
+    run_pods = [log for log in pods if log.timestamp == timestamp]
+    manifest = build_manifest(
+        cmd.pps, cmd.runtime, cmd.cores, cmd.pairs, cmd.size, timestamp, files,
+        gather_environment(cmd.tx_node, cmd.rx_node, cmd.node_if_name),
+        tx_pods=sorted(log.pod for log in run_pods if log.side == 'tx'),
+        rx_pods=sorted(log.pod for log in run_pods if log.side == 'rx'),
+        core_list=sorted({log.core_list for log in run_pods}),
+        writer='run_monitor_pps.sh')
+    suffix = f"pr_{cmd.pps}_runtime_{cmd.runtime}_cores_{cmd.cores}_pairs_{cmd.pairs}_size_{cmd.size}"
+    print(f"Run manifest {write_manifest(cmd.output_dir, manifest, suffix)}")
+
+
+def print_manifests(manifests):
+    print(f"{'timestamp':<15} {'pps':>10} {'cores':>5} {'pairs':>5} {'size':>16} "
+          f"{'kernel':<20} {'driver':<10} {'queues':>6} {'cni':<20}")
+    for m in manifests:
+        env = m['environment'].get('rx', {})
+        print(f"{m['timestamp']:<15} {m['pps']:>10} {m['cores']:>5} {m['pairs']:>5} {m['size']:>16} "
+              f"{env.get('kernel', ''):<20} {env.get('driver', ''):<10} {env.get('rx_queues', ''):>6} "
+              f"{env.get('cni', ''):<20}")
+
+
+def main(cmd):
+    if cmd.write:
+        write_from_logs(cmd)
+        return
+    try:
+        where = parse_where(cmd.where)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print_manifests([m for m in load_manifests(cmd.directory) if matches(m, where)])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List or write run manifests.")
+    parser.add_argument("-d", "--directory", type=str, default="metrics", help="Metric dir to list.")
+    parser.add_argument("--where", nargs="*", default=[], help="Filter, key=value on any manifest field.")
+    parser.add_argument("--write", action="store_true", help="Write manifest of a run_monitor_pps.sh run.")
+    parser.add_argument("-o", "--output_dir", type=str, default="metrics", help="Metric dir of the run.")
+    parser.add_argument("--pps", type=int, help="Target pps.")
+    parser.add_argument("--runtime", type=int, help="Runtime in seconds.")
+    parser.add_argument("--cores", type=int, help="Cores per pod.")
+    parser.add_argument("--pairs", type=int, help="Number of pairs.")
+    parser.add_argument("--size", type=str, help="Frame size.")
+    parser.add_argument("--since", type=str, default="0", help="Run start, %%Y%%m%%d%%H%%M%%S.")
+    parser.add_argument("--tx_node", type=str, default=None, help="TX worker address.")
+    parser.add_argument("--rx_node", type=str, default=None, help="RX worker address.")
+    parser.add_argument("--node_if_name", type=str, default="eth1", help="Worker adapter.")
+    args = parser.parse_args()
+    main(args)
@@ -39,6 +39,8 @@ OPT_IS_LOOPBACK=""
 NUM_CORES="1"
 PACKET_SIZE="64"
 DEFAULT_IF_NAME="eth0"
+# worker node adapter sampled by node collectors
+NODE_IF_NAME="eth1"
 
 output_dir="metrics"
 
@@ -47,6 +49,30 @@ IP_HEADER_SIZE=20
 UDP_HEADER_SIZE=8
 USE_TASKSET="false"
 
+# in pod sampler, python version keeps sysfs/procfs fds open
+# and does not fork per sample (monitor_pps.py), shell version
+# is a fallback for pod images without python3.
+USE_PY_SAMPLER="true"
+POD_MONITOR_FILE="/tmp/monitor_pps.sh"
+POD_MONITOR="$POD_MONITOR_FILE"
+# python collectors append mono/wall clock timestamp columns (-T)
+POD_MONITOR_TS=""
+if [ "$USE_PY_SAMPLER" == "true" ]; then
+    POD_MONITOR_FILE="/tmp/monitor_pps.py"
+    POD_MONITOR="python3 $POD_MONITOR_FILE"
+    POD_MONITOR_TS="-T"
+fi
+
+# single node agent per worker (node_agent.py), samples queue, cpu,
+# softnet and interrupts on one tick, one ssh session per node.
+USE_NODE_AGENT="true"
+
+# burst capture, 2 ms samples kept in memory on rx pods and worker nodes,
+# window around each drop written to burst-* logs (inference.py --burst).
+BURST_CAPTURE="false"
+BURST_SAMPLE_TIME="0.002"
+BURST_HISTORY="2"
+
 TOTAL_OVERHEAD=$((ETHERNET_HEADER_SIZE + IP_HEADER_SIZE + UDP_HEADER_SIZE))
 
 DEFAULT_PD_SIZE="22"
@@ -390,25 +416,25 @@ function run_trafgen_inter_pod() {
 function check_monitor_script() {
     local missing_pods=()
     for rx_pod_name in "${rx_pod_names[@]}"; do
-        if ! kubectl exec "$rx_pod_name" -- ls /tmp/monitor_pps.sh &> /dev/null; then
+        if ! kubectl exec "$rx_pod_name" -- ls "$POD_MONITOR_FILE" &> /dev/null; then
             missing_pods+=("$rx_pod_name")
         fi
     done
 
     if [ "${#missing_pods[@]}" -gt 0 ]; then
-        echo "Error: The following receiver pods are missing the monitor script '/tmp/monitor_pps.sh':"
+        echo "Error: The following receiver pods are missing the monitor script '$POD_MONITOR_FILE':"
         printf '%s\n' "${missing_pods[@]}"
         exit 1
     else
         echo " "
-        echo "All receiver pods have the monitor script '/tmp/monitor_pps.sh'."
+        echo "All receiver pods have the monitor script '$POD_MONITOR_FILE'."
     fi
 }
 
 # monitor single pod
 function run_monitor() {
     echo "Starting monitor pod $tx_pod_name core $default_core"
-    kubectl exec "$rx_pod_name" -- timeout "${DEFAULT_MONITOR_TIMEOUT}s" /tmp/monitor_pps.sh -i "$DEFAULT_IF_NAME" -c "$task_set_core"
+    kubectl exec "$rx_pod_name" -- timeout "${DEFAULT_MONITOR_TIMEOUT}s" $POD_MONITOR -i "$DEFAULT_IF_NAME" -c "$task_set_core"
 }
 
 # Execute monitors pps script on all receiver pods
@@ -420,7 +446,7 @@ function run_monitor_all() {
      local _default_core="${default_cores[$i]}"
      echo "Starting monitor on pod $_rx_pod_name with core $default_core"
      kubectl exec "$_rx_pod_name" -- timeout "${DEFAULT_MONITOR_TIMEOUT}s" \
-     /tmp/monitor_pps.sh -i eth0 > "/tmp/monitor_${_rx_pod_name}.log" 2>&1 &
+     $POD_MONITOR -i eth0 > "/tmp/monitor_${_rx_pod_name}.log" 2>&1 &
     done
 
     local tail_cmd="tail -f"
@@ -446,9 +472,9 @@ function collect_pps_rate() {
     echo "txt $rx_pod_name for core $default_core ${DEFAULT_MONITOR_TIMEOUT} sec with $pps pps for RX direction"
 
     kubectl exec "$rx_pod_name" -- timeout "${DEFAULT_MONITOR_TIMEOUT}s" \
-    /tmp/monitor_pps.sh -i "$DEFAULT_IF_NAME" -d tuple -c "$default_core"> "$rx_output_file" &
+    $POD_MONITOR -i "$DEFAULT_IF_NAME" -d tuple $POD_MONITOR_TS -c "$default_core"> "$rx_output_file" &
     kubectl exec "$tx_pod_name" -- timeout "${DEFAULT_MONITOR_TIMEOUT}s" \
-    /tmp/monitor_pps.sh -i "$DEFAULT_IF_NAME" -d tuple -c "$default_core"> "$tx_output_file" &
+    $POD_MONITOR -i "$DEFAULT_IF_NAME" -d tuple $POD_MONITOR_TS -c "$default_core"> "$tx_output_file" &
 }
 
 # Function collect stats from all client pods in multi pod config
@@ -477,7 +503,7 @@ function collect_pps_rate_all() {
       "$target_cores ${DEFAULT_MONITOR_TIMEOUT} sec with $pps pps"
 
       kubectl exec "$pod_id" -- timeout "${DEFAULT_MONITOR_TIMEOUT}s" \
-      /tmp/monitor_pps.sh -i "$DEFAULT_IF_NAME" -d tuple> "$output_file" &
+      $POD_MONITOR -i "$DEFAULT_IF_NAME" -d tuple $POD_MONITOR_TS > "$output_file" &
       ((pod_ith++))
   done
 
@@ -491,7 +517,7 @@ function collect_pps_rate_all() {
       "$target_cores ${DEFAULT_MONITOR_TIMEOUT} sec with $pps pps"
 
       kubectl exec "$pod_id" -- timeout "${DEFAULT_MONITOR_TIMEOUT}s" \
-      /tmp/monitor_pps.sh -i eth0 -d tuple> "$output_file" &
+      $POD_MONITOR -i eth0 -d tuple $POD_MONITOR_TS > "$output_file" &
       ((pod_ith++))
   done
 }
@@ -531,25 +557,26 @@ function collect_queue_rates() {
 
     echo "Collecting queue rates and CPU utilization from workers at $timestamp..."
     ssh root@"$tx_node_addr" timeout "${DEFAULT_MONITOR_TIMEOUT}s" \
-    /bin/bash /tmp/monitor_queue_rate.sh -t queue > "$tx_queue_output_file" 2>&1 &
+    python3 /tmp/monitor_queue_rate.py -t queue -T > "$tx_queue_output_file" 2>&1 &
     ssh root@"$tx_node_addr" timeout "${DEFAULT_MONITOR_TIMEOUT}s" \
-    /bin/bash /tmp/monitor_queue_rate.sh -t cpu > "$tx_cpu_output_file" 2>&1 &
+    python3 /tmp/monitor_queue_rate.py -t cpu -T > "$tx_cpu_output_file" 2>&1 &
 
     echo "Collecting queue rates and CPU utilization from workers at $timestamp..."
     ssh root@"$rx_node_addr" timeout "${DEFAULT_MONITOR_TIMEOUT}s" \
-    /bin/bash /tmp/monitor_queue_rate.sh -t queue > "$rx_queue_output_file" 2>&1 &
+    python3 /tmp/monitor_queue_rate.py -t queue -T > "$rx_queue_output_file" 2>&1 &
     ssh root@"$rx_node_addr" timeout "${DEFAULT_MONITOR_TIMEOUT}s" \
-    /bin/bash /tmp/monitor_queue_rate.sh -t cpu > "$rx_cpu_output_file" 2>&1 &
+    python3 /tmp/monitor_queue_rate.py -t cpu -T > "$rx_cpu_output_file" 2>&1 &
 
     echo "Collecting soft net statistics from from workers at $timestamp..."
     ssh root@"$tx_node_addr" timeout "${DEFAULT_MONITOR_TIMEOUT}s" \
-    python3 /tmp/monitor_softnet_stat.py --concise -c > "$tx_soft_net_log" 2>&1 &
+    python3 /tmp/monitor_softnet_stat.py -c --rate -T > "$tx_soft_net_log" 2>&1 &
     ssh root@"$rx_node_addr" timeout "${DEFAULT_MONITOR_TIMEOUT}s" \
-    python3 /tmp/monitor_softnet_stat.py --concise -c > "$rx_soft_net_log" 2>&1 &
+    python3 /tmp/monitor_softnet_stat.py -c --rate -T > "$rx_soft_net_log" 2>&1 &
 }
 
 # Function collect interrupt rate per TX and RX
-# from each worker node.
+# from each worker node. monitor_txrx_int.py output
+# per queue x per CPU deltas for each sample.
 function collect_tx_rx_int() {
     local pps=$1
     local num_cores=$2
@@ -561,11 +588,81 @@ function collect_tx_rx_int() {
 
     local tx_output_file="${output_dir}/tx-pod-int_pr_${pps}_runtime_${DEFAULT_TIMEOUT}_cores_${num_cores}_pairs_${num_pairs}_size_${packet_size}_${timestamp}.log"
     echo "Collecting TX/RX interrupt data from tx_node at $timestamp..."
-    ssh root@"$tx_node_addr" timeout "${DEFAULT_MONITOR_TIMEOUT}s" /bin/bash /tmp/monitor_txrx_int.sh > "$tx_output_file" &
+    ssh root@"$tx_node_addr" timeout "${DEFAULT_MONITOR_TIMEOUT}s" python3 /tmp/monitor_txrx_int.py -T > "$tx_output_file" &
 
     local rx_output_file="${output_dir}/rx-pod-int_pr_${pps}_runtime_${DEFAULT_TIMEOUT}_cores_${num_cores}_pairs_${num_pairs}_size_${packet_size}_${timestamp}.log"
     echo "Collecting TX/RX interrupt data from rx_node at $timestamp..."
-    ssh root@"$rx_node_addr" timeout "${DEFAULT_MONITOR_TIMEOUT}s" /bin/bash /tmp/monitor_txrx_int.sh > "$rx_output_file" &
+    ssh root@"$rx_node_addr" timeout "${DEFAULT_MONITOR_TIMEOUT}s" python3 /tmp/monitor_txrx_int.py -T > "$rx_output_file" &
+}
+
+# Function start single node agent on TX and RX worker node,
+# agent samples queue rate, cpu, softnet and interrupts on the
+# same tick, stream split locally into same per source logs
+# collect_queue_rates and collect_tx_rx_int produce.
+function collect_node_metrics() {
+    local pps=$1
+    local num_cores=$2
+    local num_pairs=$3
+    local packet_size=$4
+
+    local timestamp
+    timestamp=$(date +"%Y%m%d%H%M%S")
+
+    local side
+    local node_addr
+    for side in tx rx; do
+        if [ "$side" == "tx" ]; then
+            node_addr="$tx_node_addr"
+        else
+            node_addr="$rx_node_addr"
+        fi
+        local queue_file="${output_dir}/${side}-pod-queue_pr_${pps}_runtime_${DEFAULT_TIMEOUT}_cores_${num_cores}_pairs_${num_pairs}_size_${packet_size}_ts_${timestamp}.log"
+        local cpu_file="${output_dir}/${side}-pod-cpu_pr_${pps}_runtime_${DEFAULT_TIMEOUT}_cores_${num_cores}_pairs_${num_pairs}_size_${packet_size}_ts_${timestamp}.log"
+        local softnet_file="${output_dir}/${side}-softnet-stat_${pps}_runtime_${DEFAULT_TIMEOUT}_cores_${num_cores}_pairs_${num_pairs}_size_${packet_size}_ts_${timestamp}.log"
+        local int_file="${output_dir}/${side}-pod-int_pr_${pps}_runtime_${DEFAULT_TIMEOUT}_cores_${num_cores}_pairs_${num_pairs}_size_${packet_size}_${timestamp}.log"
+
+        echo "Starting node agent on ${side} worker $node_addr at $timestamp..."
+        ssh root@"$node_addr" timeout "${DEFAULT_MONITOR_TIMEOUT}s" \
+        python3 /tmp/node_agent.py -i "$NODE_IF_NAME" -T | \
+        python3 node_agent.py --split --queue "$queue_file" --cpu "$cpu_file" \
+        --softnet "$softnet_file" --int "$int_file" &
+    done
+}
+
+# Function start burst capture on client pods and both worker nodes,
+# samplers write only when drop counter grows and at exit.
+function collect_burst() {
+    local pps=$1
+    local num_cores=$2
+    local num_pairs=$3
+    local packet_size=$4
+
+    local timestamp
+    timestamp=$(date +"%Y%m%d%H%M%S")
+    local burst_args="--burst -s $BURST_SAMPLE_TIME --burst-history $BURST_HISTORY"
+
+    local client_pods
+    client_pods=($(kubectl get pods | grep 'client' | awk '{print $1}'))
+    local pod_id
+    for pod_id in "${client_pods[@]}"; do
+        local output_file="${output_dir}/burst-client_${pod_id}_pr_${pps}_runtime_${DEFAULT_TIMEOUT}_cores_${num_cores}_pairs_${num_pairs}_size_${packet_size}_ts_${timestamp}.log"
+        kubectl exec "$pod_id" -- timeout "${DEFAULT_MONITOR_TIMEOUT}s" \
+        python3 /tmp/monitor_pps.py -i "$DEFAULT_IF_NAME" $burst_args > "$output_file" &
+    done
+
+    local side
+    local node_addr
+    for side in tx rx; do
+        if [ "$side" == "tx" ]; then
+            node_addr="$tx_node_addr"
+        else
+            node_addr="$rx_node_addr"
+        fi
+        local output_file="${output_dir}/${side}-burst-queue_pr_${pps}_runtime_${DEFAULT_TIMEOUT}_cores_${num_cores}_pairs_${num_pairs}_size_${packet_size}_ts_${timestamp}.log"
+        echo "Starting burst capture on ${side} worker $node_addr at $timestamp..."
+        ssh root@"$node_addr" timeout "${DEFAULT_MONITOR_TIMEOUT}s" \
+        python3 /tmp/monitor_queue_rate.py -i "$NODE_IF_NAME" $burst_args > "$output_file" &
+    done
 }
 
 # this a pod interface stats for uplink
@@ -626,17 +723,32 @@ if [ "$OPT_IS_LOOPBACK" = "true" ]; then
   fi
 else
   # inter-pod monitor or collect.
+  run_start=$(date +"%Y%m%d%H%M%S")
   check_monitor_script
   run_trafgen_inter_pod "$current_pps"
   if [ "$OPT_MONITOR" = "true" ]; then
      run_monitor_all
   else
      collect_pps_rate_all "$current_pps" "$NUM_CORES" "$DEFAULT_NUM_PAIRS" &
-     collect_queue_rates "$current_pps" "$NUM_CORES" "$DEFAULT_NUM_PAIRS" "$PACKET_SIZE" &
-     collect_tx_rx_int "$current_pps" "$NUM_CORES" "$DEFAULT_NUM_PAIRS" "$PACKET_SIZE" &
+     if [ "$USE_NODE_AGENT" == "true" ]; then
+        collect_node_metrics "$current_pps" "$NUM_CORES" "$DEFAULT_NUM_PAIRS" "$PACKET_SIZE" &
+     else
+        collect_queue_rates "$current_pps" "$NUM_CORES" "$DEFAULT_NUM_PAIRS" "$PACKET_SIZE" &
+        collect_tx_rx_int "$current_pps" "$NUM_CORES" "$DEFAULT_NUM_PAIRS" "$PACKET_SIZE" &
+     fi
+     if [ "$BURST_CAPTURE" == "true" ]; then
+        collect_burst "$current_pps" "$NUM_CORES" "$DEFAULT_NUM_PAIRS" "$PACKET_SIZE" &
+     fi
   fi
 fi
 
 wait
+
+# run manifest, parameters, produced files and worker environment
+if [ "$OPT_IS_LOOPBACK" != "true" ] && [ "$OPT_MONITOR" != "true" ]; then
+  python3 run_manifest.py --write -o "$output_dir" --pps "$current_pps" --runtime "$DEFAULT_TIMEOUT" \
+  --cores "$NUM_CORES" --pairs "$DEFAULT_NUM_PAIRS" --size "$PACKET_SIZE" --since "$run_start" \
+  --tx_node "$tx_node_addr" --rx_node "$rx_node_addr" --node_if_name "$NODE_IF_NAME"
+fi
 exit 0
 ##kill_all_trafgen
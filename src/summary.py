@@ -0,0 +1,347 @@
+# Batched experiment summary, one vectorized pass over all experiments.
+#
+# Every experiment's TX and RX pod samples are packed into one zero padded
+# (experiments, metrics, samples) array, so mean / std / min / max /
+# p50 / p95 / p99 are single reductions along the contiguous sample axis
+# (percentiles from one sort, padding set to inf sorts last), and the
+# bootstrap 95% CI of the mean is a float32 matmul of shared Poisson
+# resample weights with the samples, in chunks of experiments to bound
+# memory.  Pod columns follow monitor_pps.TUPLE_COLUMNS by each experiment's
+# 'metadata' positions.  Derived per sample columns:
+# rx_drop_ratio = rx_drop / (rx_pps + rx_drop) and TX / RX bps from the
+# mean frame size of the size field (frame size or mix tag).
+#
+# Result is a NumPy structured array, one row per experiment, columns
+#   key, timestamp, size, pps, pairs, cores_per_pod, cores, frame_size,
+#   tx_samples, rx_samples, <side>_<metric>_<stat>
+# with save_csv / save_json export and compare() for regression checks.
+#
+# python3 summary.py -m metrics -o summary.csv
+# python3 summary.py -m metrics -o current.json --baseline baseline.json
+import argparse
+import csv
+import json
+import os
+import sys
+
+import numpy as np
+
+from monitor_pps import TUPLE_COLUMNS
+from profile_compiler import mean_frame_size
+
+# pod sampler tuple columns, read by 'metadata' position of each experiment
+METRICS = tuple(TUPLE_COLUMNS)
+DERIVED = {
+    'tx': ('bps',),
+    'rx': ('bps', 'drop_ratio'),
+}
+STATS = ('mean', 'std', 'min', 'max', 'p50', 'p95', 'p99', 'ci_lo', 'ci_hi')
+PERCENTILES = {'p50': 50, 'p95': 95, 'p99': 99}
+INFO_FIELDS = [
+    ('key', 'U160'), ('timestamp', 'U14'), ('size', 'U32'), ('pps', 'i8'), ('pairs', 'i8'),
+    ('cores_per_pod', 'i8'), ('cores', 'U64'), ('frame_size', 'f8'),
+    ('tx_samples', 'i8'), ('rx_samples', 'i8'),
+]
+# columns that identify the same point across two summaries
+POINT_FIELDS = ('size', 'pps', 'pairs', 'cores_per_pod', 'cores')
+
+
+def side_columns(side):
+    """Metric names of one side, pod columns then derived."""
+    return list(METRICS) + list(DERIVED[side])
+
+
+def summary_dtype():
+    fields = list(INFO_FIELDS)
+    for side in ('tx', 'rx'):
+        fields += [(f"{side}_{m}_{s}", 'f8') for m in side_columns(side) for s in STATS]
+    return np.dtype(fields)
+
+
+def pod_samples(details, side):
+    """(samples, METRICS) of one side, columns by 'metadata' position."""
+    positions = [details['metadata'][name]['position'] for name in METRICS]
+    return np.asarray(details[f'{side}_data'])[:, positions]
+
+
+def pack(arrays, n_extra=0):
+    """List of (n_i, m) arrays to (e, m + n_extra, max n_i) zero padded, and lengths.
+
+    Samples are the last axis, so sort, sums and the bootstrap product run
+    over contiguous rows.
+
+    :param arrays: per experiment samples
+    :param n_extra: metric rows left for derived metrics
+    :return: (values, lengths)
+    """
+    lengths = np.array([len(a) for a in arrays], dtype=np.int64)
+    n_metrics = arrays[0].shape[1] if arrays else 0
+    values = np.zeros((len(arrays), n_metrics + n_extra, int(lengths.max(initial=0))))
+    for i, a in enumerate(arrays):
+        values[i, :n_metrics, :len(a)] = a.T
+    return values, lengths
+
+
+def add_derived(values, side, frame_sizes):
+    """Fill derived rows (DERIVED[side]) after METRICS, in place.
+
+    :param values: pack result, (e, METRICS + derived, n)
+    :param side: tx or rx
+    :param frame_sizes: (e,) mean frame size in bytes
+    """
+    m = len(METRICS)
+    pps = values[:, METRICS.index(f'{side}_pps')]
+    np.multiply(pps, (np.asarray(frame_sizes, dtype=np.float64) * 8)[:, None], out=values[:, m])
+    if side == 'rx':
+        drop = values[:, METRICS.index('rx_drop')]
+        offered = pps + drop
+        np.divide(drop, offered, out=values[:, m + 1], where=offered > 0)
+
+
+def percentiles(ordered, lengths, qs):
+    """Linear interpolated percentiles along sample axis, padding ignored.
+
+    :param ordered: (e, m, n) sorted along samples, padding last
+    :param lengths: (e,) valid samples
+    :param qs: percentiles 0..100
+    :return: (len(qs), e, m)
+    """
+    out = []
+    last = np.maximum(lengths - 1, 0)
+    for q in qs:
+        pos = last * (q / 100.0)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, last)
+        frac = (pos - lo)[:, None]
+        v_lo = np.take_along_axis(ordered, lo[:, None, None], axis=2)[:, :, 0]
+        v_hi = np.take_along_axis(ordered, hi[:, None, None], axis=2)[:, :, 0]
+        out.append(v_lo + (v_hi - v_lo) * frac)
+    return np.stack(out)
+
+
+def bootstrap_ci(values, lengths, n_boot=200, alpha=0.05, seed=0, chunk=1024):
+    """Poisson bootstrap CI of the mean for every experiment and metric.
+
+    One (samples, n_boot) matrix of Poisson(1) weights is shared by all
+    experiments, experiment i uses its first n_i rows, so resampled sums of
+    a chunk of experiments are one (experiments * metrics, n) x (n, n_boot)
+    matrix product.  Resamples are independent within an experiment, which
+    is all a per experiment CI needs.
+
+    :param values: (e, m, n) padding zeroed
+    :param lengths: (e,) valid samples
+    :param n_boot: resamples
+    :param alpha: 1 - confidence
+    :param seed: rng seed, summaries are reproducible
+    :param chunk: experiments per product, bounds memory
+    :return: (lo, hi) each (e, m)
+    """
+    n_exp, n_metrics, n_max = values.shape
+    lo = np.full((n_exp, n_metrics), np.nan)
+    hi = np.full((n_exp, n_metrics), np.nan)
+    if n_max == 0 or n_boot < 2:
+        return lo, hi
+    weights = np.random.default_rng(seed).poisson(1.0, (n_max, n_boot)).astype(np.float32)
+    # total weight of the first n_i samples, (e, n_boot)
+    totals = np.cumsum(weights, axis=0)[np.maximum(lengths - 1, 0)]
+    sample_means = values.sum(axis=2) / np.maximum(lengths, 1)[:, None]
+    ranks = np.array([alpha / 2, 1 - alpha / 2]) * (n_boot - 1)
+    below = np.floor(ranks).astype(np.int64)
+    above = np.minimum(below + 1, n_boot - 1)
+    frac = ranks - below
+    for start in range(0, n_exp, chunk):
+        end = min(start + chunk, n_exp)
+        c = end - start
+        # float32 resampled means, CI bounds need far fewer digits than the data
+        rows = values[start:end].reshape(c * n_metrics, n_max).astype(np.float32)
+        means = (rows @ weights).reshape(c, n_metrics, n_boot)
+        total = totals[start:end, None, :]
+        means /= np.maximum(total, 1)
+        empty = total == 0
+        if empty.any():
+            # a resample that drew nothing (tiny n) counts as the sample mean
+            means = np.where(empty, sample_means[start:end, :, None], means)
+        # full sort of the contiguous float32 rows beats np.partition here
+        means.sort(axis=2)
+        bounds = means[..., below] + (means[..., above] - means[..., below]) * frac
+        lo[start:end], hi[start:end] = bounds[..., 0], bounds[..., 1]
+    lo[lengths == 0] = np.nan
+    hi[lengths == 0] = np.nan
+    return lo, hi
+
+
+def side_stats(values, lengths, n_boot, seed):
+    """dict stat -> (e, m) for one side.
+
+    One in place sort of an inf padded copy gives min, max and percentiles,
+    mean and std come from sums over the zero padded samples.
+
+    :param values: (e, m, n) zero padded
+    :param lengths: (e,) valid samples
+    """
+    n_max = values.shape[2]
+    padding = (np.arange(n_max)[None, :] >= lengths[:, None])[:, None, :]
+    ordered = values.copy()
+    np.copyto(ordered, np.inf, where=padding)
+    ordered.sort(axis=2)
+    with np.errstate(invalid='ignore'):
+        # inf - inf of experiments without samples, set to NaN below
+        low, high, *pcts = percentiles(ordered, lengths, [0, 100, *PERCENTILES.values()])
+    n = lengths[:, None].astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = values.sum(axis=2) / n
+        # padding rows add mean ** 2 each to the centered sum of squares
+        deviation = values - mean[:, :, None]
+        squares = np.einsum('emn,emn->em', deviation, deviation) - (n_max - n) * mean ** 2
+        std = np.sqrt(np.maximum(squares, 0) / (n - 1))
+    stats = {'mean': mean, 'std': std, 'min': low, 'max': high}
+    stats.update(zip(PERCENTILES, pcts))
+    stats['ci_lo'], stats['ci_hi'] = bootstrap_ci(values, lengths, n_boot, seed=seed)
+    empty = lengths == 0
+    for name in ('mean', 'min', 'max', *PERCENTILES):
+        stats[name][empty] = np.nan
+    stats['std'][lengths < 2] = np.nan
+    return stats
+
+
+def summarize(dataset, n_boot=200, seed=0):
+    """Summary table of every experiment.
+
+    :param dataset: dataset_files_from_dict result or dataset.Dataset
+    :param n_boot: bootstrap resamples for CI of the mean
+    :param seed: bootstrap rng seed
+    :return: structured array, summary_dtype()
+    """
+    keys = [k for k, d in dataset.items() if 'tx_data' in d and 'rx_data' in d]
+    table = np.zeros(len(keys), dtype=summary_dtype())
+    if not keys:
+        return table
+    frame_sizes = []
+    for i, key in enumerate(keys):
+        details = dataset[key]
+        frame_sizes.append(mean_frame_size(details['size']))
+        table[i]['key'] = key
+        table[i]['timestamp'] = details.get('timestamp') or ''
+        table[i]['size'] = details['size']
+        table[i]['pps'] = int(details['pps'])
+        table[i]['pairs'] = int(details['pairs'])
+        table[i]['cores_per_pod'] = int(details['core_per_pod'])
+        table[i]['cores'] = '-'.join(str(c) for c in details['cores'])
+        table[i]['frame_size'] = frame_sizes[-1]
+    for side in ('tx', 'rx'):
+        values, lengths = pack([pod_samples(dataset[k], side) for k in keys], len(DERIVED[side]))
+        add_derived(values, side, frame_sizes)
+        table[f'{side}_samples'] = lengths
+        stats = side_stats(values, lengths, n_boot, seed)
+        for j, metric in enumerate(side_columns(side)):
+            for stat in STATS:
+                table[f"{side}_{metric}_{stat}"] = stats[stat][:, j]
+    return table
+
+
+def to_records(table):
+    """Structured array to list of dicts, NaN as None."""
+    records = []
+    for row in table:
+        record = {}
+        for name in table.dtype.names:
+            value = row[name].item()
+            if isinstance(value, float) and np.isnan(value):
+                value = None
+            record[name] = value
+        records.append(record)
+    return records
+
+
+def save_csv(table, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(table.dtype.names)
+        for record in to_records(table):
+            writer.writerow(['' if v is None else v for v in record.values()])
+
+
+def save_json(table, path):
+    with open(path, 'w') as f:
+        json.dump(to_records(table), f, indent=1)
+
+
+def load_json(path):
+    """Summary saved by save_json back to structured array."""
+    with open(path) as f:
+        records = json.load(f)
+    table = np.zeros(len(records), dtype=summary_dtype())
+    for i, record in enumerate(records):
+        for name, value in record.items():
+            if name in table.dtype.names:
+                table[i][name] = np.nan if value is None else value
+    return table
+
+
+def save(table, path):
+    """Export by extension, .json or .csv"""
+    if path.endswith('.json'):
+        save_json(table, path)
+    else:
+        save_csv(table, path)
+
+
+def compare(baseline, current, column='rx_rx_pps_mean', rel_tol=0.05):
+    """Regression check between two summaries, points joined on POINT_FIELDS.
+
+    A point regresses when its value moved against the baseline by more
+    than rel_tol and the current value is outside the baseline bootstrap
+    CI (when the column is a mean).  Lower is worse except for drop, error
+    and ratio columns.
+
+    :return: list of dicts point, baseline, current, change
+    """
+    higher_is_worse = any(s in column for s in ('drop', 'err', 'ratio'))
+    ci = column[:-len('_mean')] if column.endswith('_mean') else None
+    base = {tuple(row[f].item() for f in POINT_FIELDS): row for row in baseline}
+    out = []
+    for row in current:
+        point = tuple(row[f].item() for f in POINT_FIELDS)
+        if point not in base:
+            continue
+        b, c = float(base[point][column]), float(row[column])
+        if np.isnan(b) or np.isnan(c):
+            continue
+        change = (c - b) / abs(b) if b else (np.inf if c else 0.0)
+        worse = change > rel_tol if higher_is_worse else change < -rel_tol
+        if worse and ci:
+            lo, hi = float(base[point][f"{ci}_ci_lo"]), float(base[point][f"{ci}_ci_hi"])
+            worse = not (lo <= c <= hi)
+        if worse:
+            out.append({'point': dict(zip(POINT_FIELDS, point)), 'baseline': b, 'current': c, 'change': change})
+    return out
+
+
+def main(cmd):
+    from inference import combine_file_names, dataset_files_from_dict
+
+    directory = os.path.abspath(cmd.metric_dir)
+    dataset = dataset_files_from_dict(combine_file_names(directory), directory)
+    table = summarize(dataset, cmd.n_boot)
+    if cmd.output:
+        save(table, cmd.output)
+        print(f"Summary of {len(table)} experiments saved to {cmd.output}")
+    if cmd.baseline:
+        regressions = compare(load_json(cmd.baseline), table, cmd.column, cmd.tolerance)
+        for r in regressions:
+            print(f"Regression {r['point']}: {cmd.column} {r['baseline']:.1f} -> {r['current']:.1f} "
+                  f"({100 * r['change']:+.1f}%)")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summary table of every experiment in metric dir.")
+    parser.add_argument("-m", "--metric_dir", type=str, default="metrics", help="Metric dir.")
+    parser.add_argument("-o", "--output", type=str, default=None, help="Output .csv or .json.")
+    parser.add_argument("--n_boot", type=int, default=200, help="Bootstrap resamples.")
+    parser.add_argument("--baseline", type=str, default=None, help="Baseline summary .json, exit 1 on regression.")
+    parser.add_argument("--column", type=str, default="rx_rx_pps_mean", help="Column checked against baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Relative change tolerated.")
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,367 @@
+# Cluster topology snapshot, cached between runs.
+#
+# Every run of run_monitor_pps.sh (and every orchestrator.py sweep) starts
+# by asking the cluster the same questions, which pods are server / client,
+# on which worker, worker address, pod physcpubind cores.  These do not
+# change until pods are recreated, so we gather all of them once, in one
+# batched pass:
+#   - `kubectl get pods -o json` and `kubectl get nodes -o json`,
+#   - `numactl -s` on every TX pod (cores and NUMA node), concurrently,
+#   - one ssh per worker running NODE_SCRIPT, which prints adapter queue
+#     counts, adapter NUMA node, NUMA node cpu lists, SMT siblings, RSS
+#     key / indirection table and IRQ number / affinity of every adapter
+#     queue interrupt,
+# and persist the result as JSON.
+#
+# Snapshot is reused while younger than --ttl and the pods it refers to
+# still run with the same UID (a recreated pod gets a new UID and may land
+# on other cores or worker), checking that costs one `kubectl get pods`.
+#
+# python3 topology.py                       # show snapshot, gather if stale
+# python3 topology.py --refresh -n 3 --node_interface eth1
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+DEFAULT_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "trafgen", "topology.json")
+DEFAULT_TTL = 3600.0
+SNAPSHOT_VERSION = 3
+
+# one ssh round trip per worker, each line "<tag> <values...>"
+NODE_SCRIPT = r"""
+IF={if_name}
+echo "queues $(ls -d /sys/class/net/$IF/queues/rx-* 2>/dev/null | wc -l) $(ls -d /sys/class/net/$IF/queues/tx-* 2>/dev/null | wc -l)"
+echo "nic_numa $(cat /sys/class/net/$IF/device/numa_node 2>/dev/null || echo -1)"
+for n in /sys/devices/system/node/node[0-9]*; do [ -e $n/cpulist ] && echo "numa ${{n##*node}} $(cat $n/cpulist)"; done
+for c in /sys/devices/system/cpu/cpu[0-9]*; do [ -e $c/topology/thread_siblings_list ] && echo "smt ${{c##*cpu}} $(cat $c/topology/thread_siblings_list)"; done
+ethtool -x $IF 2>/dev/null | sed 's/^/rss /'
+ethtool -n $IF rx-flow-hash udp4 2>/dev/null | sed 's/^/rss_fields /'
+echo "kernel $(uname -r)"
+ethtool -i $IF 2>/dev/null | sed 's/^/drvinfo /'
+ethtool -g $IF 2>/dev/null | sed 's/^/ring /'
+echo "cni $(ls /etc/cni/net.d 2>/dev/null | head -1)"
+grep -E "$IF[-_]" /proc/interrupts | while read irq rest; do irq=${{irq%:}}; echo "irq $irq $(cat /proc/irq/$irq/smp_affinity_list 2>/dev/null) ${{rest##* }}"; done
+"""
+
+
+def parse_physcpubind(numactl_out):
+    """physcpubind line of `numactl -s` to list of cores."""
+    for line in numactl_out.splitlines():
+        if line.startswith("physcpubind"):
+            return line.split(":", 1)[1].split()
+    return []
+
+
+def parse_nodebind(numactl_out):
+    """nodebind line of `numactl -s` to list of NUMA nodes."""
+    for line in numactl_out.splitlines():
+        if line.startswith("nodebind"):
+            return [int(n) for n in line.split(":", 1)[1].split()]
+    return []
+
+
+def parse_cpu_list(value):
+    """Kernel cpu list i.e. 0-3,8-11 to list of ints."""
+    cpus = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        cpus.extend(range(int(start), int(end or start) + 1))
+    return cpus
+
+
+def parse_node_info(out):
+    """Output of NODE_SCRIPT to dict.
+
+    :param out: script stdout
+    :return: dict with rx_queues, tx_queues, nic_numa, numa {node: cpus},
+             smt {cpu: siblings}, irqs list of {irq, cpus, label},
+             rss / rss_fields raw `ethtool -x` / rx-flow-hash output,
+             kernel, driver {driver, version, firmware-version, bus-info},
+             rings {rx, tx} current ring sizes, cni first /etc/cni/net.d entry
+    """
+    info = {"rx_queues": 0, "tx_queues": 0, "nic_numa": -1, "numa": {}, "smt": {}, "irqs": [],
+            "rss": "", "rss_fields": "", "kernel": "", "driver": {}, "rings": {}, "cni": ""}
+    ring_section = None
+    for line in out.splitlines():
+        fields = line.split()
+        if not fields:
+            continue
+        tag, values = fields[0], fields[1:]
+        if tag in ("rss", "rss_fields"):
+            # raw ethtool output, parsed by rss.parse_ethtool_rss
+            info[tag] += line.split(" ", 1)[1] + "\n" if " " in line else "\n"
+            continue
+        if tag in ("kernel", "cni"):
+            info[tag] = values[0] if values else ""
+            continue
+        if tag == "drvinfo" and values and values[0].endswith(":"):
+            info["driver"][values[0][:-1]] = " ".join(values[1:])
+            continue
+        if tag == "ring":
+            # ethtool -g prints maximums first, then current settings
+            if values and values[0] in ("Pre-set", "Current"):
+                ring_section = values[0]
+            elif ring_section == "Current" and len(values) == 2 and values[0] in ("RX:", "TX:"):
+                try:
+                    info["rings"][values[0][:-1].lower()] = int(values[1])
+                except ValueError:
+                    pass
+            continue
+        try:
+            if tag == "queues" and len(values) == 2:
+                info["rx_queues"], info["tx_queues"] = int(values[0]), int(values[1])
+            elif tag == "nic_numa" and values:
+                info["nic_numa"] = int(values[0])
+            elif tag == "numa" and len(values) == 2:
+                info["numa"][values[0]] = parse_cpu_list(values[1])
+            elif tag == "smt" and len(values) == 2:
+                info["smt"][values[0]] = parse_cpu_list(values[1])
+            elif tag == "irq" and len(values) in (2, 3):
+                # affinity list empty if /proc/irq/N not readable
+                info["irqs"].append({"irq": int(values[0]), "label": values[-1],
+                                     "cpus": parse_cpu_list(values[1]) if len(values) == 3 else []})
+        except ValueError:
+            continue
+    return info
+
+
+class TopologySnapshot:
+    """Everything discovery learns about pods and workers, JSON serializable."""
+
+    def __init__(self, num_pairs, node_if_name, tx_pods, rx_pods, pod_uids, pod_nodes, node_addrs,
+                 pod_cores, pod_numa, node_info, created=None, kubeconfig=None):
+        """
+        :param num_pairs: number of tx / rx pairs
+        :param node_if_name: worker adapter node_info describes
+        :param tx_pods: server pod names
+        :param rx_pods: client pod names
+        :param pod_uids: pod -> metadata.uid
+        :param pod_nodes: pod -> node name
+        :param node_addrs: node name -> address
+        :param pod_cores: TX pod -> physcpubind cores
+        :param pod_numa: TX pod -> NUMA nodes
+        :param node_info: node name -> parse_node_info dict
+        :param created: wall clock time snapshot gathered
+        :param kubeconfig: KUBECONFIG snapshot belongs to
+        """
+        self.num_pairs = num_pairs
+        self.node_if_name = node_if_name
+        self.tx_pods = tx_pods
+        self.rx_pods = rx_pods
+        self.pod_uids = pod_uids
+        self.pod_nodes = pod_nodes
+        self.node_addrs = node_addrs
+        self.pod_cores = pod_cores
+        self.pod_numa = pod_numa
+        self.node_info = node_info
+        self.created = created if created is not None else time.time()
+        self.kubeconfig = kubeconfig if kubeconfig is not None else os.environ.get("KUBECONFIG", "")
+
+    @property
+    def age(self):
+        return time.time() - self.created
+
+    def to_dict(self):
+        return dict(vars(self), version=SNAPSHOT_VERSION)
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {data.get('version')}")
+        return cls(**{k: v for k, v in data.items() if k != "version"})
+
+    def matches(self, num_pairs, node_if_name):
+        """Snapshot was gathered for the same cluster and parameters."""
+        return (self.num_pairs == num_pairs and self.node_if_name == node_if_name
+                and self.kubeconfig == os.environ.get("KUBECONFIG", ""))
+
+    def stale_pods(self, pods):
+        """Pods of snapshot not running anymore or recreated.
+
+        :param pods: running pods, name -> (uid, node) from list_pods
+        :return: list of pod names
+        """
+        return [pod for pod in self.tx_pods + self.rx_pods
+                if pods.get(pod, (None, None)) != (self.pod_uids.get(pod), self.pod_nodes.get(pod))]
+
+
+async def list_pods(remote):
+    """Running pods, name -> (uid, node)."""
+    _, out = await remote.run(remote.kubectl_argv("get", "pods", "-o", "json"), check=True)
+    running = {}
+    for item in json.loads(out).get("items", []):
+        if item.get("status", {}).get("phase") == "Running":
+            meta = item["metadata"]
+            running[meta["name"]] = (meta.get("uid"), item["spec"].get("nodeName"))
+    return running
+
+
+async def gather_node_info(remote, addr, node_if_name):
+    """Run NODE_SCRIPT on worker, empty info if ssh fails."""
+    rc, out = await remote.run(remote.ssh_argv(addr, NODE_SCRIPT.format(if_name=node_if_name)))
+    if rc != 0:
+        print(f"Warning: unable to read adapter / NUMA info from {addr}.", file=sys.stderr)
+    return parse_node_info(out)
+
+
+async def gather_snapshot(remote, num_pairs, node_if_name="eth1", pods=None):
+    """Discover pods, nodes, cores and worker adapter layout in one batched pass.
+
+    :param remote: orchestrator.Remote or anything with run / kubectl_argv / exec_argv / ssh_argv
+    :param num_pairs: number of tx / rx pairs
+    :param node_if_name: worker adapter
+    :param pods: optional list_pods result already fetched
+    :return: TopologySnapshot
+    """
+    if pods is None:
+        pods, (_, nodes_json) = await asyncio.gather(
+            list_pods(remote), remote.run(remote.kubectl_argv("get", "nodes", "-o", "json"), check=True))
+    else:
+        _, nodes_json = await remote.run(remote.kubectl_argv("get", "nodes", "-o", "json"), check=True)
+
+    def find_pod(prefix):
+        # same match as `kubectl get pods | grep serverN`
+        for name in sorted(pods):
+            if prefix in name:
+                return name
+        raise RuntimeError(f"{prefix} is not running.")
+
+    tx_pods = [find_pod(f"server{i}") for i in range(num_pairs)]
+    rx_pods = [find_pod(f"client{i}") for i in range(num_pairs)]
+    pod_nodes = {pod: pods[pod][1] for pod in tx_pods + rx_pods}
+
+    node_addrs = {}
+    for item in json.loads(nodes_json).get("items", []):
+        addresses = item.get("status", {}).get("addresses", [])
+        if addresses:
+            node_addrs[item["metadata"]["name"]] = addresses[0]["address"]
+
+    workers = sorted({pod_nodes[pod] for pod in tx_pods + rx_pods if pod_nodes[pod] in node_addrs})
+    numactl, infos = await asyncio.gather(
+        asyncio.gather(*(remote.run(remote.exec_argv(pod, "numactl", "-s"), check=True) for pod in tx_pods)),
+        asyncio.gather(*(gather_node_info(remote, node_addrs[node], node_if_name) for node in workers)))
+
+    pod_cores = {pod: parse_physcpubind(out) for pod, (_, out) in zip(tx_pods, numactl)}
+    pod_numa = {pod: parse_nodebind(out) for pod, (_, out) in zip(tx_pods, numactl)}
+    for pod, cores in pod_cores.items():
+        if not cores:
+            raise RuntimeError(f"unable to read physcpubind from {pod}")
+
+    return TopologySnapshot(num_pairs, node_if_name, tx_pods, rx_pods,
+                            {pod: pods[pod][0] for pod in tx_pods + rx_pods}, pod_nodes, node_addrs,
+                            pod_cores, pod_numa, dict(zip(workers, infos)))
+
+
+def load_snapshot(path):
+    """:return: TopologySnapshot or None if missing or unreadable"""
+    try:
+        with open(path) as f:
+            return TopologySnapshot.from_dict(json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def save_snapshot(snapshot, path):
+    """Write snapshot atomically, concurrent runs never see a partial file."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(snapshot.to_dict(), f, indent=4)
+    os.replace(tmp, path)
+
+
+async def cached_snapshot(remote, num_pairs, node_if_name="eth1", path=DEFAULT_CACHE, ttl=DEFAULT_TTL,
+                          refresh=False, is_verbose=False):
+    """Serve snapshot from cache, gather again if missing, older than ttl,
+    gathered with other parameters or any of its pods recreated.
+
+    :param remote: Remote
+    :param num_pairs: number of tx / rx pairs
+    :param node_if_name: worker adapter
+    :param path: cache file, None disables cache
+    :param ttl: max snapshot age in seconds, 0 disables cache
+    :param refresh: ignore cache
+    :param is_verbose: print why cache is not used
+    :return: TopologySnapshot
+    """
+    snapshot = None if refresh or not path or ttl <= 0 else load_snapshot(path)
+    reason = "refresh requested" if refresh else "no cached snapshot"
+    pods = None
+    if snapshot is not None:
+        if not snapshot.matches(num_pairs, node_if_name):
+            reason, snapshot = "parameters changed", None
+        elif snapshot.age > ttl:
+            reason, snapshot = f"snapshot older than {ttl:g}s", None
+        else:
+            pods = await list_pods(remote)
+            stale = snapshot.stale_pods(pods)
+            if stale:
+                reason, snapshot = f"pods recreated or stopped: {' '.join(stale)}", None
+    if snapshot is not None:
+        if is_verbose:
+            print(f"Topology from cache {path}, age {snapshot.age:.0f}s")
+        return snapshot
+
+    if is_verbose:
+        print(f"Gathering topology, {reason}.")
+    snapshot = await gather_snapshot(remote, num_pairs, node_if_name, pods)
+    if path and ttl > 0:
+        try:
+            save_snapshot(snapshot, path)
+        except OSError as e:
+            print(f"Warning: unable to save topology cache {path}: {e}", file=sys.stderr)
+    return snapshot
+
+
+def print_snapshot(snapshot):
+    print(f"Snapshot age {snapshot.age:.0f}s, {snapshot.num_pairs} pairs, adapter {snapshot.node_if_name}")
+    for pod in snapshot.tx_pods + snapshot.rx_pods:
+        node = snapshot.pod_nodes[pod]
+        cores = ' '.join(snapshot.pod_cores.get(pod, [])) or '-'
+        numa = ','.join(map(str, snapshot.pod_numa.get(pod, []))) or '-'
+        print(f"{pod:<30} {node:<20} {snapshot.node_addrs.get(node, '-'):<16} numa {numa:<4} cores {cores}")
+    for node, info in snapshot.node_info.items():
+        print(f"{node:<30} rx/tx queues {info['rx_queues']}/{info['tx_queues']} nic numa {info['nic_numa']} "
+              f"irqs {len(info['irqs'])} cpus {sum(len(c) for c in info['numa'].values())}")
+
+
+def main(cmd):
+    from orchestrator import Remote
+
+    remote = Remote(cmd.kubectl, cmd.ssh, is_verbose=cmd.verbose)
+
+    async def run():
+        try:
+            return await cached_snapshot(remote, cmd.num_pairs, cmd.node_interface, cmd.cache, cmd.ttl,
+                                         cmd.refresh, is_verbose=True)
+        finally:
+            remote.terminate()
+
+    start = time.monotonic()
+    try:
+        snapshot = asyncio.run(run())
+    except (RuntimeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print_snapshot(snapshot)
+    print(f"Done in {time.monotonic() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or refresh cached cluster topology snapshot.")
+    parser.add_argument("-n", "--num_pairs", type=int, default=3, help="Number of server-client pairs.")
+    parser.add_argument("--node_interface", type=str, default="eth1", help="Worker node adapter.")
+    parser.add_argument("--cache", type=str, default=DEFAULT_CACHE, help="Snapshot file.")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL, help="Max snapshot age in seconds.")
+    parser.add_argument("--refresh", action="store_true", help="Gather again even if cache is valid.")
+    parser.add_argument("--kubectl", type=str, default="kubectl", help="kubectl executable, i.e. fake for offline run.")
+    parser.add_argument("--ssh", type=str, default="ssh", help="ssh executable, i.e. fake for offline run.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print each command.")
+    args = parser.parse_args()
+    main(args)